@@ -1,93 +1,63 @@
 from dataiku.customrecipe import get_recipe_config
-from graph_analytics_utils import get_input_dataset, get_output_dataset, get_clustering_recipe_params, AlgorithmError
+from graph_analytics_utils import get_input_dataset, get_output_dataset, get_clustering_recipe_params, get_column_types, load_edges, get_graph_cache, write_edges_with_features, write_profile, AlgorithmError
 from graph_analytics_constants import Constants
-from dku_graph_analytics.graph_clustering import CLUSTERING_ALGORITHMS, fix_dendrogram
+from dku_graph_analytics.graph_clustering import CLUSTERING_ALGORITHMS, compute_clustering_task, get_clustering_keys, get_clustering_label, compute_modularity
+from dku_graph_analytics.algorithm_runner import run_algorithms
+from dku_graph_analytics.node_features import NodeFeatures
+from dku_profiling.profiler import RunProfiler, profile_stage
 import logging
-import pandas as pd
 import numpy as np
-import igraph
-import time
 
 
 input_dataset = get_input_dataset('input_dataset')
 output_dataset = get_output_dataset('output_dataset')
+profile_dataset = get_output_dataset('profile_dataset')
 
 recipe_config = get_recipe_config()
 params = get_clustering_recipe_params(recipe_config)
 
 source, target = params[Constants.SOURCE], params[Constants.TARGET]
 
-input_df = input_dataset.get_dataframe()
-
-necessary_columns = [source, target]
-if params[Constants.WEIGHT]:
-    necessary_columns += [params[Constants.WEIGHT]]
-
-graph_df = input_df[necessary_columns]
-
-if graph_df[source].dtype != graph_df[target].dtype:
+column_types = get_column_types(input_dataset)
+if column_types[source] != column_types[target]:
     raise TypeError("Source and Target columns must have same datatype")
 
-# swap source and target so that source < target to get unique undirected edges
-if not params[Constants.DIRECTED]:
-    graph_df[source], graph_df[target] = np.where(graph_df[source] > graph_df[target],
-                                                  [graph_df[target], graph_df[source]],
-                                                  [graph_df[source], graph_df[target]])
-
-# groupby to get unique edges
-if params[Constants.WEIGHT]:
-    # WEIGHT input parameter is summed within same edges
-    graph_df = graph_df.groupby([source, target]).agg({params[Constants.WEIGHT]: "sum"}).reset_index()
-else:
-    # if no weight column was chosen by the user, then the number of same edge becomes the weight attribute
-    graph_df = graph_df.groupby([source, target]).size().reset_index(name=Constants.WEIGHT)
-
-graph_df.columns = [source, target, Constants.WEIGHT]
-
-start_time = time.time()
-logging.info("Graph clustering - Creating igraph graph ...")
-iGraph = igraph.Graph.TupleList(graph_df.values, weights=True, directed=params[Constants.DIRECTED])
-
-logging.info("Graph clustering - Graph created in {:.4f} seconds".format(time.time()-start_time))
-
-# output all edges or only nodes
-if params[Constants.OUTPUT_TYPE] == 'output_edges':
-    output_df = input_df
-    node_columns = [Constants.SOURCE, Constants.TARGET]
-else:
-    output_df = pd.DataFrame(iGraph.vs["name"], columns=[source])
-    node_columns = [Constants.SOURCE]
-
-# computing all selected graph clustering algorithms
-for algo, algo_params in CLUSTERING_ALGORITHMS.items():
-    label, method = algo_params['label'], algo_params['method']
-    if params[algo] and not params.get(algo_params.get('param_restriction', None), None):
-        start_time = time.time()
-        logging.info("Graph clustering - Computing {} ...".format(label))
+with RunProfiler("Graph clustering", cprofile=params[Constants.CPROFILE]) as profiler:
+    # unique edges (source id <= target id when undirected), the weight column is summed within same edges
+    # and if no weight column was chosen by the user, then the number of same edge becomes the weight attribute
+    edges = load_edges(input_dataset, source, target, weight=params[Constants.WEIGHT], directed=params[Constants.DIRECTED], cache=get_graph_cache(params))
+    with profile_stage("Graph clustering - Compact graph") as stage:
+        compact_graph = edges.get_graph()
+        stage.annotate(nodes=compact_graph.node_count, edges=compact_graph.edge_count)
+
+    # computing all selected graph clustering algorithms (in parallel processes if several workers are selected),
+    # algorithms with a resolution (Leiden) are computed once per resolution
+    selected_algorithms = [algo for algo, algo_params in CLUSTERING_ALGORITHMS.items()
+                           if params[algo] and not params.get(algo_params.get('param_restriction', None), None)]
+    clustering_keys = get_clustering_keys(selected_algorithms, params[Constants.RESOLUTIONS])
+    # the stages of the algorithms computed in worker processes are only logged, the profile has their total
+    with profile_stage("Graph clustering - algorithms", algorithms=len(clustering_keys)):
         try:
-            # call the clustering method on iGraph with the right attributes
-            result = getattr(iGraph, method[0])(**method[1])
-            logging.info("Graph clustering - {} computed in {:.4f} seconds".format(label, time.time()-start_time))
+            memberships = run_algorithms(compact_graph, compute_clustering_task, clustering_keys,
+                                         workers=params[Constants.WORKERS], timeout=params[Constants.TIMEOUT])
         except Exception as e:
-            raise AlgorithmError("Error while computing {}: {}".format(label, e))
-        else:
-            if isinstance(result, igraph.clustering.VertexDendrogram):
-                # create a unique connected dendogram for when the graph is not connected
-                fix_dendrogram(iGraph, result)
-                clusters = result.as_clustering()
-            elif isinstance(result, igraph.clustering.VertexClustering):
-                clusters = result
-            else:
-                raise ValueError("Not a VertexDendrogram nor a VertexClustering !")
-            membership = clusters.membership
-
-            results_df = pd.DataFrame(columns=[Constants.NODE_NAME, label])
-            results_df[Constants.NODE_NAME] = iGraph.vs["name"]
-            results_df[label] = membership
-
-            # merge result dataframe into output_df (merge both with source and target columns if output a dataset of edges)
-            for node_col in node_columns:
-                output_df = output_df.merge(results_df, left_on=params[node_col], right_on=Constants.NODE_NAME, how='left',
-                                            suffixes=('_source', '_target')).drop([Constants.NODE_NAME], axis=1)
-
-output_dataset.write_with_schema(output_df)
+            raise AlgorithmError(str(e))
+
+    node_features = NodeFeatures(compact_graph, has_missing_nodes=edges.has_missing_nodes)
+    for key, membership in zip(clustering_keys, memberships):
+        label = get_clustering_label(key)
+        features = {label: membership}
+        if isinstance(key, tuple):
+            # the modularity of the clusters of each resolution, to compare the resolutions
+            modularity = compute_modularity(compact_graph, membership)
+            logging.info("Graph clustering - {}: {} clusters, modularity {:.4f}".format(label, max(membership, default=-1) + 1, modularity))
+            features[label + '_modularity'] = np.full(compact_graph.node_count, modularity)
+        node_features.add(features)
+
+    # output one row per node, or all the rows of edges with the clusters of both their source and target nodes
+    if params[Constants.OUTPUT_TYPE] == 'output_edges':
+        write_edges_with_features(input_dataset, output_dataset, node_features, [source, target])
+    else:
+        output_dataset.write_with_schema(node_features.get_nodes_dataframe(source))
+
+write_profile(profiler, profile_dataset)
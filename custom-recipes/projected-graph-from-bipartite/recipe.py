@@ -1,59 +1,58 @@
 # -*- coding: utf-8 -*-
 from dataiku.customrecipe import get_recipe_config
-from graph_analytics_utils import get_input_dataset, get_output_dataset, get_bipartite_recipe_params
+from graph_analytics_utils import get_input_dataset, get_output_dataset, get_bipartite_recipe_params, load_edges, get_graph_cache, write_chunks, write_profile
 from graph_analytics_constants import Constants
+from dku_graph_analytics.bipartite_projection import get_incidence_matrix, BipartiteProjection
+from dku_profiling.profiler import RunProfiler, profile_stage
 import pandas as pd
-import networkx as nx
-from networkx.algorithms import bipartite
 import logging
-import time
 
 
 # Read recipe config
 input_dataset = get_input_dataset('Input Dataset')
 output_dataset = get_output_dataset('Output Dataset')
+profile_dataset = get_output_dataset('profile_dataset')
 
 recipe_config = get_recipe_config()
 params = get_bipartite_recipe_params(recipe_config)
 
-# List of necessary columns
-columns = []
-columns.append(params[Constants.GRAPH_OF])
-columns.append(params[Constants.LINKED_BY])
-
-# Recipe input
-input_df = input_dataset.get_dataframe(columns=columns)
-logging.info("Projected graph - Dataset loaded")
-
-# Delete nulls
-input_df = input_df[(input_df[params[Constants.GRAPH_OF]].notnull()) & (input_df[params[Constants.LINKED_BY]].notnull())]
-logging.info("Projected graph - Null values removed")
-
-# Dedup
-deduplicated_df = input_df.groupby(columns).size().reset_index().rename(columns={0: 'w'})
-logging.info("Projected graph - Deduplicated dataset created")
-
-# Creating the Projected graph
-bipartite_graph = nx.Graph()
-bipartite_graph.add_nodes_from(deduplicated_df[params[Constants.GRAPH_OF]].unique(),  bipartite=0)
-bipartite_graph.add_nodes_from(deduplicated_df[params[Constants.LINKED_BY]].unique(), bipartite=1)
-bipartite_graph.add_edges_from(zip(deduplicated_df[params[Constants.GRAPH_OF]], deduplicated_df[params[Constants.LINKED_BY]]))
-logging.info("Projected graph - NetworkX graph created")
-
-start = time.time()
-logging.info("Projected graph - Creating projected graph...")
-# Projecting the main projected graph
-if params[Constants.WEIGHTED]:
-    projected_graph = bipartite.weighted_projected_graph(bipartite_graph, deduplicated_df[params[Constants.GRAPH_OF]].unique())
-    edges_list = [(src, tgt, w['weight']) for src, tgt, w in projected_graph.edges(data=True)]
-    output_df = pd.DataFrame(list(edges_list))
-    output_df.columns = [params[Constants.GRAPH_OF] + '_1', params[Constants.GRAPH_OF] + '_2', 'weight']
-else:
-    projected_graph = bipartite.projected_graph(bipartite_graph, deduplicated_df[params[Constants.GRAPH_OF]].unique(), multigraph=False)
-    # Outputting the corresponding data frame
-    output_df = pd.DataFrame(list(projected_graph.edges()))
-    output_df.columns = [params[Constants.GRAPH_OF] + '_1', params[Constants.GRAPH_OF] + '_2']
-
-logging.info("Projected graph - Projected graph computed in {:.4f} seconds".format(time.time()-start))
-
-output_dataset.write_with_schema(output_df)
+node_columns = [params[Constants.GRAPH_OF] + '_1', params[Constants.GRAPH_OF] + '_2']
+output_columns = node_columns + params[Constants.PROJECTION_WEIGHTS]
+
+
+def projected_edges_dataframes(projection, graph_of_labels, stage):
+    """ one dataframe of projected edges per block of rows of the projection """
+    edges_nb = 0
+    for sources, targets, weights in projection.iter_edges():
+        edges_nb += len(sources)
+        block_df = pd.DataFrame({node_columns[0]: graph_of_labels[sources], node_columns[1]: graph_of_labels[targets]})
+        for name, values in weights.items():
+            block_df[name] = values
+        yield block_df
+    stage.annotate(edges=edges_nb)
+    if edges_nb == 0:
+        yield pd.DataFrame(columns=output_columns)
+
+
+with RunProfiler("Projected graph", cprofile=params[Constants.CPROFILE]) as profiler:
+    # Recipe input: unique (graph_of, linked_by) pairs as node ids, rows with a null value are dropped
+    edges = load_edges(input_dataset, params[Constants.GRAPH_OF], params[Constants.LINKED_BY], bipartite=True, cache=get_graph_cache(params))
+    with profile_stage("Projected graph - Deduplicated edges") as stage:
+        graph_of_ids, linked_by_ids, _ = edges.get_edges()
+        graph_of_labels = edges.source_labels
+        stage.annotate(nodes=len(graph_of_labels), edges=len(graph_of_ids))
+
+    # sparse graph_of x linked_by incidence matrix, the projected graph is its product with its transpose
+    with profile_stage("Projected graph - Incidence matrix"):
+        incidence = get_incidence_matrix(graph_of_ids, linked_by_ids, len(graph_of_labels), len(edges.target_labels))
+
+    # hubs are pruned before the projection, weak edges and edges outside of the top-k of both nodes by block
+    projection = BipartiteProjection(incidence, max_degree=params[Constants.HUB_MAX_DEGREE], hub_mode=params[Constants.HUB_MODE],
+                                     min_weight=params[Constants.MIN_WEIGHT], top_k=params[Constants.TOP_K],
+                                     weights=params[Constants.PROJECTION_WEIGHTS])
+
+    logging.info("Projected graph - Creating projected graph...")
+    with profile_stage("Projected graph - Projected graph") as stage:
+        write_chunks(output_dataset, projected_edges_dataframes(projection, graph_of_labels, stage))
+
+write_profile(profiler, profile_dataset)
@@ -1,81 +1,66 @@
 from dataiku.customrecipe import get_recipe_config
-from graph_analytics_utils import get_input_dataset, get_output_dataset, get_analytics_recipe_params, AlgorithmError
+from graph_analytics_utils import get_input_dataset, get_output_dataset, get_analytics_recipe_params, load_edges, get_graph_cache, write_edges_with_features, write_profile, AlgorithmError
 from graph_analytics_constants import Constants
-from dku_graph_analytics.graph_analytics import GRAPH_ALGORITHMS
-import logging
-import time
+from dku_graph_analytics.graph_analytics import GRAPH_ALGORITHMS, compute_graph_algorithm_task, get_networkx_graph
+from dku_graph_analytics.fast_graph_analytics import connected_components
+from dku_graph_analytics.algorithm_runner import run_algorithms
+from dku_graph_analytics.node_features import NodeFeatures
+from dku_profiling.profiler import RunProfiler, profile_stage
+from functools import partial
 import pandas as pd
 import networkx as nx
 
 
 input_dataset = get_input_dataset('Input Dataset')
 output_dataset = get_output_dataset('Output Dataset')
+profile_dataset = get_output_dataset('profile_dataset')
 
 recipe_config = get_recipe_config()
 params = get_analytics_recipe_params(recipe_config)
 
-input_df = input_dataset.get_dataframe()
+with RunProfiler("Graph analytics", cprofile=params[Constants.CPROFILE]) as profiler:
+    edges = load_edges(input_dataset, params[Constants.SOURCE], params[Constants.TARGET], directed=params[Constants.DIRECTED], cache=get_graph_cache(params))
+    with profile_stage("Graph analytics - Compact graph") as stage:
+        compact_graph = edges.get_graph()
+        stage.annotate(nodes=compact_graph.node_count, edges=compact_graph.edge_count)
 
-start = time.time()
-logging.info("Graph analytics - Creating NetworkX graph ...")
-if params[Constants.DIRECTED]:
-    graph = nx.from_pandas_edgelist(input_df, source=params[Constants.SOURCE], target=params[Constants.TARGET], create_using=nx.DiGraph)
-else:
-    graph = nx.from_pandas_edgelist(input_df, source=params[Constants.SOURCE], target=params[Constants.TARGET], create_using=nx.Graph)
-logging.info("Graph analytics - NetworkX graph created in {:.4f} seconds".format(time.time()-start))
+    # Always run: nodes degree
+    with profile_stage("Graph analytics - degree"):
+        node_features = NodeFeatures(compact_graph, has_missing_nodes=edges.has_missing_nodes)
+        node_features.add({'degree': compact_graph.degree()})
 
-# Always run: nodes degree
-start = time.time()
-logging.info("Graph analytics - Computing degree ...")
-deg = pd.Series(nx.degree(graph), name='degree')
-deg_df = pd.DataFrame(list(deg), columns=[Constants.NODE_NAME, 'degree'])
-logging.info("Graph analytics - degree computed in {:.4f} seconds".format(time.time()-start))
+    # computing all selected graph features algorithms (in parallel processes if several workers are selected)
+    selected_algorithms = [algo for algo, algo_params in GRAPH_ALGORITHMS.items()
+                           if params[algo] and not params.get(algo_params.get('param_restriction', None), None)]
+    # the stages of the algorithms computed in worker processes are only logged, the profile has their total
+    with profile_stage("Graph analytics - algorithms", algorithms=len(selected_algorithms)):
+        try:
+            results = run_algorithms(compact_graph, partial(compute_graph_algorithm_task, params=params), selected_algorithms,
+                                     workers=params[Constants.WORKERS], timeout=params[Constants.TIMEOUT])
+        except Exception as e:
+            raise AlgorithmError(str(e))
+    for result in results:
+        node_features.add_dataframe(result)
 
-algo_series = {"degrees": deg_df}
+    if not params[Constants.DIRECTED]:
+        with profile_stage("Graph analytics - connected_components") as stage:
+            if params[Constants.ENGINE] == Constants.FASTEST_ENGINE:
+                components_df = pd.DataFrame({Constants.NODE_NAME: compact_graph.labels, 'connected_component_id': connected_components(compact_graph)})
+            else:
+                connected_components_dict = {}
+                for component_id, component in enumerate(nx.connected_components(get_networkx_graph(compact_graph))):
+                    for element in component:
+                        connected_components_dict[element] = component_id
+                components_df = pd.Series(connected_components_dict, name='connected_component_id').reset_index()
+                components_df.columns = [Constants.NODE_NAME, 'connected_component_id']
+            components_df['connected_component_size'] = components_df.groupby('connected_component_id')['connected_component_id'].transform('count')
+            node_features.add_dataframe(components_df)
+            stage.annotate(components=int(components_df['connected_component_id'].nunique()))
 
-# output all edges or only nodes
-if params[Constants.OUTPUT_TYPE] == 'output_edges':
-    # keep all rows in output
-    output_df = input_df
-    node_columns = [Constants.SOURCE, Constants.TARGET]  # merge graph features with both source and target node columns
-else:
-    # output one row per node
-    output_df = deg_df[Constants.NODE_NAME].to_frame()
-    output_df.columns = [params[Constants.SOURCE]]
-    node_columns = [Constants.SOURCE]
+    # output one row per node, or all the rows of edges with the features of both their source and target nodes
+    if params[Constants.OUTPUT_TYPE] == 'output_edges':
+        write_edges_with_features(input_dataset, output_dataset, node_features, [params[Constants.SOURCE], params[Constants.TARGET]])
+    else:
+        output_dataset.write_with_schema(node_features.get_nodes_dataframe(params[Constants.SOURCE]))
 
-# computing all selected graph features algorithms
-for algo, algo_params in GRAPH_ALGORITHMS.items():
-    label, method = algo_params['label'], algo_params['method']
-    if params[algo]:
-        if not params.get(algo_params.get('param_restriction', None), None):
-            start = time.time()
-            logging.info("Graph analytics - Computing {} ...".format(label))
-            try:
-                pd_series = pd.Series(method[0](graph, **method[1]), name=label).reset_index()
-                pd_series.columns = [Constants.NODE_NAME, label]
-                algo_series[label] = pd_series
-                logging.info("Graph analytics - {} computed in {:.4f} seconds".format(label, time.time()-start))
-            except Exception as e:
-                raise AlgorithmError("Error while computing {}: {}".format(label, e))
-
-if not params[Constants.DIRECTED]:
-    start = time.time()
-    logging.info("Graph analytics - Computing connected_components ...")
-    connected_components_dict = {}
-    for component_id, component in enumerate(nx.connected_components(graph)):
-        for element in component:
-            connected_components_dict[element] = component_id
-    connected_components = pd.Series(connected_components_dict, name='connected_component_id').reset_index()
-    connected_components.columns = [Constants.NODE_NAME, 'connected_component_id']
-    connected_components['connected_component_size'] = connected_components.groupby('connected_component_id')['connected_component_id'].transform('count')
-    algo_series["connected_component"] = connected_components
-    logging.info("Graph analytics - connected_components computed in {:.4f} seconds".format(time.time()-start))
-
-# merge all series into one (merge both with source and target columns if output a dataset of edges)
-for series in algo_series.values():
-    for node_col in node_columns:
-        output_df = output_df.merge(series, left_on=params[node_col], right_on=Constants.NODE_NAME, how='left',
-                                    suffixes=('_source', '_target')).drop([Constants.NODE_NAME], axis=1)
-
-output_dataset.write_with_schema(output_df)
+write_profile(profiler, profile_dataset)
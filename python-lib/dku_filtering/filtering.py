@@ -1,5 +1,37 @@
+import numpy as np
 import pandas as pd
-from functools import reduce
+from dku_graph.dataset_reader import iter_dataset_chunks
+
+
+DATE_PARTS = {
+    # date filter type: (date part, offset between the excluded values of the filter and the date part),
+    # without offset the excluded values are compared as they are (string keys of the filter) like in the previous versions
+    "YEAR": ("year", None),
+    "QUARTER_OF_YEAR": ("quarter", 1),
+    "MONTH_OF_YEAR": ("month", 1),
+    "WEEK_OF_YEAR": ("week", 1),
+    "DAY_OF_MONTH": ("day", 1),
+    "DAY_OF_WEEK": ("dayofweek", None),
+    "HOUR_OF_DAY": ("hour", None)
+}
+
+
+class DateParts:
+    """ date parts of the columns of a dataframe, each part of a column is computed once for all the filters """
+
+    def __init__(self, df):
+        self.df = df
+        self.parts = {}
+
+    def get(self, column, part):
+        if (column, part) not in self.parts:
+            dates = self.df[column].dt
+            if part == "week" and hasattr(dates, "isocalendar"):
+                # Series.dt.week is deprecated since pandas 1.1, the ISO week is used instead
+                self.parts[(column, part)] = dates.isocalendar().week
+            else:
+                self.parts[(column, part)] = getattr(dates, part)
+        return self.parts[(column, part)]
 
 
 def numerical_filter(df, filter):
@@ -28,11 +60,11 @@ def alphanum_filter(df, filter):
     return conditions
 
 
-def date_filter(df, filter):
+def date_filter(df, filter, date_parts):
     if filter["dateFilterType"] == "RANGE":
         return date_range_filter(df, filter)
     else:
-        return special_date_filter(df, filter)
+        return special_date_filter(filter, date_parts)
 
 
 def date_range_filter(df, filter):
@@ -44,59 +76,115 @@ def date_range_filter(df, filter):
     return conditions
 
 
-def special_date_filter(df, filter):
-    conditions = []
-    excluded_values = []
-    for k, v in filter['excludedValues'].items():
-        if v:
-            excluded_values += [k]
-    if len(excluded_values) > 0:
-        if filter["dateFilterType"] == "YEAR":
-            conditions += [~df[filter['column']].dt.year.isin(excluded_values)]
-        elif filter["dateFilterType"] == "QUARTER_OF_YEAR":
-            conditions += [~df[filter['column']].dt.quarter.isin([int(k)+1 for k in excluded_values])]
-        elif filter["dateFilterType"] == "MONTH_OF_YEAR":
-            conditions += [~df[filter['column']].dt.month.isin([int(k)+1 for k in excluded_values])]
-        elif filter["dateFilterType"] == "WEEK_OF_YEAR":
-            conditions += [~df[filter['column']].dt.week.isin([int(k)+1 for k in excluded_values])]
-        elif filter["dateFilterType"] == "DAY_OF_MONTH":
-            conditions += [~df[filter['column']].dt.day.isin([int(k)+1 for k in excluded_values])]
-        elif filter["dateFilterType"] == "DAY_OF_WEEK":
-            conditions += [~df[filter['column']].dt.dayofweek.isin(excluded_values)]
-        elif filter["dateFilterType"] == "HOUR_OF_DAY":
-            conditions += [~df[filter['column']].dt.hour.isin(excluded_values)]
-        else:
-            raise Exception("Unknown date filter.")
+def special_date_filter(filter, date_parts):
+    excluded_values = [k for k, v in filter['excludedValues'].items() if v]
+    if len(excluded_values) == 0:
+        return []
+    if filter["dateFilterType"] not in DATE_PARTS:
+        raise Exception("Unknown date filter.")
+    part, offset = DATE_PARTS[filter["dateFilterType"]]
+    values = date_parts.get(filter['column'], part)
+    if offset is not None:
+        excluded_values = [int(k) + offset for k in excluded_values]
+    return [~values.isin(excluded_values)]
 
-    return conditions
 
+def get_filter_conditions(df, filter, date_parts):
+    """ list of boolean series of the rows of df verifying the conditions of the filter """
+    if filter["filterType"] == "NUMERICAL_FACET":
+        return numerical_filter(df, filter)
+    elif filter["filterType"] == "ALPHANUM_FACET":
+        return alphanum_filter(df, filter)
+    elif filter["filterType"] == "DATE_FACET":
+        return date_filter(df, filter, date_parts)
+    return []
 
-def apply_filter_conditions(df, conditions):
+
+def get_filters_mask(df, filters):
     """
-    return a function to apply filtering conditions on df
+    compile all the filters into one boolean mask of the rows of df to keep, and for each filter the number of rows
+    it excludes (excluded_rows) and the number of rows it removes after the previous filters (removed_rows)
     """
-    if len(conditions) == 0:
-        return df
-    elif len(conditions) == 1:
-        return df[conditions[0]]
-    else:
-        return df[reduce(lambda c1, c2: c1 & c2, conditions[1:], conditions[0])]
+    mask = np.ones(len(df), dtype=bool)
+    date_parts = DateParts(df)
+    stats = []
+    for filter in filters:
+        try:
+            conditions = get_filter_conditions(df, filter, date_parts)
+        except Exception as e:
+            raise Exception("Error with filter on column {} - {}".format(filter["column"], e))
+        filter_mask = np.ones(len(df), dtype=bool)
+        for condition in conditions:
+            filter_mask &= condition.to_numpy(dtype=bool, na_value=False)
+        stats.append({
+            'column': filter.get('column'),
+            'filterType': filter["filterType"],
+            'excluded_rows': int(len(df) - np.count_nonzero(filter_mask)),
+            'removed_rows': int(np.count_nonzero(mask & ~filter_mask))
+        })
+        mask &= filter_mask
+    return mask, stats
+
+
+def apply_filters(df, filters):
+    """
+    return the input dataframe df with filters applied to it (possibly empty) and the stats of the filters (see get_filters_mask)
+    """
+    mask, stats = get_filters_mask(df, filters)
+    return (df if mask.all() else df[mask]), stats
 
 
 def filter_dataframe(df, filters):
     """
     return the input dataframe df with filters applied to it
     """
-    for filter in filters:
-        try:
-            if filter["filterType"] == "NUMERICAL_FACET":
-                df = apply_filter_conditions(df, numerical_filter(df, filter))
-            elif filter["filterType"] == "ALPHANUM_FACET":
-                df = apply_filter_conditions(df, alphanum_filter(df, filter))
-            elif filter["filterType"] == "DATE_FACET":
-                df = apply_filter_conditions(df, date_filter(df, filter))
-        except Exception as e:
-            raise Exception("Error with filter on column {} - {}".format(filter["column"], e))
+    df, _ = apply_filters(df, filters)
     if df.empty:
         raise Exception("Dataframe is empty after filtering")
     return df
+
+
+def add_filters_stats(total_stats, stats):
+    """ sum the counts of the stats of the filters on another chunk """
+    if total_stats is None:
+        return [dict(filter_stats) for filter_stats in stats]
+    for total_filter_stats, filter_stats in zip(total_stats, stats):
+        for key in ['excluded_rows', 'removed_rows']:
+            total_filter_stats[key] += filter_stats[key]
+    return total_stats
+
+
+def get_filter_columns(filters):
+    return [filter['column'] for filter in filters if filter.get('column')]
+
+
+def read_filtered_dataframe(dataset, columns, filters, max_rows, node_columns=None, max_nodes=None, chunksize=10000):
+    """
+    stream the dataset by chunks of the columns and the filter columns, apply the filters on each chunk and stop
+    when max_rows filtered rows are gathered or, when max_nodes is set, when the node_columns of the filtered rows
+    contain max_nodes distinct nodes (the graph of the chart is cut at the row where max_nodes nodes are reached),
+    return the filtered rows and the stats of the filters on the rows that were read,
+    string columns are read as strings like in the recipes (see dku_graph.dataset_reader)
+    """
+    columns = list(dict.fromkeys(list(columns) + get_filter_columns(filters)))
+    chunks, rows_nb, read_rows_nb, nodes, filters_stats = [], 0, 0, set(), None
+    for chunk in iter_dataset_chunks(dataset, columns, chunksize=chunksize):
+        read_rows_nb += len(chunk)
+        chunk, chunk_stats = apply_filters(chunk, filters)
+        filters_stats = add_filters_stats(filters_stats, chunk_stats)
+        chunk = chunk.iloc[:max_rows - rows_nb]
+        if chunk.empty:
+            continue
+        chunks.append(chunk)
+        rows_nb += len(chunk)
+        if max_nodes is not None:
+            for column in node_columns:
+                nodes.update(chunk[column].dropna().unique())
+        if rows_nb >= max_rows or (max_nodes is not None and len(nodes) >= max_nodes):
+            break
+    if read_rows_nb == 0:
+        raise Exception("Dataframe is empty")
+    if rows_nb == 0:
+        raise Exception("Dataframe is empty after filtering")
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0].reset_index(drop=True)
+    return df, {'read_rows': read_rows_nb, 'filters': filters_stats or []}
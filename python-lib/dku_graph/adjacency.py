@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class AdjacencyIndex:
+    """
+    CSR adjacency arrays (indptr, indices) of a CompactGraph to answer neighborhood queries with breadth-first searches
+    on whole frontiers of nodes, edges are followed in both directions unless directed is True
+    """
+
+    def __init__(self, compact_graph, directed=False):
+        self.compact_graph = compact_graph
+        adjacency = compact_graph.to_scipy_sparse(weighted=False)
+        if compact_graph.directed and not directed:
+            adjacency = (adjacency + adjacency.T).tocsr()
+        adjacency.sort_indices()
+        self.indptr, self.indices = adjacency.indptr, adjacency.indices
+
+    @property
+    def node_count(self):
+        return len(self.indptr) - 1
+
+    def neighbors(self, frontier):
+        """ neighbors of all the nodes of the frontier (with duplicates) and the index in frontier of the node they come from """
+        starts = self.indptr[frontier]
+        counts = self.indptr[np.asarray(frontier) + 1] - starts
+        origins = np.repeat(np.arange(len(frontier)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.indices[starts[origins] + offsets], origins
+
+    def distances(self, sources, max_depth=None, target=None):
+        """
+        number of hops from the closest source to each node (-1 when not reached within max_depth)
+        and parent of each reached node on a shortest path (-1 for the sources), the search stops when target is reached
+        """
+        distances = np.full(self.node_count, -1, dtype=np.int64)
+        parents = np.full(self.node_count, -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        distances[frontier] = 0
+        depth = 0
+        while len(frontier) > 0 and (max_depth is None or depth < max_depth) and (target is None or distances[target] < 0):
+            depth += 1
+            neighbors, origins = self.neighbors(frontier)
+            new = distances[neighbors] < 0
+            neighbors, first_indices = np.unique(neighbors[new], return_index=True)
+            distances[neighbors] = depth
+            parents[neighbors] = frontier[origins[new][first_indices]]
+            frontier = neighbors
+        return distances, parents
+
+    def k_hop_neighborhood(self, node, depth):
+        """ ids of the nodes at most depth hops away from node and their distance to node """
+        distances, _ = self.distances([node], max_depth=depth)
+        nodes = np.flatnonzero(distances >= 0)
+        return nodes, distances[nodes]
+
+    def shortest_path(self, source, target):
+        """ ids of the nodes of a shortest path from source to target, empty if target cannot be reached """
+        _, parents = self.distances([source], target=target)
+        if source != target and parents[target] < 0:
+            return np.array([], dtype=np.int64)
+        path = [target]
+        while path[-1] != source:
+            path.append(parents[path[-1]])
+        return np.array(path[::-1], dtype=np.int64)
+
+    def ego_network(self, node, depth):
+        """ nodes of the k-hop neighborhood of node, their distance to node and the edges of the graph between them """
+        nodes, distances = self.k_hop_neighborhood(node, depth)
+        inside = np.zeros(self.compact_graph.node_count, dtype=bool)
+        inside[nodes] = True
+        sources, targets = self.compact_graph.sources, self.compact_graph.targets
+        edges = np.flatnonzero(inside[sources] & inside[targets])
+        return nodes, distances, np.column_stack([sources[edges], targets[edges]])
+
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from dku_graph.compact_graph import CompactGraph
+
+
+ARTIFACT_FORMAT = 1
+EDGE_ARRAYS = ['sources', 'targets', 'weights']
+
+
+class GraphArtifact:
+    """
+    normalized edges of a dataset: node labels, arrays of unique edges (node ids) and their aggregated weights,
+    with bipartite=True sources and targets have separate labels, rows_nb and has_missing_nodes describe the rows read
+    """
+
+    def __init__(self, source_labels, target_labels, sources, targets, weights, directed=False, bipartite=False,
+                 rows_nb=0, has_missing_nodes=False):
+        self.source_labels = source_labels
+        self.target_labels = target_labels
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+        self.directed = directed or bipartite
+        self.bipartite = bipartite
+        self.rows_nb = rows_nb
+        self.has_missing_nodes = has_missing_nodes
+
+    @classmethod
+    def from_accumulator(cls, accumulator):
+        sources, targets, weights = accumulator.get_edges()
+        source_labels = accumulator.source_indexer.labels
+        target_labels = accumulator.target_indexer.labels if accumulator.bipartite else source_labels
+        return cls(source_labels, target_labels, sources, targets, weights, directed=accumulator.directed,
+                   bipartite=accumulator.bipartite, rows_nb=accumulator.rows_nb, has_missing_nodes=accumulator.has_missing_nodes)
+
+    def get_edges(self):
+        """ return the arrays of unique edges: source ids, target ids and aggregated weights """
+        return self.sources, self.targets, self.weights
+
+    def get_graph(self):
+        return CompactGraph(self.source_labels, self.sources, self.targets, self.weights, directed=self.directed)
+
+
+def _save_labels(directory, name, labels):
+    """
+    save labels as a .npy file when they are numbers or dates, strings are saved as their utf-8 concatenation
+    and the offsets of each label (in characters), return False when labels cannot be saved (mixed types)
+    """
+    if labels.dtype.kind in 'biufM':
+        np.save(os.path.join(directory, name + '.npy'), labels)
+        return True
+    if not all(isinstance(label, str) for label in labels):
+        return False
+    try:
+        text = ''.join(labels).encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum([len(label) for label in labels], out=offsets[1:])
+    np.save(os.path.join(directory, name + '_offsets.npy'), offsets)
+    with open(os.path.join(directory, name + '.utf8'), 'wb') as text_file:
+        text_file.write(text)
+    return True
+
+
+def _load_labels(directory, name):
+    path = os.path.join(directory, name + '.npy')
+    if os.path.exists(path):
+        return np.asarray(np.load(path, mmap_mode='r'))
+    offsets = np.load(os.path.join(directory, name + '_offsets.npy')).tolist()
+    with open(os.path.join(directory, name + '.utf8'), 'rb') as text_file:
+        text = text_file.read().decode('utf-8')
+    labels = np.empty(len(offsets) - 1, dtype=object)
+    labels[:] = [text[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    return labels
+
+
+def _get_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+class GraphArtifactCache:
+    """
+    on-disk cache of GraphArtifact, one directory of .npy files per artifact (edge arrays are memory-mapped when loaded),
+    keyed on a hash of the dataset, its version and the settings used to read the edges,
+    the least recently used artifacts are removed when the cache exceeds max_size_mb,
+    the cache directory is created private (0o700), an existing one is only used if it is owned by the current user
+    and not accessible to other users (artifacts contain the node labels and their keys are predictable)
+    """
+
+    def __init__(self, directory, max_size_mb=1024):
+        self.directory = directory
+        self.max_size_mb = max_size_mb
+        self._lock = threading.Lock()
+
+    def is_private(self, create=False):
+        """ whether the cache directory can be used, it is created (private) when create is True """
+        if not os.path.isdir(self.directory):
+            if not create:
+                return False
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        status = os.stat(self.directory)
+        if status.st_uid != os.getuid() or status.st_mode & 0o077:
+            logging.warning("Graph cache not used: directory {} must be owned by the current user and not accessible to other users".format(
+                self.directory))
+            return False
+        return True
+
+    def get_key(self, **params):
+        description = json.dumps(dict(params, format=ARTIFACT_FORMAT), sort_keys=True, default=str)
+        return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """ return the artifact of key, None if it is not in the cache (or cannot be read) """
+        if not self.is_private():
+            return None
+        path = self._get_path(key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as meta_file:
+                meta = json.load(meta_file)
+            sources, targets, weights = (np.asarray(np.load(os.path.join(path, name + '.npy'), mmap_mode='r')) for name in EDGE_ARRAYS)
+            source_labels = _load_labels(path, 'source_labels')
+            target_labels = _load_labels(path, 'target_labels') if meta['bipartite'] else source_labels
+            # the modification time of the meta file is the last access time of the artifact
+            os.utime(os.path.join(path, 'meta.json'))
+        except (IOError, OSError, ValueError, KeyError) as e:
+            if os.path.exists(path):
+                logging.warning("Graph artifact {} cannot be read, it is removed: {}".format(key, e))
+                shutil.rmtree(path, ignore_errors=True)
+            return None
+        return GraphArtifact(source_labels, target_labels, sources, targets, weights, directed=meta['directed'],
+                             bipartite=meta['bipartite'], rows_nb=meta['rows_nb'], has_missing_nodes=meta['has_missing_nodes'])
+
+    def save(self, key, artifact, params=None):
+        """
+        write the artifact in a temporary directory renamed into the cache (concurrent runs never see partial artifacts),
+        return False if its labels cannot be saved or the cache directory is not private
+        """
+        if not self.is_private(create=True):
+            return False
+        path = self._get_path(key)
+        temporary_path = "{}.tmp-{}-{}".format(path, os.getpid(), threading.get_ident())
+        os.makedirs(temporary_path, mode=0o700)
+        try:
+            if not _save_labels(temporary_path, 'source_labels', artifact.source_labels) or \
+                    (artifact.bipartite and not _save_labels(temporary_path, 'target_labels', artifact.target_labels)):
+                logging.info("Graph artifact {} not cached: node labels are neither numbers, dates nor strings".format(key))
+                return False
+            for name, values in zip(EDGE_ARRAYS, artifact.get_edges()):
+                np.save(os.path.join(temporary_path, name + '.npy'), np.asarray(values))
+            meta = {'params': params, 'directed': artifact.directed, 'bipartite': artifact.bipartite,
+                    'rows_nb': artifact.rows_nb, 'has_missing_nodes': artifact.has_missing_nodes}
+            with open(os.path.join(temporary_path, 'meta.json'), 'w') as meta_file:
+                json.dump(meta, meta_file, default=str)
+            try:
+                os.rename(temporary_path, path)
+            except OSError:
+                # saved in the meantime by another run
+                return True
+        finally:
+            shutil.rmtree(temporary_path, ignore_errors=True)
+        self.cleanup(keep=key)
+        return True
+
+    def get_or_compute(self, params, compute):
+        """ return the cached artifact of params, or compute it with compute() and cache it """
+        key = self.get_key(**params)
+        artifact = self.load(key)
+        if artifact is not None:
+            logging.info("Graph artifact {} loaded from {}".format(key, self.directory))
+            return artifact
+        artifact = compute()
+        start = time.time()
+        if self.save(key, artifact, params):
+            logging.info("Graph artifact {} saved in {:.4f} seconds".format(key, time.time()-start))
+        return artifact
+
+    def get_artifacts(self):
+        """ (last access time, size in bytes, key) of the artifacts of the cache, least recently used first """
+        artifacts = []
+        if not os.path.isdir(self.directory):
+            return artifacts
+        for entry in os.scandir(self.directory):
+            meta_path = os.path.join(entry.path, 'meta.json')
+            if entry.is_dir() and os.path.exists(meta_path):
+                artifacts.append((os.path.getmtime(meta_path), _get_size(entry.path), entry.name))
+        return sorted(artifacts)
+
+    def cleanup(self, keep=None):
+        """ remove the least recently used artifacts (except keep) until the cache is at most max_size_mb """
+        with self._lock:
+            artifacts = self.get_artifacts()
+            total_size = sum(size for _, size, _ in artifacts)
+            for _, size, key in artifacts:
+                if total_size <= self.max_size_mb * 1024 * 1024:
+                    break
+                if key != keep:
+                    shutil.rmtree(self._get_path(key), ignore_errors=True)
+                    total_size -= size
+                    logging.info("Graph artifact {} removed from the cache".format(key))
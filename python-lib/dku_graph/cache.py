@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    thread-safe least recently used cache of at most max_size values, values older than ttl seconds (or the ttl given
+    when they are put) expire, the number of hits and misses are counted
+    """
+
+    def __init__(self, max_size=8, ttl=3600, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and self.clock() - entry[0] > entry[2]:
+                del self._values[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._values.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (self.clock(), value, self.ttl if ttl is None else ttl)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """ return the cached value of key, or compute it with compute() and cache it (for ttl seconds if given) """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value, ttl)
+        return value
+
+    def invalidate(self, match=None):
+        """ remove all the values, or the values whose key verifies match(key) """
+        with self._lock:
+            for key in [key for key in self._values if match is None or match(key)]:
+                del self._values[key]
+
+    def stats(self):
+        return {'size': len(self._values), 'hits': self.hits, 'misses': self.misses}
+
+    def __len__(self):
+        return len(self._values)
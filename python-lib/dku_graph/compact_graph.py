@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+import igraph
+import networkx as nx
+from scipy import sparse
+
+
+def aggregate_edges(sources, targets, weights=None, directed=False):
+    """
+    remove edges with a missing node (-1 id), store undirected edges with source id <= target id
+    and aggregate duplicated edges: weights are summed (missing weights count as 0) or counted when there are no weights
+    """
+    valid = (sources >= 0) & (targets >= 0)
+    sources, targets = sources[valid].astype(np.int64), targets[valid].astype(np.int64)
+    if not directed:
+        sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+
+    key_base = int(targets.max()) + 1 if len(targets) > 0 else 1
+    unique_keys, inverse = np.unique(sources * key_base + targets, return_inverse=True)
+    if weights is None:
+        aggregated_weights = np.bincount(inverse, minlength=len(unique_keys))
+    else:
+        weights = np.asarray(weights)[valid]
+        if weights.dtype.kind in 'iub':
+            aggregated_weights = np.bincount(inverse, weights=weights, minlength=len(unique_keys)).astype(np.int64)
+        else:
+            aggregated_weights = np.bincount(inverse, weights=np.nan_to_num(weights.astype(float)), minlength=len(unique_keys))
+    return unique_keys // key_base, unique_keys % key_base, aggregated_weights
+
+
+class CompactGraph:
+    """
+    class to store a graph as integer-indexed numpy arrays, the id of a node is its position in the labels array:
+    - labels: array of node labels
+    - sources, targets, weights: arrays of unique edges (node ids and aggregated weight)
+    - indptr, indices, data: CSR adjacency arrays (edges in both directions for undirected graphs), built on first access
+    """
+
+    def __init__(self, labels, sources, targets, weights=None, directed=False):
+        self.labels = labels
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights if weights is not None else np.ones(len(sources), dtype=np.int64)
+        self.directed = directed
+        self._csr = None
+        self._node_index = None
+
+    @classmethod
+    def from_dataframe(cls, df, source, target, weight=None, directed=False):
+        """
+        factorize the source and target columns together (node ids follow the order of first appearance)
+        and create a graph with unique edges, see from_codes
+        """
+        sources, targets = df[source].values, df[target].values
+        if sources.dtype != targets.dtype:
+            sources, targets = sources.astype(object), targets.astype(object)
+        codes, labels = pd.factorize(np.column_stack([sources, targets]).ravel())
+        codes = codes.reshape(-1, 2)
+        weights = df[weight].values if weight else None
+        return cls.from_codes(labels, codes[:, 0], codes[:, 1], weights=weights, directed=directed)
+
+    @classmethod
+    def from_codes(cls, labels, sources, targets, weights=None, directed=False):
+        """ create a graph from arrays of node ids, see aggregate_edges """
+        sources, targets, weights = aggregate_edges(sources, targets, weights, directed=directed)
+        return cls(labels, sources, targets, weights, directed=directed)
+
+    @property
+    def node_count(self):
+        return len(self.labels)
+
+    @property
+    def edge_count(self):
+        return len(self.sources)
+
+    @property
+    def indptr(self):
+        return self._get_csr()[0]
+
+    @property
+    def indices(self):
+        return self._get_csr()[1]
+
+    @property
+    def data(self):
+        return self._get_csr()[2]
+
+    def _get_csr(self):
+        """ sort the edges (in both directions if undirected) by source id to build the CSR adjacency arrays """
+        if self._csr is None:
+            if self.directed:
+                rows, columns, data = self.sources, self.targets, self.weights
+            else:
+                not_loop = self.sources != self.targets
+                rows = np.concatenate([self.sources, self.targets[not_loop]])
+                columns = np.concatenate([self.targets, self.sources[not_loop]])
+                data = np.concatenate([self.weights, self.weights[not_loop]])
+            order = np.lexsort((columns, rows))
+            indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=self.node_count), out=indptr[1:])
+            self._csr = (indptr, columns[order], data[order])
+        return self._csr
+
+    def neighbors(self, node_id):
+        """ ids of the (out-)neighbors of a node """
+        return self.indices[self.indptr[node_id]:self.indptr[node_id + 1]]
+
+    def degree(self):
+        """ number of edges of each node (in + out edges when directed, self-loops count twice) """
+        return np.bincount(self.sources, minlength=self.node_count) + np.bincount(self.targets, minlength=self.node_count)
+
+    def get_node_ids(self, values):
+        """ return the node ids of an array of labels, -1 for labels that are not in the graph """
+        if self._node_index is None:
+            self._node_index = pd.Index(self.labels)
+        return self._node_index.get_indexer(values)
+
+    def to_scipy_sparse(self, weighted=True):
+        """ adjacency matrix (symmetric for undirected graphs) sharing the CSR arrays of the graph """
+        data = self.data if weighted else np.ones(len(self.indices))
+        return sparse.csr_matrix((data, self.indices, self.indptr), shape=(self.node_count, self.node_count), copy=False)
+
+    def iter_edge_pairs(self, chunksize=1000000):
+        """
+        (source id, target id) tuples of python ints, converted by chunks of edges: igraph converts the rows of a numpy
+        array one by one (more than twice slower), and tuples of the whole graph at once double the peak memory
+        """
+        for start in range(0, len(self.sources), chunksize):
+            yield from zip(self.sources[start:start + chunksize].tolist(), self.targets[start:start + chunksize].tolist())
+
+    def to_igraph(self, weighted=True, names=True, directed=None):
+        """ igraph graph where vertex i is node i, with 'weight' edge attribute and 'name' vertex attribute """
+        directed = self.directed if directed is None else directed
+        iGraph = igraph.Graph(n=self.node_count, edges=self.iter_edge_pairs(), directed=directed)
+        if weighted:
+            iGraph.es['weight'] = self.weights.tolist()
+        if names:
+            iGraph.vs['name'] = self.labels.tolist()
+        return iGraph
+
+    def to_networkx(self, weighted=True):
+        """ networkx graph with node labels as nodes, nodes are added in the order of their ids """
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        labels = self.labels.tolist()
+        graph.add_nodes_from(labels)
+        if weighted:
+            graph.add_weighted_edges_from(zip(self.labels[self.sources].tolist(), self.labels[self.targets].tolist(), self.weights.tolist()))
+        else:
+            graph.add_edges_from(zip(self.labels[self.sources].tolist(), self.labels[self.targets].tolist()))
+        return graph
+
+
+class NodeIndexer:
+    """ assign integer ids to node labels in the order of their first appearance, across several arrays of labels """
+
+    def __init__(self):
+        self.ids = {}
+
+    def get_ids(self, values):
+        """ return the ids of an array of labels (new labels get new ids), -1 for missing values """
+        codes, uniques = pd.factorize(values)
+        ids = self.ids
+        unique_ids = np.fromiter((ids.setdefault(label, len(ids)) for label in uniques), dtype=np.int64, count=len(uniques))
+        if len(uniques) == 0:
+            return np.full(len(codes), -1, dtype=np.int64)
+        return np.where(codes >= 0, unique_ids[codes], -1)
+
+    @property
+    def labels(self):
+        return pd.Series(list(self.ids), dtype=object if len(self.ids) == 0 else None).values
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class EdgeAccumulator:
+    """
+    accumulate chunks of a dataframe of edges as arrays of node ids and weights, the buffered edges are aggregated
+    (see aggregate_edges) each time they exceed buffer_size, so that memory scales with the number of unique edges
+    instead of the number of rows, with bipartite=True sources and targets have separate node ids
+    """
+
+    def __init__(self, directed=False, bipartite=False, buffer_size=5000000):
+        self.directed = directed or bipartite
+        self.bipartite = bipartite
+        self.buffer_size = buffer_size
+        self.source_indexer = NodeIndexer()
+        self.target_indexer = NodeIndexer() if bipartite else self.source_indexer
+        self.rows_nb = 0
+        self.has_missing_nodes = False
+        self._chunks = []
+        self._buffered_edges_nb = 0
+
+    def add_chunk(self, df, source, target, weight=None):
+        if self.bipartite:
+            sources, targets = self.source_indexer.get_ids(df[source].values), self.target_indexer.get_ids(df[target].values)
+        else:
+            # source and target of each row are interleaved so that ids follow the order of first appearance
+            sources, targets = df[source].values, df[target].values
+            if sources.dtype != targets.dtype:
+                sources, targets = sources.astype(object), targets.astype(object)
+            codes = self.source_indexer.get_ids(np.column_stack([sources, targets]).ravel()).reshape(-1, 2)
+            sources, targets = codes[:, 0], codes[:, 1]
+        weights = df[weight].values if weight else np.ones(len(df), dtype=np.int64)
+
+        self.rows_nb += len(df)
+        self.has_missing_nodes = self.has_missing_nodes or bool((sources < 0).any() or (targets < 0).any())
+        self._chunks.append(aggregate_edges(sources, targets, weights, directed=self.directed))
+        self._buffered_edges_nb += len(self._chunks[-1][0])
+        if self._buffered_edges_nb > self.buffer_size:
+            self._aggregate()
+
+    def _aggregate(self):
+        if len(self._chunks) > 1:
+            sources, targets, weights = (np.concatenate(arrays) for arrays in zip(*self._chunks))
+            self._chunks = [aggregate_edges(sources, targets, weights, directed=True)]
+        self._buffered_edges_nb = len(self._chunks[0][0]) if self._chunks else 0
+
+    def get_edges(self):
+        """ return the arrays of unique edges: source ids, target ids and aggregated weights """
+        self._aggregate()
+        if not self._chunks:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return self._chunks[0]
+
+    def get_graph(self):
+        sources, targets, weights = self.get_edges()
+        return CompactGraph(self.source_indexer.labels, sources, targets, weights, directed=self.directed)
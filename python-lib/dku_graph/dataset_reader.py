@@ -0,0 +1,53 @@
+import pandas as pd
+from dku_graph.compact_graph import EdgeAccumulator
+from dku_profiling.profiler import profile_stage
+
+
+CHUNK_SIZE = 100000
+INTEGER_TYPES = {'tinyint', 'smallint', 'int', 'bigint'}
+
+
+def get_column_types(dataset):
+    return {column['name']: column['type'] for column in dataset.read_schema()}
+
+
+def iter_dataset_chunks(dataset, columns=None, chunksize=CHUNK_SIZE):
+    """
+    read the given columns (all by default) of the dataset by chunks, columns that are strings in the dataset schema
+    are read as strings in every chunk so that labels do not depend on the chunk (other types are inferred by pandas)
+    """
+    column_types = get_column_types(dataset)
+    columns = list(column_types) if columns is None else columns
+    dtypes = {column: str for column in columns if column_types.get(column) == 'string'}
+    date_columns = [column for column in columns if column_types.get(column) == 'date']
+    return dataset.iter_dataframes_forced_types(columns, dtypes, date_columns, chunksize=chunksize)
+
+
+def cast_to_schema(df, schema):
+    """
+    cast the integer and boolean columns of a chunk to the types of the schema it is written against: pandas infers
+    the types of each chunk, an integer column with missing values is read as floats for instance (written as 1.0)
+    """
+    for column in schema:
+        name, column_type = column['name'], column['type']
+        if name not in df.columns:
+            continue
+        if column_type in INTEGER_TYPES and df[name].dtype.kind not in 'iu':
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype('Int64')
+        elif column_type == 'boolean' and df[name].dtype.kind != 'b':
+            df[name] = df[name].astype('boolean')
+    return df
+
+
+def read_edges(dataset, source, target, weight=None, directed=False, bipartite=False, chunksize=CHUNK_SIZE):
+    """
+    stream the source, target (and weight) columns of the dataset into an EdgeAccumulator, each chunk is converted
+    into node ids and aggregated so that memory scales with the number of unique nodes and edges, not rows
+    """
+    columns = [source, target] + ([weight] if weight else [])
+    accumulator = EdgeAccumulator(directed=directed, bipartite=bipartite)
+    with profile_stage("Edges reading") as stage:
+        for chunk in iter_dataset_chunks(dataset, columns, chunksize):
+            accumulator.add_chunk(chunk, source, target, weight)
+        stage.annotate(rows=accumulator.rows_nb)
+    return accumulator
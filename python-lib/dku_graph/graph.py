@@ -1,10 +1,11 @@
-import time
 import random
 import numpy as np
 import pandas as pd
 import logging
-import igraph
 from graph_analytics_constants import EXISTING_COLORS
+from dku_graph.compact_graph import CompactGraph
+from dku_profiling.profiler import profile_stage
+from dku_graph.layout import compute_positions, component_layout, incremental_layout, AUTO
 
 
 class Graph:
@@ -26,132 +27,157 @@ class Graph:
         self.edges_width = graph_params.get('edges_width', None)
         self.directed_edges = graph_params.get('directed_edges', True)
         self.numerical_colors = graph_params.get('numerical_colors', False)
+        self.layout_strategy = graph_params.get('layout_strategy', None) or AUTO
+        self.pack_components = graph_params.get('pack_components', False)
+        self.layout_workers = int(graph_params.get('layout_workers', None) or 1)
+
+    def get_columns(self):
+        """ columns of the dataframe used to create the graph """
+        columns = [self.source_column, self.target_column, self.source_nodes_color, self.source_nodes_size,
+                   self.target_nodes_color, self.target_nodes_size, self.edges_caption, self.edges_width]
+        return list(dict.fromkeys(column for column in columns if column))
 
     def create_graph(self, df):
         """
-        iterate over the datframe and add nodes and edges to the graph object
+        factorize the source and target columns of the dataframe into integer node codes
+        and build the nodes and edges of the graph object from these columns
         """
-        logging.info("Creating graph object ...")
-        start = time.time()
-        source_nodes, target_nodes = set(), set()
-        nodes_nb = 0
-        self.nodes = {}
-        self.edges = {}
-
-        self._check_data_type(df)
+        with profile_stage("Graph object") as stage:
+            self.nodes = {}
+            self.edges = {}
 
-        for idx, row in df.iterrows():
-            if nodes_nb >= self.max_nodes:
-                break
+            self._check_data_type(df)
 
-            source = row[self.source_column]
-            target = row[self.target_column]
+            sources, targets = df[self.source_column].values, df[self.target_column].values
+            if sources.dtype != targets.dtype:
+                sources, targets = sources.astype(object), targets.astype(object)
 
-            nodes_nb += self._process_source(source, row, source_nodes, target_nodes)
-            nodes_nb += self._process_target(target, row, source_nodes, target_nodes)
+            # nodes are interleaved (source then target of each row) so that codes follow the order of first appearance
+            codes, _ = pd.factorize(np.column_stack([sources, targets]).ravel())
+            first_positions = self._first_positions(codes, codes.max() + 1 if len(codes) > 0 else 0)
 
-            self._process_edge(source, target, row)
+            rows_nb = self._rows_before_max_nodes(first_positions, len(df))
+            nodes_nb = int(np.count_nonzero(first_positions < 2 * rows_nb))
+            codes = codes[:2 * rows_nb].reshape(-1, 2)
 
-        for node_id in self.nodes:
-            self._add_node_title(self.nodes[node_id])
-        for edge_id in self.edges:
-            self._add_edge_title(self.edges[edge_id])
+            self._create_nodes(df, sources, targets, codes, first_positions[:nodes_nb], nodes_nb)
+            self._create_edges(df, sources, targets, codes, nodes_nb)
 
-        self.groups = {}
-        if self.source_nodes_color or self.target_nodes_color:
-            self.group_values = set()
             for node_id in self.nodes:
-                self._add_group_value(self.nodes[node_id])
-            self._create_groups()
-
-        logging.info("Graph object created in {:.4f} seconds".format(time.time()-start))
-
-    def _process_source(self, source, row, source_nodes, target_nodes):
-        """ add source node if not already seen and update it if it was seen as a target node """
-        if self._null_node(source):
-            return 0
-        if source not in source_nodes and source not in target_nodes:
-            self.nodes[source] = self._create_source_node(row)
-            source_nodes.add(source)
-            return 1
-        elif source not in source_nodes and source in target_nodes:
-            self._update_source_node(row, self.nodes[source])
-            source_nodes.add(source)
-        return 0
-
-    def _process_target(self, target, row, source_nodes, target_nodes):
-        """ add target node if not already seen and update it if it was seen as a source node """
-        if self._null_node(target):
-            return 0
-        if target not in source_nodes and target not in target_nodes:
-            self.nodes[target] = self._create_target_node(row)
-            target_nodes.add(target)
-            return 1
-        elif target in source_nodes and target not in target_nodes:
-            self._update_target_node(row, self.nodes[target])
-            target_nodes.add(target)
-        return 0
-
-    def _process_edge(self, source, target, row):
-        """ add edge node if not already seen and update the width if width is based on weight """
-        if self._null_node(source) or self._null_node(target):
-            return
-        if not self.directed_edges:
-            try:
-                if target < source:  # edges are sorted when directed
-                    source, target = target, source
-            except Exception as e:
-                logging.info("Exception when comparing source ({}) and target ({}) nodes: {}".format(source, target, e))
-                return
-        if (source, target) not in self.edges:
-            self.edges[(source, target)] = self._create_edge(row, source, target)
-        elif not self.edges_width:  # here edge weight must be computed (cause width is weight by default)
-            self._update_edge(self.edges[(source, target)])
-
-    def _create_source_node(self, row):
-        node = {'id': row[self.source_column], 'label': str(row[self.source_column])}
-        if self.source_nodes_color:
-            node['group'] = row[self.source_nodes_color]
-        if self.source_nodes_size and not np.isnan(row[self.source_nodes_size]):
-            node['value'] = row[self.source_nodes_size]
-        return node
-
-    def _create_target_node(self, row):
-        node = {'id': row[self.target_column], 'label': str(row[self.target_column])}
-        if self.target_nodes_color:
-            node['group'] = row[self.target_nodes_color]
-        if self.target_nodes_size and not np.isnan(row[self.target_nodes_size]):
-            node['value'] = row[self.target_nodes_size]
-        return node
-
-    def _create_edge(self, row, source, target):
-        edge = {'from': source, 'to': target}
-        if self.edges_caption:
-            edge['label'] = str(row[self.edges_caption])
-        if self.edges_width:
-            if not np.isnan(row[self.edges_width]):
-                edge['value'] = row[self.edges_width]
-        else:  # initialize edge weight
-            edge['value'] = 1
-        return edge
-
-    def _update_edge(self, edge_params):
-        """ update value (weight) of edges that have already been initialized when self.edges_width is False """
-        edge_params['value'] += 1
-
-    def _update_source_node(self, row, node_params):
-        """ overwrite the old params that were set for the node when it was a target node (or add new params)"""
-        if self.source_nodes_color:
-            node_params['group'] = row[self.source_nodes_color]
-        if self.source_nodes_size and not np.isnan(row[self.source_nodes_size]):
-            node_params['value'] = row[self.source_nodes_size]
-
-    def _update_target_node(self, row, node_params):
-        """ add new params if they were not set for the node when it was a source node """
-        if 'group' not in node_params and self.target_nodes_color:
-            node_params['group'] = row[self.target_nodes_color]
-        if 'value' not in node_params and self.target_nodes_size and not np.isnan(row[self.target_nodes_size]):
-            node_params['value'] = row[self.target_nodes_size]
+                self._add_node_title(self.nodes[node_id])
+            for edge_id in self.edges:
+                self._add_edge_title(self.edges[edge_id])
+
+            self.groups = {}
+            if self.source_nodes_color or self.target_nodes_color:
+                self.group_values = set()
+                for node_id in self.nodes:
+                    self._add_group_value(self.nodes[node_id])
+                self._create_groups()
+
+            stage.annotate(nodes=len(self.nodes), edges=len(self.edges))
+
+    def _first_positions(self, codes, size):
+        """ return for each code from 0 to size-1 the position of its first occurrence in codes (-1 if none) """
+        positions = np.full(size, -1, dtype=np.int64)
+        valid_positions = np.flatnonzero(codes >= 0)
+        unique_codes, first_indices = np.unique(codes[valid_positions], return_index=True)
+        positions[unique_codes] = valid_positions[first_indices]
+        return positions
+
+    def _rows_before_max_nodes(self, first_positions, rows_nb):
+        """ number of rows to process, rows are processed as long as fewer than self.max_nodes nodes were created """
+        new_nodes_per_row = np.bincount(first_positions // 2, minlength=rows_nb)
+        nodes_before_row = np.cumsum(new_nodes_per_row) - new_nodes_per_row
+        return int(np.searchsorted(nodes_before_row, self.max_nodes, side='left'))
+
+    def _create_nodes(self, df, sources, targets, codes, first_positions, nodes_nb):
+        """
+        create the nodes from their first row, a node seen as a source takes the source attributes
+        (color and size when not null), otherwise it keeps the attributes of its first row as a target
+        """
+        source_rows = self._first_positions(codes[:, 0], nodes_nb)
+        target_rows = self._first_positions(codes[:, 1], nodes_nb)
+        is_source, is_target = source_rows >= 0, target_rows >= 0
+
+        groups, has_group = self._node_attribute(df, self.source_nodes_color, self.target_nodes_color,
+                                                 source_rows, target_rows, is_source, is_target)
+        sizes, has_size = self._node_attribute(df, self.source_nodes_size, self.target_nodes_size,
+                                               source_rows, target_rows, is_source, is_target, skip_null=True)
+
+        first_rows, from_target = first_positions // 2, first_positions % 2 == 1
+        ids = np.where(from_target, targets[first_rows], sources[first_rows])
+        for i, node_id in enumerate(ids):
+            node = {'id': node_id, 'label': str(node_id)}
+            if has_group[i]:
+                node['group'] = groups[i]
+            if has_size[i]:
+                node['value'] = sizes[i]
+            self.nodes[node_id] = node
+
+    def _node_attribute(self, df, source_column, target_column, source_rows, target_rows, is_source, is_target, skip_null=False):
+        """ return the attribute values of the nodes and a mask of the nodes that have this attribute """
+        values = np.empty(len(source_rows), dtype=object)
+        has_value = np.zeros(len(source_rows), dtype=bool)
+        for column, rows, mask in [(target_column, target_rows, is_target), (source_column, source_rows, is_source)]:
+            if not column:
+                continue
+            column_values = df[column].values[rows[mask]]
+            candidates = np.flatnonzero(mask)
+            if skip_null:
+                not_null = ~np.isnan(column_values.astype(float))
+                candidates, column_values = candidates[not_null], column_values[not_null]
+            values[candidates] = column_values
+            has_value[candidates] = True
+        return values, has_value
+
+    def _create_edges(self, df, sources, targets, codes, nodes_nb):
+        """
+        create the unique edges, the value of an edge is the width column of its first row
+        or the number of rows of the edge when no width column is selected
+        """
+        rows = np.flatnonzero((codes[:, 0] >= 0) & (codes[:, 1] >= 0))
+        edge_codes = codes[rows]
+        edge_sources, edge_targets = sources[rows], targets[rows]
+        if not self.directed_edges:  # edges are sorted when undirected
+            swap, comparable = self._compare_nodes(edge_sources, edge_targets)
+            rows, edge_codes = rows[comparable], np.where(swap[:, None], edge_codes[:, ::-1], edge_codes)[comparable]
+            edge_sources, edge_targets = np.where(swap, edge_targets, edge_sources)[comparable], np.where(swap, edge_sources, edge_targets)[comparable]
+
+        edge_ids, _ = pd.factorize(edge_codes[:, 0].astype(np.int64) * nodes_nb + edge_codes[:, 1])
+        first_indices = self._first_positions(edge_ids, edge_ids.max() + 1 if len(edge_ids) > 0 else 0)
+        counts = np.bincount(edge_ids)
+        first_rows = rows[first_indices]
+        self.compact_graph = CompactGraph(np.array(list(self.nodes), dtype=object), edge_codes[first_indices, 0],
+                                          edge_codes[first_indices, 1], counts, directed=self.directed_edges)
+
+        captions = df[self.edges_caption].values[first_rows] if self.edges_caption else None
+        widths = df[self.edges_width].values[first_rows] if self.edges_width else None
+        for i, index in enumerate(first_indices):
+            source, target = edge_sources[index], edge_targets[index]
+            edge = {'from': source, 'to': target}
+            if self.edges_caption:
+                edge['label'] = str(captions[i])
+            if self.edges_width:
+                if not np.isnan(widths[i]):
+                    edge['value'] = widths[i]
+            else:
+                edge['value'] = int(counts[i])
+            self.edges[(source, target)] = edge
+
+    def _compare_nodes(self, sources, targets):
+        """ return a mask of the edges where target < source and a mask of the edges where nodes can be compared """
+        try:
+            return np.asarray(targets < sources, dtype=bool), np.ones(len(sources), dtype=bool)
+        except TypeError:
+            swap, comparable = np.zeros(len(sources), dtype=bool), np.ones(len(sources), dtype=bool)
+            for i, (source, target) in enumerate(zip(sources, targets)):
+                try:
+                    swap[i] = target < source
+                except Exception as e:
+                    logging.info("Exception when comparing source ({}) and target ({}) nodes: {}".format(source, target, e))
+                    comparable[i] = False
+            return swap, comparable
 
     def _add_node_title(self, node_params):
         """ create a nice title string to display on node popup """
@@ -171,25 +197,9 @@ class Graph:
             title += "<br>width: <b>{}</b>".format(edge_params['value'])
         edge_params['title'] = title
 
-    def _null_node(self, node):
-        if isinstance(node, float):
-            return np.isnan(node)
-        return False
-
     def _create_igraph(self):
-        iGraph = igraph.Graph()
-        node_to_id = {}
-        id_to_node = {}
-        for i, node in enumerate(self.nodes):
-            node_to_id[node] = i
-            id_to_node[i] = node
-        edge_list = []
-        for edge in self.edges:
-            edge_list += [(node_to_id[edge[0]], node_to_id[edge[1]])]
-
-        iGraph.add_vertices(len(self.nodes))
-        iGraph.add_edges(edge_list)
-
+        iGraph = self.compact_graph.to_igraph(weighted=False, names=False, directed=False)
+        id_to_node = dict(enumerate(self.nodes))
         return iGraph, id_to_node
 
     def _contract_nodes(self, positions, translation_factor=0.8, std_nb=3):
@@ -202,34 +212,19 @@ class Graph:
         :param std_nb: nodes are 'too' far if the distance to the closest node on one axis is more than
         the average distance between nodes + 'std_nb' standard-deviation
         """
-        columns = ['x', 'y']
-        positions_df = pd.DataFrame(positions, columns=columns)
-        positions_df['id'] = positions_df.index
-
-        for col in columns:
-            positions_df = positions_df.sort_values(by=[col])
-            consecutive_difference_column = '{}_diff'.format(col)
-            positions_df[consecutive_difference_column] = positions_df[col] - positions_df[col].shift(1)
-            positions_df = positions_df.sort_values(by=[consecutive_difference_column], ascending=False).reset_index(drop=True)
-
-            outliers_bound = positions_df[consecutive_difference_column].mean() + std_nb * positions_df[consecutive_difference_column].std()
-
-            i = 0
-            threshold = positions_df.loc[i, col]
-            diff = positions_df.loc[i, consecutive_difference_column]
-            while diff > outliers_bound:
-                mask = (positions_df[col] >= threshold)
-                masked_df = positions_df[mask]
-                positions_df.loc[mask, col] = masked_df[col] - diff * translation_factor
-
-                i += 1
-                threshold = positions_df.loc[i, col]
-                diff = positions_df.loc[i, consecutive_difference_column]
-
-            logging.info("{} translations done in axis {}".format(i, col))
-
-        positions_df = positions_df.sort_values(by=['id'], ascending=True).reset_index(drop=True)
-        return positions_df[columns].values
+        positions = np.array(positions, dtype=float)
+        if len(positions) < 3:
+            return positions
+        for axis, col in enumerate(['x', 'y']):
+            order = np.argsort(positions[:, axis], kind='stable')
+            differences = np.diff(positions[order, axis])
+            outliers_bound = differences.mean() + std_nb * differences.std(ddof=1)
+            outliers = differences > outliers_bound
+            # each node is translated by the sum of the outlier gaps before it, translations keep the order of nodes
+            translations = translation_factor * np.cumsum(np.where(outliers, differences, 0))
+            positions[order[1:], axis] -= translations
+            logging.info("{} translations done in axis {}".format(int(outliers.sum()), col))
+        return positions
 
     def _rescale_positions(self, positions, scale):
         """ return a numpy array of scaled positions between -scale and +scale """
@@ -246,44 +241,42 @@ class Graph:
 
         return positions
 
-    def _igraph_layout_algorithms(self, iGraph, kamada_iter=5000, fruchterman_iter=300):
-        """ 
-        compute nodes positions of an iGraph object,
-        first generate a fast inital layout using the Kamada-Kawai algorithm,
-        then use the slower Fruchterman-Reingold algorithm to improve the layout,
-        return the positions as a numpy array
-        """
-        kamada_start = time.time()
-        kamada_positions = iGraph.layout_kamada_kawai(maxiter=kamada_iter)
-        fruchterman_start = time.time()
-        logging.info("Kamada-Kawai layout computed in {:.4f} seconds".format(fruchterman_start-kamada_start))
-        fruchterman_positions = iGraph.layout_fruchterman_reingold(seed=kamada_positions, grid=False, niter=fruchterman_iter)
-        logging.info("Fruchterman-Reingold layout computed in {:.4f} seconds".format(time.time()-fruchterman_start))
-        return np.array(fruchterman_positions)
-
-    def compute_layout(self, scale, scale_ratio):
+    def compute_layout(self, scale, scale_ratio, strategy=None, previous_positions=None, min_known_ratio=0.5):
         """
         create an iGraph object from the Graph class,
-        compute nodes positions using igraph layout algorithms
+        compute nodes positions using igraph layout algorithms (see layout.compute_positions for the strategies)
+        or, when at least min_known_ratio of the nodes are keys of the previous_positions dict (node -> (x, y)),
+        refine these positions (see layout.incremental_layout),
         tranform and rescale the positions to improve the layout,
         update the nodes properties with the positions
         """
-        logging.info("Computing layout ...")
-        start_time = time.time()
-
-        iGraph, id_to_node = self._create_igraph()
-
-        positions = self._igraph_layout_algorithms(iGraph)
-
-        if len(positions) > 500:
-            positions = self._contract_nodes(positions)
-
-        positions = self._transform_positions(positions, scale, scale_ratio)
-
-        for i, pos in enumerate(positions):
-            self.nodes[id_to_node[i]].update({'x': pos[0], 'y': pos[1]})
-
-        logging.info("Global layout computed in {:.4f} seconds for {} nodes".format(time.time()-start_time, len(positions)))
+        with profile_stage("Global layout") as stage:
+            iGraph, id_to_node = self._create_igraph()
+
+            seed_positions = self._get_seed_positions(previous_positions) if previous_positions else None
+            if seed_positions is not None and (~np.isnan(seed_positions[:, 0])).mean() >= min_known_ratio:
+                positions = incremental_layout(iGraph, seed_positions)
+            elif self.pack_components:
+                # packed components leave no empty zones to contract
+                positions = component_layout(iGraph, strategy or self.layout_strategy, workers=self.layout_workers, aspect_ratio=scale_ratio)
+            else:
+                positions = compute_positions(iGraph, strategy or self.layout_strategy)
+                if len(positions) > 500:
+                    positions = self._contract_nodes(positions)
+
+            positions = self._transform_positions(positions, scale, scale_ratio)
+
+            for i, pos in enumerate(positions):
+                self.nodes[id_to_node[i]].update({'x': pos[0], 'y': pos[1]})
+            stage.annotate(nodes=len(positions))
+
+    def _get_seed_positions(self, previous_positions):
+        """ array of the previous positions of the nodes (in the order of node ids), NaN for new nodes """
+        return np.array([previous_positions.get(node, (np.nan, np.nan)) for node in self.nodes], dtype=float).reshape(-1, 2)
+
+    def get_positions(self):
+        """ dict of node -> (x, y), to be used as previous_positions of the next layout """
+        return {node: (node_params['x'], node_params['y']) for node, node_params in self.nodes.items()}
 
     def _check_data_type(self, df):
         for col in [self.source_nodes_size, self.target_nodes_size, self.edges_width]:
@@ -312,7 +305,7 @@ class Graph:
             if len(self.group_values) > 0:
                 mini, maxi = min(self.group_values), max(self.group_values)
                 for group in self.group_values:
-                    x = (maxi - group)/(maxi - mini) * 225  # would be white if 255
+                    x = (maxi - group)/(maxi - mini) * 225 if maxi != mini else 0  # would be white if 255
                     self.groups[group] = {'color': "rgba(255, {0}, {0}, 1)".format(x)}
         else:
             colors = EXISTING_COLORS[:]
@@ -0,0 +1,217 @@
+import time
+import logging
+import igraph
+import numpy as np
+from dku_graph.layout import compute_positions, component_layout, AUTO
+
+CLUSTER_GROUP = "cluster"
+CLUSTER_COLOR = "#f0a35c"
+CLUSTER_PREFIX = "cluster_"
+
+
+def get_cluster_prefix(labels):
+    """ CLUSTER_PREFIX followed by as many '_' as needed so that no node label starts with it """
+    prefixed_labels = [label for label in labels if isinstance(label, str) and label.startswith(CLUSTER_PREFIX)]
+    prefix = CLUSTER_PREFIX
+    while any(label.startswith(prefix) for label in prefixed_labels):
+        prefix += "_"
+    return prefix
+
+
+class ClusterHierarchy:
+    """
+    hierarchy of communities of a graph, used to display an overview of the graph and to expand its clusters on demand:
+    - levels[0] is the identity (each node is its own cluster), levels[l][i] is the cluster of node i at level l
+    - the levels above 0 are the levels of the multilevel (Louvain) community detection on the undirected graph,
+      when the top level has more than max_items clusters (e.g. many connected components), its clusters are grouped
+      until it has at most max_items clusters: the largest clusters stay alone and the others are grouped by size
+    a visible item is a pair (level, cluster), level 0 items are the nodes of the graph, the ids of the clusters in the
+    chart start with a prefix that no node label starts with
+    """
+
+    def __init__(self, compact_graph, max_items):
+        start = time.time()
+        self.compact_graph = compact_graph
+        self.max_items = max(int(max_items), 2)
+        nodes_nb = compact_graph.node_count
+        self.cluster_prefix = get_cluster_prefix(compact_graph.labels)
+        self.levels = [np.arange(nodes_nb)]
+        if nodes_nb > self.max_items:
+            self._add_community_levels()
+            while self.levels[-1].max() + 1 > self.max_items:
+                self._add_grouped_level()
+        self.sizes = [np.bincount(membership, minlength=membership.max() + 1 if len(membership) > 0 else 0) for membership in self.levels]
+        logging.info("Hierarchy of {} levels ({} clusters at the top) computed in {:.4f} seconds".format(
+            len(self.levels), len(self.sizes[-1]), time.time()-start))
+
+    def _add_community_levels(self):
+        iGraph = self.compact_graph.to_igraph(weighted=True, names=False, directed=False)
+        for level in iGraph.community_multilevel(weights='weight', return_levels=True):
+            membership = np.array(level.membership)
+            if membership.max() + 1 < self.levels[-1].max() + 1:
+                self.levels.append(membership)
+
+    def _add_grouped_level(self):
+        sizes = np.bincount(self.levels[-1])
+        alone_nb = self.max_items // 2
+        groups_nb = self.max_items - alone_nb
+        ranks = np.empty(len(sizes), dtype=np.int64)
+        ranks[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+        group_size = int(np.ceil((len(sizes) - alone_nb) / groups_nb))
+        cluster_group = np.where(ranks < alone_nb, ranks, alone_nb + (ranks - alone_nb) // group_size)
+        self.levels.append(cluster_group[self.levels[-1]])
+
+    @property
+    def overview_level(self):
+        """ lowest level with at most max_items clusters """
+        return next(level for level, sizes in enumerate(self.sizes) if len(sizes) <= self.max_items)
+
+    def get_level_items(self, level):
+        return [(level, cluster) for cluster in range(len(self.sizes[level]))]
+
+    def get_children(self, item):
+        """ items of the highest level below the cluster where it contains more than one cluster """
+        level, cluster = item
+        members = self.levels[level] == cluster
+        while level > 0:
+            level -= 1
+            children = np.unique(self.levels[level][members])
+            if len(children) > 1 or level == 0:
+                return [(level, child) for child in children]
+        return []
+
+    def get_item_of_nodes(self, items):
+        """ index in items of the item containing each node, -1 when no item contains the node """
+        item_of_nodes = np.full(self.compact_graph.node_count, -1, dtype=np.int64)
+        for level in set(level for level, _ in items):
+            item_index = np.full(len(self.sizes[level]), -1, dtype=np.int64)
+            for index, (item_level, cluster) in enumerate(items):
+                if item_level == level:
+                    item_index[cluster] = index
+            in_level = item_index[self.levels[level]]
+            item_of_nodes = np.where(in_level >= 0, in_level, item_of_nodes)
+        return item_of_nodes
+
+    def get_item_edges(self, items):
+        """
+        edges between the items (index in items) and their number of edges in the graph,
+        edges inside an item or with a node that is not in any item are removed
+        """
+        item_of_nodes = self.get_item_of_nodes(items)
+        sources, targets = item_of_nodes[self.compact_graph.sources], item_of_nodes[self.compact_graph.targets]
+        valid = (sources >= 0) & (targets >= 0) & (sources != targets)
+        sources, targets, weights = sources[valid], targets[valid], self.compact_graph.weights[valid]
+        if not self.compact_graph.directed:
+            sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+        unique_keys, inverse = np.unique(sources * len(items) + targets, return_inverse=True)
+        return unique_keys // len(items), unique_keys % len(items), np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+
+    def get_item_id(self, item):
+        """ id of the item in the chart: the node for level 0 items, <cluster_prefix><level>_<cluster> otherwise """
+        level, cluster = item
+        if level == 0:
+            return self.compact_graph.labels[cluster]
+        return "{}{}_{}".format(self.cluster_prefix, level, cluster)
+
+    def get_item(self, item_id):
+        """ item of an id of the chart, None if it is unknown, ids that are not cluster ids are looked up as nodes """
+        if isinstance(item_id, str) and item_id.startswith(self.cluster_prefix):
+            try:
+                level, cluster = (int(part) for part in item_id[len(self.cluster_prefix):].split("_"))
+                if 0 < level < len(self.sizes) and 0 <= cluster < len(self.sizes[level]):
+                    return level, cluster
+            except ValueError:
+                pass
+        node = self.compact_graph.get_node_ids([item_id])[0]
+        return (0, int(node)) if node >= 0 else None
+
+
+class LevelOfDetailView:
+    """
+    nodes and edges of the chart (same properties as the Graph nodes and edges) where the graph is displayed as a
+    set of visible items of a ClusterHierarchy: clusters are displayed as nodes of the 'cluster' group
+    whose value is their number of nodes
+    """
+
+    def __init__(self, graph, hierarchy, strategy=AUTO):
+        self.graph = graph
+        self.hierarchy = hierarchy
+        self.strategy = strategy
+        self.node_list = list(graph.nodes)
+
+    def get_groups(self):
+        return dict(self.graph.groups, **{CLUSTER_GROUP: {'color': CLUSTER_COLOR}})
+
+    def get_overview(self, scale, scale_ratio=1):
+        """ nodes and edges of all the clusters of the overview level, laid out in [-scale*scale_ratio, scale*scale_ratio]x[-scale, scale] """
+        items = self.hierarchy.get_level_items(self.hierarchy.overview_level)
+        sources, targets, weights = self.hierarchy.get_item_edges(items)
+        iGraph = igraph.Graph(n=len(items), edges=np.column_stack([sources, targets]).tolist())
+        positions = self._normalize(component_layout(iGraph, self.strategy, aspect_ratio=scale_ratio))
+        positions *= [scale * scale_ratio, scale]
+        return self._get_nodes(items, positions), self._get_edges(items, sources, targets, weights)
+
+    def expand(self, item_id, visible_ids, center, spacing=50):
+        """
+        nodes of the children of a cluster, laid out around center in a disk of radius spacing * sqrt(children number),
+        and their edges with each other and with the other visible items
+        """
+        item = self.hierarchy.get_item(item_id)
+        if item is None:
+            raise ValueError("Unknown cluster: {}".format(item_id))
+        children = self.hierarchy.get_children(item)
+        others = [other for other in (self.hierarchy.get_item(visible_id) for visible_id in visible_ids) if other is not None and other != item]
+        items = children + others
+        sources, targets, weights = self.hierarchy.get_item_edges(items)
+
+        inside = (sources < len(children)) & (targets < len(children))
+        iGraph = igraph.Graph(n=len(children), edges=np.column_stack([sources[inside], targets[inside]]).tolist())
+        radius = spacing * np.sqrt(len(children))
+        positions = self._normalize(compute_positions(iGraph, self.strategy)) * radius + np.asarray(center, dtype=float)
+
+        with_children = (sources < len(children)) | (targets < len(children))
+        return self._get_nodes(children, positions), self._get_edges(items, sources[with_children], targets[with_children], weights[with_children])
+
+    def _normalize(self, positions):
+        """ center the positions and scale them in [-1, 1] """
+        positions = np.array(positions, dtype=float).reshape(-1, 2)
+        if len(positions) == 0:
+            return positions
+        positions -= positions.mean(axis=0)
+        extent = np.abs(positions).max()
+        return positions / extent if extent > 0 else positions
+
+    def _get_nodes(self, items, positions):
+        nodes = []
+        for (level, cluster), position in zip(items, positions):
+            if level == 0:
+                node = dict(self.graph.nodes[self.node_list[cluster]])
+            else:
+                size = int(self.hierarchy.sizes[level][cluster])
+                node = {
+                    'id': self.hierarchy.get_item_id((level, cluster)),
+                    'label': "{} nodes".format(size),
+                    'group': CLUSTER_GROUP,
+                    'isCluster': True,
+                    'value': size,
+                    'title': "cluster of <b>{}</b> nodes<br>double click to expand".format(size)
+                }
+            node.update({'x': position[0], 'y': position[1]})
+            nodes.append(node)
+        return nodes
+
+    def _get_edges(self, items, sources, targets, weights):
+        """ edges between nodes keep their properties, edges with a cluster have their number of edges as value """
+        edges = []
+        for source, target, weight in zip(sources, targets, weights):
+            from_id, to_id = self.hierarchy.get_item_id(items[source]), self.hierarchy.get_item_id(items[target])
+            edge = None
+            if items[source][0] == 0 and items[target][0] == 0:
+                edge = self.graph.edges.get((from_id, to_id))
+                if edge is None and not self.graph.directed_edges:
+                    edge = self.graph.edges.get((to_id, from_id))
+            if edge is None:
+                edge = {'from': from_id, 'to': to_id, 'value': int(weight)}
+                self.graph._add_edge_title(edge)
+            edges.append(edge)
+        return edges
@@ -0,0 +1,258 @@
+import time
+import logging
+import multiprocessing
+import igraph
+import numpy as np
+from scipy import sparse
+
+
+AUTO = "auto"
+KAMADA_KAWAI = "kamada_kawai"
+MULTILEVEL = "multilevel"
+GRID_FRUCHTERMAN_REINGOLD = "grid_fruchterman_reingold"
+DRL = "drl"
+
+# the strategy selected by AUTO is the first whose max number of nodes is not exceeded
+AUTO_STRATEGIES = [
+    (1000, KAMADA_KAWAI),
+    (100000, MULTILEVEL),
+    (None, GRID_FRUCHTERMAN_REINGOLD)
+]
+
+
+def get_layout_strategy(strategy, nodes_nb):
+    if strategy != AUTO:
+        return strategy
+    for max_nodes, auto_strategy in AUTO_STRATEGIES:
+        if max_nodes is None or nodes_nb <= max_nodes:
+            return auto_strategy
+
+
+def kamada_kawai_layout(iGraph, kamada_iter=5000, fruchterman_iter=300):
+    """
+    first generate a fast inital layout using the Kamada-Kawai algorithm,
+    then use the slower Fruchterman-Reingold algorithm to improve the layout
+    """
+    kamada_start = time.time()
+    kamada_positions = iGraph.layout_kamada_kawai(maxiter=kamada_iter)
+    fruchterman_start = time.time()
+    logging.info("Kamada-Kawai layout computed in {:.4f} seconds".format(fruchterman_start-kamada_start))
+    fruchterman_positions = iGraph.layout_fruchterman_reingold(seed=kamada_positions, grid=False, niter=fruchterman_iter)
+    logging.info("Fruchterman-Reingold layout computed in {:.4f} seconds".format(time.time()-fruchterman_start))
+    return np.array(fruchterman_positions)
+
+
+def grid_fruchterman_reingold_layout(iGraph, fruchterman_iter=500):
+    """ Fruchterman-Reingold layout where repulsion is only computed between nodes of neighboring grid cells """
+    start = time.time()
+    positions = iGraph.layout_fruchterman_reingold(grid=True, niter=fruchterman_iter)
+    logging.info("Grid Fruchterman-Reingold layout computed in {:.4f} seconds".format(time.time()-start))
+    return np.array(positions)
+
+
+def drl_layout(iGraph):
+    """ Distributed Recursive Layout, force-directed layout built for large graphs """
+    start = time.time()
+    positions = iGraph.layout_drl()
+    logging.info("DrL layout computed in {:.4f} seconds".format(time.time()-start))
+    return np.array(positions)
+
+
+def multilevel_layout(iGraph, fruchterman_iter=100, seed=1337):
+    """
+    coarsen the graph with the levels of the multilevel community detection (Louvain), lay out the coarsest graph
+    with kamada_kawai_layout, then place the nodes of each finer level around the position of their community and
+    refine them with a few Fruchterman-Reingold iterations
+    """
+    start = time.time()
+    if iGraph.ecount() == 0:
+        return grid_fruchterman_reingold_layout(iGraph)
+    levels = [clustering.membership for clustering in iGraph.community_multilevel(return_levels=True)]
+    logging.info("Multilevel layout - {} levels computed in {:.4f} seconds".format(len(levels), time.time()-start))
+
+    random_state = np.random.RandomState(seed)
+    level_start = time.time()
+    coarse_membership = np.array(levels[-1])
+    positions = kamada_kawai_layout(_coarse_graph(iGraph, coarse_membership))
+    logging.info("Multilevel layout - coarsest level ({} nodes) laid out in {:.4f} seconds".format(
+        len(positions), time.time()-level_start))
+
+    # the last finer level is the graph itself, where each node is its own community
+    for fine_membership in [np.array(level) for level in levels[-2::-1]] + [np.arange(iGraph.vcount())]:
+        level_start = time.time()
+        # levels are nested: the parent of a fine community is the coarse community of any of its nodes
+        parents = np.zeros(fine_membership.max() + 1, dtype=np.int64)
+        parents[fine_membership] = coarse_membership
+        # Fruchterman-Reingold (and its grid) works on an area proportional to the number of nodes
+        positions = _scale_to_area(positions, len(parents))
+        spread = _edge_length(positions) if len(positions) > 1 else 1
+        fine_positions = positions[parents] + random_state.uniform(-spread/2, spread/2, size=(len(parents), 2))
+        fine_graph = _coarse_graph(iGraph, fine_membership)
+        positions = np.array(fine_graph.layout_fruchterman_reingold(seed=fine_positions.tolist(), niter=fruchterman_iter,
+                                                                    grid=fine_graph.vcount() > 1000))
+        coarse_membership = fine_membership
+        logging.info("Multilevel layout - level of {} nodes refined in {:.4f} seconds".format(
+            len(positions), time.time()-level_start))
+    logging.info("Multilevel layout computed in {:.4f} seconds".format(time.time()-start))
+    return positions
+
+
+def _coarse_graph(iGraph, membership):
+    """ graph of the communities, linked when any of their nodes are linked """
+    coarse_graph = iGraph.copy()
+    coarse_graph.contract_vertices(membership.tolist())
+    coarse_graph.simplify(multiple=True, loops=True)
+    return coarse_graph
+
+
+def _scale_to_area(positions, nodes_nb):
+    """ scale the positions so that their largest side is sqrt(nodes_nb) """
+    extent = (positions.max(axis=0) - positions.min(axis=0)).max()
+    if extent <= 0:
+        return positions
+    return (positions - positions.mean(axis=0)) * np.sqrt(nodes_nb) / extent
+
+
+def _edge_length(positions):
+    """ typical distance between nodes: side of the square area of a node in the bounding box """
+    extent = positions.max(axis=0) - positions.min(axis=0)
+    return max(np.sqrt(np.prod(np.maximum(extent, 1e-9)) / len(positions)), 1e-3)
+
+
+LAYOUT_STRATEGIES = {
+    KAMADA_KAWAI: kamada_kawai_layout,
+    MULTILEVEL: multilevel_layout,
+    GRID_FRUCHTERMAN_REINGOLD: grid_fruchterman_reingold_layout,
+    DRL: drl_layout
+}
+
+
+def compute_positions(iGraph, strategy=AUTO):
+    """ return the positions of the nodes as a numpy array, computed with the selected (or automatic) strategy """
+    strategy = get_layout_strategy(strategy, iGraph.vcount())
+    if strategy not in LAYOUT_STRATEGIES:
+        raise ValueError("Unknown layout strategy: {}".format(strategy))
+    logging.info("Computing {} layout of {} nodes".format(strategy, iGraph.vcount()))
+    return LAYOUT_STRATEGIES[strategy](iGraph)
+
+
+def component_layout(iGraph, strategy=AUTO, workers=1, aspect_ratio=1, padding=2, template_max_size=8, parallel_min_size=200):
+    """
+    lay out each connected component independently (with compute_positions) and pack the components in a rectangle:
+    - components of at most template_max_size nodes are laid out once per isomorphism class (using their canonical
+      permutation), e.g. all isolated pairs of nodes share the same template
+    - components of at least parallel_min_size nodes are laid out in a pool of processes when workers > 1
+    - the positions of each component are scaled to about one unit between neighbors, then the bounding boxes are
+      packed in shelves (see pack_boxes) separated by padding units
+    """
+    start = time.time()
+    if iGraph.vcount() == 0:
+        return np.zeros((0, 2))
+    membership = np.array(_connected_components(iGraph).membership)
+    order = np.argsort(membership, kind='stable')
+    components = np.split(order, np.cumsum(np.bincount(membership))[:-1])
+
+    positions_list = [None] * len(components)
+    templates, large_components = {}, []
+    for index, nodes in enumerate(components):
+        if len(nodes) == 1:
+            positions_list[index] = np.zeros((1, 2))
+            continue
+        subgraph = iGraph.induced_subgraph(nodes.tolist())
+        if len(nodes) <= template_max_size:
+            permutation = subgraph.canonical_permutation()
+            canonical_graph = subgraph.permute_vertices(permutation)
+            key = (len(nodes), tuple(sorted(canonical_graph.get_edgelist())))
+            if key not in templates:
+                templates[key] = _scale_to_area(compute_positions(canonical_graph, strategy), len(nodes))
+            positions_list[index] = templates[key][permutation]
+        elif workers > 1 and len(nodes) >= parallel_min_size:
+            large_components.append((index, subgraph))
+        else:
+            positions_list[index] = _scale_to_area(compute_positions(subgraph, strategy), len(nodes))
+
+    if large_components:
+        tasks = [(subgraph.vcount(), subgraph.get_edgelist(), strategy) for _, subgraph in large_components]
+        with multiprocessing.Pool(processes=min(workers, len(tasks))) as pool:
+            for (index, _), positions in zip(large_components, pool.map(_layout_task, tasks)):
+                positions_list[index] = positions
+    logging.info("Layout of {} components ({} templates) computed in {:.4f} seconds".format(
+        len(components), len(templates), time.time()-start))
+
+    boxes = [positions - positions.min(axis=0) for positions in positions_list]
+    offsets = pack_boxes(np.array([box.max(axis=0) for box in boxes]) + padding, aspect_ratio)
+    positions = np.zeros((iGraph.vcount(), 2))
+    for nodes, box, offset in zip(components, boxes, offsets):
+        positions[nodes] = box + offset
+    return positions
+
+
+def pack_boxes(sizes, aspect_ratio=1):
+    """
+    shelf packing of boxes of the given (width, height) sizes: boxes are sorted by decreasing height and placed from
+    left to right on shelves whose width makes the packing about aspect_ratio times wider than high,
+    return the (x, y) offsets of the boxes
+    """
+    if len(sizes) == 0:
+        return np.zeros((0, 2))
+    shelf_width = max(sizes[:, 0].max(), np.sqrt(np.prod(sizes, axis=1).sum() * aspect_ratio))
+    offsets = np.zeros((len(sizes), 2))
+    x, y, shelf_height = 0, 0, 0
+    for index in np.argsort(-sizes[:, 1], kind='stable'):
+        width, height = sizes[index]
+        if x > 0 and x + width > shelf_width:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        offsets[index] = (x, y)
+        x += width
+        shelf_height = max(shelf_height, height)
+    return offsets
+
+
+def incremental_layout(iGraph, seed_positions, fruchterman_iter=30, start_temp=0.02, seed=1337):
+    """
+    refine known positions (NaN for new nodes) with a short Fruchterman-Reingold run instead of a new layout:
+    new nodes are first placed at the average position of their placed neighbors (propagated until no more node can
+    be placed), the remaining new nodes at random positions, the low start temperature keeps the known nodes close
+    to their previous positions
+    """
+    start = time.time()
+    nodes_nb = iGraph.vcount()
+    placed = ~np.isnan(seed_positions).any(axis=1)
+    positions = np.where(placed[:, np.newaxis], seed_positions, 0)
+    if placed.sum() > 1:
+        extent = (positions[placed].max(axis=0) - positions[placed].min(axis=0)).max()
+        if extent > 0:
+            positions[placed] = (positions[placed] - positions[placed].mean(axis=0)) * np.sqrt(nodes_nb) / extent
+
+    edges = np.array(iGraph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    adjacency = sparse.csr_matrix((np.ones(2 * len(edges)), (np.r_[edges[:, 0], edges[:, 1]], np.r_[edges[:, 1], edges[:, 0]])),
+                                  shape=(nodes_nb, nodes_nb))
+    random_state = np.random.RandomState(seed)
+    while not placed.all():
+        neighbors_nb = adjacency.dot(placed.astype(float))
+        placeable = ~placed & (neighbors_nb > 0)
+        if not placeable.any():
+            break
+        neighbors_sum = adjacency.dot(positions * placed[:, np.newaxis])
+        positions[placeable] = neighbors_sum[placeable] / neighbors_nb[placeable, np.newaxis] + random_state.uniform(-0.5, 0.5, size=(placeable.sum(), 2))
+        placed |= placeable
+    if not placed.all():
+        half_side = max(np.sqrt(nodes_nb) / 2, 1)
+        positions[~placed] = random_state.uniform(-half_side, half_side, size=((~placed).sum(), 2))
+
+    positions = np.array(iGraph.layout_fruchterman_reingold(seed=positions.tolist(), niter=fruchterman_iter, start_temp=start_temp,
+                                                            grid=nodes_nb > 1000))
+    logging.info("Incremental layout of {} nodes computed in {:.4f} seconds".format(nodes_nb, time.time()-start))
+    return positions
+
+
+def _layout_task(args):
+    nodes_nb, edges, strategy = args
+    return _scale_to_area(compute_positions(igraph.Graph(n=nodes_nb, edges=edges), strategy), nodes_nb)
+
+
+def _connected_components(iGraph):
+    # igraph < 0.10 only has Graph.clusters
+    if hasattr(iGraph, 'connected_components'):
+        return iGraph.connected_components()
+    return iGraph.clusters()
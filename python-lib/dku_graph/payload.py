@@ -0,0 +1,76 @@
+import base64
+import numpy as np
+
+JSON_FORMAT = 'json'
+COLUMNAR_FORMAT = 'columnar'
+
+
+def encode_array(values, dtype):
+    """ base64 string of the little-endian bytes of values converted to dtype """
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+def decode_array(encoded, dtype):
+    return np.frombuffer(base64.b64decode(encoded), dtype=dtype)
+
+
+def get_json_payload(graph):
+    """ list of nodes and edges dicts (with their html titles) and the groups of the graph """
+    return {'nodes': list(graph.nodes.values()), 'edges': list(graph.edges.values()), 'groups': graph.groups}
+
+
+def get_columnar_payload(graph):
+    """
+    parallel arrays of the nodes and edges properties, numerical arrays are packed as base64 typed arrays:
+    - nodes: ids (list), x and y (float32), group (int32 index in group_values, -1 if none), value (float64, NaN if none)
+    - edges: from and to (int32 index of the nodes), value (float64, NaN if none), label (list or None)
+    titles are built by the webapp from these columns
+    """
+    nodes, edges = list(graph.nodes.values()), list(graph.edges.values())
+    node_index = {node: i for i, node in enumerate(graph.nodes)}
+
+    group_values, group_index = [], {}
+    groups = np.full(len(nodes), -1, dtype=np.int32)
+    for i, node in enumerate(nodes):
+        if 'group' in node:
+            if node['group'] not in group_index:
+                group_index[node['group']] = len(group_values)
+                group_values.append(node['group'])
+            groups[i] = group_index[node['group']]
+
+    edges_from = np.array([node_index[edge['from']] for edge in edges], dtype=np.int32)
+    edges_to = np.array([node_index[edge['to']] for edge in edges], dtype=np.int32)
+    has_label = len(edges) > 0 and 'label' in edges[0]
+
+    return {
+        'format': COLUMNAR_FORMAT,
+        'nodes': {
+            'count': len(nodes),
+            'ids': [node['id'] for node in nodes],
+            'x': encode_array([node.get('x', np.nan) for node in nodes], '<f4'),
+            'y': encode_array([node.get('y', np.nan) for node in nodes], '<f4'),
+            'group': encode_array(groups, '<i4'),
+            'group_values': group_values,
+            'value': encode_array([node.get('value', np.nan) for node in nodes], '<f8')
+        },
+        'edges': {
+            'count': len(edges),
+            'from': encode_array(edges_from, '<i4'),
+            'to': encode_array(edges_to, '<i4'),
+            'value': encode_array([edge.get('value', np.nan) for edge in edges], '<f8'),
+            'label': [edge['label'] for edge in edges] if has_label else None
+        },
+        'groups': graph.groups
+    }
+
+
+PAYLOAD_FORMATS = {
+    JSON_FORMAT: get_json_payload,
+    COLUMNAR_FORMAT: get_columnar_payload
+}
+
+
+def get_payload(graph, payload_format=JSON_FORMAT):
+    if payload_format not in PAYLOAD_FORMATS:
+        raise ValueError("Unknown payload format: {}".format(payload_format))
+    return PAYLOAD_FORMATS[payload_format](graph)
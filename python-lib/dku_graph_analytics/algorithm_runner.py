@@ -0,0 +1,90 @@
+import multiprocessing
+import logging
+import os
+import time
+from dku_graph.compact_graph import CompactGraph
+
+
+worker_graph = None
+worker_tasks = None
+# seconds between two checks of the running tasks
+POLL_INTERVAL = 0.05
+# timeout (in seconds) of the tasks run in a pool of processes when no timeout is set
+DEFAULT_TIMEOUT = 24 * 3600
+
+
+def _init_worker(labels, sources, targets, weights, directed, start_times, pids):
+    """ rebuild the compact graph once per worker from its arrays (inherited without copy when processes are forked) """
+    global worker_graph, worker_tasks
+    worker_graph = CompactGraph(labels, sources, targets, weights, directed=directed)
+    worker_tasks = (start_times, pids)
+
+
+def _run_worker_task(task, key, index):
+    # shared arrays are written synchronously: a worker killed during its task has always recorded it
+    start_times, pids = worker_tasks
+    pids[index] = os.getpid()
+    start_times[index] = time.time()
+    return task(worker_graph, key)
+
+
+def _is_alive(pid):
+    """ whether the process is running, dead workers are joined (and their pid freed) by the pool """
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+def _wait_results(pool, keys, async_results, start_times, pids, timeout):
+    """
+    results of the tasks, each task must finish within timeout seconds from its own start (not from the call),
+    the pool replaces a killed worker (by the OOM killer for instance) but never completes its task: it is an error
+    """
+    results = [None] * len(keys)
+    pending = list(range(len(keys)))
+    while pending:
+        async_results[pending[0]].wait(POLL_INTERVAL)
+        for index in [index for index in pending if async_results[index].ready()]:
+            results[index] = async_results[index].get()
+            pending.remove(index)
+        now = time.time()
+        for index in pending:
+            if start_times[index] == 0:
+                continue
+            if now - start_times[index] > timeout:
+                pool.terminate()
+                raise TimeoutError("{} was not computed within {} seconds".format(keys[index], timeout))
+            if not _is_alive(pids[index]) and not async_results[index].ready():
+                pool.terminate()
+                raise RuntimeError("The process computing {} was killed (out of memory for instance)".format(keys[index]))
+    return results
+
+
+def run_algorithms(compact_graph, task, keys, workers=1, timeout=None):
+    """
+    call task(compact_graph, key) for each key and return the results in the order of keys,
+    tasks run in a pool of processes when workers > 1 or when a timeout (in seconds) is set, a task that runs longer than
+    timeout (DEFAULT_TIMEOUT when not set, measured from its own start, tasks waiting for a worker are not counted) or
+    whose process is killed terminates the pool,
+    the task must be picklable (module-level function or functools.partial of one)
+    """
+    keys = list(keys)
+    if len(keys) == 0:
+        return []
+    if workers <= 1 and not timeout:
+        return [task(compact_graph, key) for key in keys]
+
+    processes = max(1, min(workers, len(keys)))
+    logging.info("Running {} algorithms in {} processes".format(len(keys), processes))
+    start = time.time()
+    # start time and process of each task, 0 until the task is started
+    start_times, pids = multiprocessing.RawArray('d', len(keys)), multiprocessing.RawArray('q', len(keys))
+    initargs = (compact_graph.labels, compact_graph.sources, compact_graph.targets, compact_graph.weights, compact_graph.directed,
+                start_times, pids)
+    with multiprocessing.Pool(processes=processes, initializer=_init_worker, initargs=initargs) as pool:
+        async_results = [pool.apply_async(_run_worker_task, (task, key, index)) for index, key in enumerate(keys)]
+        results = _wait_results(pool, keys, async_results, start_times, pids, timeout or DEFAULT_TIMEOUT)
+    logging.info("{} algorithms computed in {:.4f} seconds".format(len(keys), time.time()-start))
+    return results
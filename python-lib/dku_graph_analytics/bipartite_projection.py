@@ -0,0 +1,192 @@
+import numpy as np
+import logging
+from scipy import sparse
+
+
+HUB_SKIP = "skip"
+HUB_SAMPLE = "sample"
+
+COUNT_WEIGHT = "weight"
+JACCARD_WEIGHT = "jaccard"
+COSINE_WEIGHT = "cosine"
+OVERLAP_WEIGHT = "overlap"
+NEWMAN_WEIGHT = "newman"
+
+
+def get_incidence_matrix(graph_of_ids, linked_by_ids, graph_of_nb, linked_by_nb):
+    """ sparse graph_of x linked_by matrix with a 1 for each unique (graph_of, linked_by) pair """
+    data = np.ones(len(graph_of_ids), dtype=np.int64)
+    return sparse.csr_matrix((data, (graph_of_ids, linked_by_ids)), shape=(graph_of_nb, linked_by_nb))
+
+
+def get_row_blocks(incidence, max_block_values):
+    """
+    split the rows in consecutive blocks whose projection has at most about max_block_values values:
+    the number of products of a row is the sum of the degrees of its linked_by nodes
+    """
+    linked_by_degrees = np.asarray(incidence.sum(axis=0)).ravel()
+    row_products = incidence.dot(linked_by_degrees)
+    cumulated_products = np.cumsum(row_products)
+    blocks, start = [], 0
+    while start < incidence.shape[0]:
+        offset = cumulated_products[start - 1] if start > 0 else 0
+        end = int(np.searchsorted(cumulated_products, offset + max_block_values, side='right'))
+        end = max(end, start + 1)
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+def prune_hubs(incidence, max_degree, hub_mode=HUB_SKIP, seed=1337):
+    """
+    limit the degree of the linked_by nodes (columns) to max_degree before the projection, as a hub of degree N
+    creates N^2/2 projected edges: hubs are removed (skip) or only max_degree random pairs are kept (sample)
+    return the pruned incidence matrix and the number of hubs
+    """
+    incidence = sparse.csc_matrix(incidence)
+    degrees = np.diff(incidence.indptr)
+    hubs = degrees > max_degree
+    hubs_nb = int(hubs.sum())
+    if hubs_nb == 0:
+        return incidence.tocsr(), 0
+    columns = np.repeat(np.arange(incidence.shape[1]), degrees)
+    if hub_mode == HUB_SAMPLE:
+        # rank of each pair in a random order within its column, the first max_degree pairs of a column are kept
+        order = np.lexsort((np.random.RandomState(seed).random_sample(len(columns)), columns))
+        ranks = np.empty(len(columns), dtype=np.int64)
+        ranks[order] = np.arange(len(columns)) - np.repeat(incidence.indptr[:-1], degrees)
+        keep = ranks < max_degree
+    else:
+        keep = ~hubs[columns]
+    pruned = sparse.csc_matrix((incidence.data[keep], incidence.indices[keep], np.r_[0, np.cumsum(np.bincount(columns[keep], minlength=incidence.shape[1]))]),
+                               shape=incidence.shape)
+    return pruned.tocsr(), hubs_nb
+
+
+def normalize_weights(weights, source_degrees, target_degrees, method):
+    """ similarity of two nodes from their number of shared linked_by nodes and their degrees """
+    if method == JACCARD_WEIGHT:
+        return weights / (source_degrees + target_degrees - weights)
+    if method == COSINE_WEIGHT:
+        return weights / np.sqrt(source_degrees * target_degrees)
+    if method == OVERLAP_WEIGHT:
+        return weights / np.minimum(source_degrees, target_degrees)
+    raise ValueError("Unknown projection weight: {}".format(method))
+
+
+class BipartiteProjection:
+    """
+    projected graph B.Bt of a sparse graph_of x linked_by incidence matrix B, computed by blocks of rows,
+    the weight of a projected edge is the number of linked_by nodes shared by its two nodes, options:
+    - max_degree/hub_mode: linked_by nodes with more than max_degree pairs are skipped or sampled (see prune_hubs)
+    - min_weight: projected edges with a lower weight are dropped
+    - top_k: only the edges among the top_k strongest of one of their nodes are kept (ties broken by node id)
+    - weights: names of the weights computed for each edge, the number of shared nodes (weight), its normalization
+      by the degrees of the two nodes (jaccard, cosine, overlap) or the Newman collaboration weight: the sum of
+      1/(k-1) over the shared linked_by nodes of degree k
+    """
+
+    def __init__(self, incidence, max_degree=0, hub_mode=HUB_SKIP, min_weight=1, top_k=0, weights=(COUNT_WEIGHT,),
+                 seed=1337, max_block_values=2**25):
+        self.incidence = sparse.csr_matrix(incidence)
+        self.min_weight = min_weight
+        self.top_k = top_k
+        self.weights = list(weights)
+        self.max_block_values = max_block_values
+        self.pruned_hubs_nb = 0
+        if max_degree > 0:
+            self.incidence, self.pruned_hubs_nb = prune_hubs(self.incidence, max_degree, hub_mode, seed)
+        # degrees are computed once, after the hubs pruning
+        self.degrees = np.diff(self.incidence.indptr)
+        self.newman_incidence = None
+        if NEWMAN_WEIGHT in self.weights:
+            linked_by_degrees = np.asarray(self.incidence.sum(axis=0)).ravel()
+            # linked_by nodes of degree 1 only contribute to the diagonal, any non-zero factor keeps the same sparsity
+            factors = 1 / np.maximum(linked_by_degrees - 1, 1)
+            self.newman_incidence = sparse.csr_matrix(self.incidence.multiply(factors[np.newaxis, :]))
+        self.edges_nb = 0
+        self.pruned_edges_nb = 0
+
+    def iter_edges(self):
+        """
+        yield the arrays (sources, targets, weights) of the projected edges of each block of rows: edges of
+        the upper triangle without the diagonal (source < target), sorted by source then target,
+        weights is a dict of the selected weight names to arrays
+        """
+        self.edges_nb, self.pruned_edges_nb = 0, 0
+        blocks = self._iter_top_k_edges() if self.top_k > 0 else self._iter_upper_edges()
+        for sources, targets, counts, newman_weights in blocks:
+            self.edges_nb += len(sources)
+            yield sources, targets, self._get_weights(sources, targets, counts, newman_weights)
+        logging.info("Bipartite projection - {} edges created, {} hubs and {} edges pruned".format(
+            self.edges_nb, self.pruned_hubs_nb, self.pruned_edges_nb))
+
+    def _get_weights(self, sources, targets, counts, newman_weights):
+        weights = {}
+        for method in self.weights:
+            if method == COUNT_WEIGHT:
+                weights[method] = counts
+            elif method == NEWMAN_WEIGHT:
+                weights[method] = newman_weights
+            else:
+                weights[method] = normalize_weights(counts, self.degrees[sources], self.degrees[targets], method)
+        return weights
+
+    def _iter_blocks(self, upper):
+        """
+        yield the (sources, targets, counts, newman_weights) of the projection of each block, with counts >= min_weight,
+        newman_weights is None when the Newman weight is not selected
+        """
+        # only rows of the left operand are sliced for each block, the right operand (the transposed rows from columns_start,
+        # columns of the upper triangle) is only rebuilt when half of its rows are before the block: O(nnz.log(n)) overall
+        # instead of O(nnz) per block, with at most twice the products of the upper triangle
+        rows_nb = self.incidence.shape[0]
+        columns_start, transposed = 0, sparse.csr_matrix(self.incidence.T)
+        for start, end in get_row_blocks(self.incidence, self.max_block_values):
+            if upper and start - columns_start > (rows_nb - columns_start) // 2:
+                columns_start, transposed = start, sparse.csr_matrix(self.incidence[start:].T)
+            block = self.incidence[start:end].dot(transposed)
+            block.sort_indices()
+            block = block.tocoo()
+            sources, targets = block.row.astype(np.int64) + start, block.col.astype(np.int64) + columns_start
+            not_diagonal = sources < targets if upper else sources != targets
+            if self.min_weight > 1:
+                not_diagonal &= block.data >= self.min_weight
+                # each edge appears in the blocks of both its nodes, it is counted in the block of its source
+                self.pruned_edges_nb += int(((block.data < self.min_weight) & (sources < targets)).sum())
+            newman_weights = None
+            if self.newman_incidence is not None:
+                # same sparsity as the block of counts
+                newman_block = self.newman_incidence[start:end].dot(transposed)
+                newman_block.sort_indices()
+                newman_weights = newman_block.tocoo().data[not_diagonal]
+            yield sources[not_diagonal], targets[not_diagonal], block.data[not_diagonal], newman_weights
+
+    def _iter_upper_edges(self):
+        for sources, targets, counts, newman_weights in self._iter_blocks(upper=True):
+            order = np.lexsort((targets, sources))
+            yield sources[order], targets[order], counts[order], _take(newman_weights, order)
+
+    def _iter_top_k_edges(self):
+        """ the top_k edges of each node are selected on whole rows, the selected edges (at most k per node) are kept """
+        selected_edges, candidates_nb = [], 0
+        for sources, targets, counts, newman_weights in self._iter_blocks(upper=False):
+            candidates_nb += int((sources < targets).sum())
+            order = np.lexsort((targets, -counts, sources))
+            sources, targets, counts, newman_weights = sources[order], targets[order], counts[order], _take(newman_weights, order)
+            row_starts = np.searchsorted(sources, sources, side='left')
+            top = np.flatnonzero(np.arange(len(sources)) - row_starts < self.top_k)
+            selected_edges.append((np.minimum(sources[top], targets[top]), np.maximum(sources[top], targets[top]),
+                                   counts[top], _take(newman_weights, top)))
+        if not selected_edges:
+            return
+        sources, targets, counts = (np.concatenate(arrays) for arrays in list(zip(*selected_edges))[:3])
+        newman_weights = np.concatenate([edges[3] for edges in selected_edges]) if self.newman_incidence is not None else None
+        key_base = self.incidence.shape[0]
+        unique_keys, first_indices = np.unique(sources * key_base + targets, return_index=True)
+        self.pruned_edges_nb += candidates_nb - len(unique_keys)
+        yield unique_keys // key_base, unique_keys % key_base, counts[first_indices], _take(newman_weights, first_indices)
+
+
+def _take(array, indices):
+    return array[indices] if array is not None else None
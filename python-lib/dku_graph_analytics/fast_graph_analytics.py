@@ -0,0 +1,164 @@
+import numpy as np
+import igraph
+import logging
+import re
+import time
+from scipy.sparse import linalg, csgraph
+from dku_graph.compact_graph import CompactGraph
+
+
+# igraph >= 0.10 computes closeness on the reachable nodes only, older versions count unreachable nodes at distance n
+IGRAPH_REACHABLE_CLOSENESS = tuple(int(number) for number in re.findall(r'\d+', igraph.__version__)[:2]) >= (0, 10)
+
+
+def eigenvector_centrality(compact_graph, max_iter=50, tol=0):
+    """ same computation as nx.eigenvector_centrality_numpy: largest eigenvector of the (transposed) adjacency matrix """
+    matrix = compact_graph.to_scipy_sparse(weighted=False).astype(float)
+    _, eigenvector = linalg.eigs(matrix.T, k=1, which="LR", maxiter=max_iter, tol=tol)
+    largest = eigenvector.flatten().real
+    return largest / (np.sign(largest.sum()) * np.linalg.norm(largest))
+
+
+def pagerank(compact_graph, alpha=0.85):
+    """ nx.pagerank on an unweighted graph, undirected edges are followed in both directions (self-loops once) """
+    rows = np.repeat(np.arange(compact_graph.node_count), np.diff(compact_graph.indptr))
+    # directed graph of the adjacency lists, built from python ints like the other igraph graphs (see iter_edge_pairs)
+    iGraph = CompactGraph(compact_graph.labels, rows, compact_graph.indices, directed=True).to_igraph(weighted=False, names=False)
+    return np.array(iGraph.pagerank(damping=alpha, directed=True))
+
+
+def clustering(compact_graph):
+    """ nx.clustering for undirected graphs: self-loops are ignored and nodes with less than 2 neighbors get 0 """
+    iGraph = _simple_undirected_igraph(compact_graph)
+    return np.array(iGraph.transitivity_local_undirected(mode="zero"))
+
+
+def triangles(compact_graph):
+    """ nx.triangles: number of triangles that include each node, self-loops are ignored """
+    iGraph = _simple_undirected_igraph(compact_graph)
+    triangles_list = np.array(iGraph.list_triangles(), dtype=np.int64).ravel()
+    return np.bincount(triangles_list, minlength=compact_graph.node_count)
+
+
+def closeness_centrality(compact_graph):
+    """
+    nx.closeness_centrality with the Wasserman and Faust improved formula: (r-1)/sum_of_distances * (r-1)/(n-1)
+    where r is the number of nodes reaching the node (incoming distances are used for directed graphs)
+    """
+    iGraph = compact_graph.to_igraph(weighted=False, names=False)
+    nodes_nb = compact_graph.node_count
+    if nodes_nb <= 1:
+        return np.zeros(nodes_nb)
+    if not IGRAPH_REACHABLE_CLOSENESS:
+        distances_sum, reachable = _distance_sums(iGraph, np.arange(nodes_nb))
+        closeness = np.divide(reachable, distances_sum, out=np.zeros(nodes_nb), where=distances_sum > 0)
+        return closeness * reachable / (nodes_nb - 1)
+    # igraph closeness is (r-1)/sum_of_distances computed on the reachable nodes only
+    closeness = np.nan_to_num(np.array(iGraph.closeness(mode="in", normalized=True), dtype=float))
+    if compact_graph.directed:
+        reachable = np.array(iGraph.neighborhood_size(order=nodes_nb, mode="in", mindist=1))
+    else:
+        reachable = _component_sizes(compact_graph) - 1
+    return closeness * reachable / (nodes_nb - 1)
+
+
+def approximate_closeness_centrality(compact_graph, samples=0, error=0.1, seed=1337, max_batch_values=2**24):
+    """
+    estimate closeness_centrality from breadth-first searches started at k sampled pivot nodes (Eppstein-Wang):
+    the average distance of a node is estimated with the distances from the pivots reaching it,
+    k is 'samples' or, if 0, derived from the error bound on the average distance (in fraction of the diameter):
+    k = log(n) / error^2, the pivots are sampled in each (weakly) connected component in proportion to its size
+    (at least 2 per component) and components of at most k nodes are computed exactly, when k >= n the result is exact
+    """
+    start = time.time()
+    nodes_nb = compact_graph.node_count
+    if nodes_nb <= 1:
+        return np.zeros(nodes_nb)
+    if samples <= 0:
+        samples = int(np.ceil(np.log(nodes_nb) / error ** 2))
+    samples = min(samples, nodes_nb)
+
+    components = connected_components(compact_graph)
+    component_sizes = np.bincount(components)
+    node_component_sizes = component_sizes[components]
+    closeness = np.zeros(nodes_nb)
+    # exact closeness of a component of at most k nodes needs no more breadth-first searches than sampling it
+    small = node_component_sizes <= samples
+    if small.sum() > 1:
+        closeness[small] = closeness_centrality(_subgraph(compact_graph, small)) * (small.sum() - 1) / (nodes_nb - 1)
+
+    large_components = np.flatnonzero(component_sizes > samples)
+    pivots = np.array([], dtype=np.int64)
+    if len(large_components) > 0:
+        random_state = np.random.RandomState(seed)
+        nodes_by_component = np.argsort(components, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(component_sizes)])
+        large_nodes_nb = component_sizes[large_components].sum()
+        component_pivots = np.zeros(len(component_sizes), dtype=np.int64)
+        for component in large_components:
+            size = component_sizes[component]
+            component_pivots[component] = min(size, max(2, int(round(samples * size / large_nodes_nb))))
+        pivots = np.sort(np.concatenate([
+            random_state.choice(nodes_by_component[offsets[component]:offsets[component + 1]], size=component_pivots[component], replace=False)
+            for component in large_components]))
+
+        iGraph = compact_graph.to_igraph(weighted=False, names=False)
+        distances_sum, reaching_pivots = _distance_sums(iGraph, pivots, max_batch_values)
+        if compact_graph.directed:
+            # number of nodes reaching each node estimated from the fraction of the (other) pivots of its component reaching it
+            other_pivots = component_pivots[components] - np.isin(np.arange(nodes_nb), pivots)
+            reaching_nodes = np.divide(reaching_pivots * (node_component_sizes - 1), other_pivots,
+                                       out=np.zeros(nodes_nb), where=other_pivots > 0)
+        else:
+            reaching_nodes = node_component_sizes - 1
+        estimate = np.divide(reaching_pivots, distances_sum, out=np.zeros(nodes_nb), where=distances_sum > 0)
+        closeness[~small] = (estimate * reaching_nodes / (nodes_nb - 1))[~small]
+    logging.info("Graph analytics - closeness_centrality approximated from {} pivot nodes (out of {}, {} nodes of small components "
+                 "computed exactly) in {:.4f} seconds".format(len(pivots), nodes_nb, small.sum(), time.time()-start))
+    return closeness
+
+
+def connected_components(compact_graph):
+    """ component id of each node, components are numbered in the order of their first node """
+    _, components = csgraph.connected_components(compact_graph.to_scipy_sparse(weighted=False), directed=False)
+    return components
+
+
+def _subgraph(compact_graph, nodes_mask):
+    """ graph of the nodes of nodes_mask and the edges between them """
+    node_ids = np.cumsum(nodes_mask) - 1
+    edges_mask = nodes_mask[compact_graph.sources] & nodes_mask[compact_graph.targets]
+    return CompactGraph(compact_graph.labels[nodes_mask], node_ids[compact_graph.sources[edges_mask]],
+                        node_ids[compact_graph.targets[edges_mask]], compact_graph.weights[edges_mask],
+                        directed=compact_graph.directed)
+
+
+def _component_sizes(compact_graph):
+    components = connected_components(compact_graph)
+    return np.bincount(components)[components]
+
+
+def _simple_undirected_igraph(compact_graph):
+    iGraph = compact_graph.to_igraph(weighted=False, names=False, directed=False)
+    iGraph.simplify(multiple=True, loops=True)
+    return iGraph
+
+
+def _distance_sums(iGraph, sources, max_batch_values=2**24):
+    """
+    sum of the distances from the sources to each node and number of sources reaching each node (the node itself excluded),
+    i.e. incoming distances for directed graphs, breadth-first searches are run by batches of at most max_batch_values distances
+    """
+    nodes_nb = iGraph.vcount()
+    # Graph.distances is named Graph.shortest_paths in older igraph versions
+    get_distances = getattr(iGraph, 'distances', None) or iGraph.shortest_paths
+    distances_sum, reaching_sources = np.zeros(nodes_nb), np.zeros(nodes_nb)
+    batch_size = max(1, min(len(sources), max_batch_values // nodes_nb))
+    for batch_start in range(0, len(sources), batch_size):
+        batch = sources[batch_start:batch_start + batch_size]
+        distances = np.array(get_distances(source=batch.tolist(), mode="out"), dtype=float)
+        reachable = np.isfinite(distances)
+        reachable[np.arange(len(batch)), batch] = False
+        distances_sum += np.where(reachable, distances, 0).sum(axis=0)
+        reaching_sources += reachable.sum(axis=0)
+    return distances_sum, reaching_sources
@@ -1,27 +1,40 @@
 import networkx as nx
+import pandas as pd
+import logging
+from functools import lru_cache
 from graph_analytics_constants import Constants
+from dku_graph_analytics import fast_graph_analytics
+from dku_profiling.profiler import profile_stage
 
 
 GRAPH_ALGORITHMS = {
     Constants.EIGEN_CENTRALITY: {
         "method": (nx.eigenvector_centrality_numpy, {}),
+        "fast_method": (fast_graph_analytics.eigenvector_centrality, {}),
         "label": "eigenvector_centrality"
     },
     Constants.CLUSTERING: {
         "method": (nx.clustering, {}),
+        "fast_method": (fast_graph_analytics.clustering, {}),
+        "fast_restriction": "directed_graph",
         "label": "clustering_coefficient",
     },
     Constants.TRIANGLES: {
         "method": (nx.triangles, {}),
+        "fast_method": (fast_graph_analytics.triangles, {}),
         "label": "triangles",
         "param_restriction": "directed_graph"
     },
     Constants.CLOSENESS: {
         "method": (nx.closeness_centrality, {}),
+        "fast_method": (fast_graph_analytics.closeness_centrality, {}),
+        "approximate_method": (fast_graph_analytics.approximate_closeness_centrality, {}),
+        "approximation": Constants.CLOSENESS_APPROXIMATION,
         "label": "closeness_centrality"
     },
     Constants.PAGERANK: {
         "method": (nx.pagerank, {}),
+        "fast_method": (fast_graph_analytics.pagerank, {}),
         "label": "pagerank"
     },
     Constants.SQ_CLUSTERING: {
@@ -29,3 +42,59 @@ GRAPH_ALGORITHMS = {
         "label": "square_clustering_coefficient"
     }
 }
+
+
+def use_fast_method(algo_params, params):
+    """ whether the algorithm is computed with its igraph/scipy method or with networkx """
+    return (params[Constants.ENGINE] == Constants.FASTEST_ENGINE and "fast_method" in algo_params
+            and not params.get(algo_params.get("fast_restriction", None), None))
+
+
+def get_approximation(algo_params, params):
+    """ parameters of the approximate method if the approximation of the algorithm is selected, else None """
+    return params.get(algo_params.get("approximation", None), None)
+
+
+def get_engine_name(algo_params, params):
+    if get_approximation(algo_params, params):
+        return "sampled pivots"
+    return "igraph/scipy" if use_fast_method(algo_params, params) else "NetworkX"
+
+
+def compute_graph_algorithm(algo_params, params, compact_graph, get_networkx_graph):
+    """
+    return a dataframe with the node labels and the values of the algorithm,
+    get_networkx_graph is only called when the algorithm is computed with networkx
+    """
+    label = algo_params["label"]
+    approximation = get_approximation(algo_params, params)
+    if approximation:
+        method = algo_params["approximate_method"]
+        return pd.DataFrame({Constants.NODE_NAME: compact_graph.labels, label: method[0](compact_graph, **dict(method[1], **approximation))})
+    if use_fast_method(algo_params, params):
+        method = algo_params["fast_method"]
+        return pd.DataFrame({Constants.NODE_NAME: compact_graph.labels, label: method[0](compact_graph, **method[1])})
+    method = algo_params["method"]
+    pd_series = pd.Series(method[0](get_networkx_graph(), **method[1]), name=label).reset_index()
+    pd_series.columns = [Constants.NODE_NAME, label]
+    return pd_series
+
+
+@lru_cache(maxsize=1)
+def get_networkx_graph(compact_graph):
+    """ the NetworkX graph is only created (once) if an algorithm is computed with NetworkX """
+    logging.info("Graph analytics - Creating NetworkX graph ...")
+    with profile_stage("Graph analytics - NetworkX graph", nodes=compact_graph.node_count, edges=compact_graph.edge_count):
+        return compact_graph.to_networkx(weighted=False)
+
+
+def compute_graph_algorithm_task(compact_graph, algo, params):
+    """ compute one algorithm of GRAPH_ALGORITHMS, can run in a worker process of algorithm_runner.run_algorithms """
+    algo_params = GRAPH_ALGORITHMS[algo]
+    label = algo_params["label"]
+    logging.info("Graph analytics - Computing {} with {} ...".format(label, get_engine_name(algo_params, params)))
+    with profile_stage("Graph analytics - {}".format(label)):
+        try:
+            return compute_graph_algorithm(algo_params, params, compact_graph, lambda: get_networkx_graph(compact_graph))
+        except Exception as e:
+            raise ValueError("Error while computing {}: {}".format(label, e))
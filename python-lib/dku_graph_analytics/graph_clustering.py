@@ -1,5 +1,10 @@
 from graph_analytics_constants import Constants
+from functools import lru_cache
+import inspect
+import igraph
 import logging
+import numpy as np
+from dku_profiling.profiler import profile_stage
 
 
 CLUSTERING_ALGORITHMS = {
@@ -20,9 +25,24 @@ CLUSTERING_ALGORITHMS = {
     Constants.WALKTRAP: {
         'method': ('community_walktrap', {'weights': 'weight', 'steps': 10}),
         'label': 'walktrap'
+    },
+    Constants.LEIDEN: {
+        'method': ('community_leiden', {'objective_function': 'modularity', 'weights': 'weight'}),
+        'label': 'leiden',
+        'param_restriction': 'directed_graph',
+        'resolution': True
+    },
+    Constants.LEIDEN_CPM: {
+        'method': ('community_leiden', {'objective_function': 'CPM', 'weights': 'weight'}),
+        'label': 'leiden_cpm',
+        'param_restriction': 'directed_graph',
+        'resolution': True
     }
 }
 
+# resolution argument of community_leiden (resolution_parameter before python-igraph 0.10)
+LEIDEN_RESOLUTION = 'resolution' if 'resolution' in inspect.signature(igraph.Graph.community_leiden).parameters else 'resolution_parameter'
+
 
 def fix_dendrogram(graph, dendogram):
     """ merge disconnected sub-dendograms 'randomly' """
@@ -45,3 +65,72 @@ def fix_dendrogram(graph, dendogram):
     missing_nodes = range(num_dendrogram_nodes, num_dendrogram_nodes + len(not_merged_yet))
     dendogram._merges.extend(zip(not_merged_yet, missing_nodes))
     dendogram._nmerges = graph.vcount()-1
+
+
+@lru_cache(maxsize=1)
+def get_igraph(compact_graph):
+    """ igraph graph of the compact graph with the 'weight' edge attribute, created once (memberships are read by node id, without names) """
+    logging.info("Graph clustering - Creating igraph graph ...")
+    with profile_stage("Graph clustering - igraph graph", nodes=compact_graph.node_count, edges=compact_graph.edge_count):
+        return compact_graph.to_igraph(names=False)
+
+
+def get_clustering_keys(algorithms, resolutions):
+    """ keys of the clustering tasks: the algorithms, and (algorithm, resolution) for each resolution of the algorithms with a resolution """
+    keys = []
+    for algo in algorithms:
+        if CLUSTERING_ALGORITHMS[algo].get('resolution'):
+            keys.extend((algo, resolution) for resolution in resolutions)
+        else:
+            keys.append(algo)
+    return keys
+
+
+def get_clustering_label(key):
+    """ name of the output column of a clustering task, the label of the algorithm followed by the resolution (if any) """
+    algo, resolution = key if isinstance(key, tuple) else (key, None)
+    label = CLUSTERING_ALGORITHMS[algo]['label']
+    return label if resolution is None else "{}_{:g}".format(label, resolution)
+
+
+def compute_modularity(compact_graph, membership):
+    """ weighted modularity of the clusters of an undirected graph (self-loops count twice in the degree of their node) """
+    membership = np.asarray(membership)
+    sources, targets, weights = compact_graph.sources, compact_graph.targets, compact_graph.weights.astype(float)
+    total_weight = weights.sum()
+    if total_weight == 0:
+        return np.nan
+    inside = membership[sources] == membership[targets]
+    cluster_degrees = np.bincount(membership[sources], weights=weights, minlength=membership.max() + 1) + \
+        np.bincount(membership[targets], weights=weights, minlength=membership.max() + 1)
+    return weights[inside].sum() / total_weight - np.square(cluster_degrees / (2 * total_weight)).sum()
+
+
+def compute_clustering_task(compact_graph, key):
+    """
+    compute one algorithm of CLUSTERING_ALGORITHMS (the key is the algorithm, or (algorithm, resolution) for the
+    algorithms with a resolution) and return the cluster id of each node,
+    can run in a worker process of algorithm_runner.run_algorithms
+    """
+    algo, resolution = key if isinstance(key, tuple) else (key, None)
+    label, method = get_clustering_label(key), CLUSTERING_ALGORITHMS[algo]['method']
+    method_params = dict(method[1], **{LEIDEN_RESOLUTION: resolution}) if resolution is not None else method[1]
+    # the igraph graph is created once (per process) for all the algorithms and resolutions
+    iGraph = get_igraph(compact_graph)
+    logging.info("Graph clustering - Computing {} ...".format(label))
+    with profile_stage("Graph clustering - {}".format(label)) as stage:
+        try:
+            # call the clustering method on iGraph with the right attributes
+            result = getattr(iGraph, method[0])(**method_params)
+        except Exception as e:
+            raise ValueError("Error while computing {}: {}".format(label, e))
+        if isinstance(result, igraph.clustering.VertexDendrogram):
+            # create a unique connected dendogram for when the graph is not connected
+            fix_dendrogram(iGraph, result)
+            clusters = result.as_clustering()
+        elif isinstance(result, igraph.clustering.VertexClustering):
+            clusters = result
+        else:
+            raise ValueError("Not a VertexDendrogram nor a VertexClustering !")
+        stage.annotate(clusters=len(clusters))
+    return clusters.membership
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from graph_analytics_constants import Constants
+
+
+class NodeFeatures:
+    """
+    features of the nodes of a compact graph stored as dataframes indexed by node id (one per algorithm),
+    rows of edges are annotated by looking up the node ids of their source and target columns
+    """
+
+    def __init__(self, compact_graph, has_missing_nodes=False):
+        self.compact_graph = compact_graph
+        self.has_missing_nodes = has_missing_nodes
+        self.groups = []
+
+    def add(self, features):
+        """ add a group of features: dict of column name -> array of values ordered by node id """
+        self.groups.append(pd.DataFrame(features))
+
+    def add_dataframe(self, df):
+        """ add the features of a dataframe with a node_name column (in any order of nodes) """
+        group = df.drop(columns=[Constants.NODE_NAME])
+        group.index = self.compact_graph.get_node_ids(df[Constants.NODE_NAME].values)
+        self.groups.append(group.reindex(np.arange(self.compact_graph.node_count)))
+
+    def get_nodes_dataframe(self, node_column):
+        """ one row per node: the node label followed by all the features """
+        labels_df = pd.DataFrame({node_column: self.compact_graph.labels})
+        return pd.concat([labels_df] + self.groups, axis=1)
+
+    def get_edges_tables(self):
+        """
+        feature tables used to annotate edges, when some rows have a missing node an all-NaN row is appended to each
+        table so that the -1 id of missing nodes points to it (the features then get the dtype of a left merge)
+        """
+        if not self.has_missing_nodes:
+            return self.groups
+        return [group.reindex(np.arange(self.compact_graph.node_count + 1)) for group in self.groups]
+
+    def get_edges_features(self, node_columns, tables=None):
+        """ empty dataframe of the features appended by annotate_edges, with the dtypes of every annotated chunk """
+        tables = self.get_edges_tables() if tables is None else tables
+        edges_df = pd.DataFrame({node_column: pd.Series([], dtype=object) for node_column in node_columns})
+        return self.annotate_edges(edges_df, node_columns, tables).drop(columns=list(node_columns))
+
+    def annotate_edges(self, df, node_columns, tables=None):
+        """
+        append the features of the nodes of each node column to a dataframe of edges, with the same column names and
+        order as successive left merges: features of a group are suffixed with _source and _target for two node columns
+        """
+        tables = self.get_edges_tables() if tables is None else tables
+        node_ids = [self.compact_graph.get_node_ids(df[node_column].values) for node_column in node_columns]
+        suffixes = ['_source', '_target'] if len(node_columns) > 1 else ['']
+        annotated = {}
+        for table in tables:
+            for ids, suffix in zip(node_ids, suffixes):
+                values = table.take(ids)
+                for column in table.columns:
+                    annotated[column + suffix] = values[column].values
+        return pd.concat([df.reset_index(drop=True), pd.DataFrame(annotated, index=np.arange(len(df)))], axis=1)
@@ -0,0 +1,185 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+
+
+_local = threading.local()
+
+
+def _read_status(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def reset_peak_rss():
+    """ reset the peak RSS of the process (Linux only), return False if it is not possible """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def get_rss_mb():
+    """ current and peak RSS of the process in MB, both are the peak of the process when /proc is not available """
+    try:
+        return _read_status('VmRSS'), _read_status('VmHWM')
+    except (IOError, OSError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        return peak, peak
+
+
+class Stage:
+    """ wall time, CPU time, peak RSS delta (MB) and counts (nodes, edges, rows ...) of a stage of a run """
+
+    def __init__(self, name, counts=None):
+        self.name = name
+        self.counts = dict(counts or {})
+        self.wall_s, self.cpu_s, self.peak_rss_delta_mb = None, None, None
+        self.peak_rss_mb = 0
+
+    def annotate(self, **counts):
+        self.counts.update(counts)
+
+    def start(self):
+        self.rss_before, _ = get_rss_mb()
+        self.wall_start, self.cpu_start = time.perf_counter(), time.process_time()
+
+    def stop(self):
+        self.wall_s, self.cpu_s = time.perf_counter() - self.wall_start, time.process_time() - self.cpu_start
+        self.peak_rss_delta_mb = max(self.peak_rss_mb - self.rss_before, 0)
+
+    def to_dict(self):
+        stage = {'stage': self.name, 'wall_s': round(self.wall_s, 4), 'cpu_s': round(self.cpu_s, 4),
+                 'peak_rss_delta_mb': round(self.peak_rss_delta_mb, 1)}
+        stage.update(self.counts)
+        return stage
+
+
+class RunProfiler:
+    """
+    stages of a run (a recipe or a request of the webapp), stages are recorded by profile_stage in the thread where
+    the profiler is active (with RunProfiler(...) as profiler), the whole run can also be profiled with cProfile,
+    the peak RSS is the peak of the process, it is reset at the start of each stage on Linux,
+    without reset_peak (processes serving other requests like the webapp) the RSS delta of each stage is reported
+    """
+
+    def __init__(self, name, cprofile=False, reset_peak=True):
+        self.name = name
+        self.reset_peak = reset_peak
+        self.stages = []
+        self.open_stages = []
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.run = Stage(name)
+
+    def __enter__(self):
+        self.previous_profiler = get_profiler()
+        _local.profiler = self
+        self._start_stage(self.run)
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        self._stop_stage(self.run)
+        _local.profiler = self.previous_profiler
+        return False
+
+    def _update_peaks(self):
+        """ the peak RSS is reset at the start of each stage, the stages that are still open keep their own peak """
+        rss, peak_rss = get_rss_mb()
+        if not self.reset_peak:
+            peak_rss = rss
+        for stage in self.open_stages:
+            stage.peak_rss_mb = max(stage.peak_rss_mb, peak_rss)
+
+    def _start_stage(self, stage):
+        self._update_peaks()
+        if self.reset_peak:
+            reset_peak_rss()
+        self.open_stages.append(stage)
+        stage.start()
+
+    def _stop_stage(self, stage):
+        self._update_peaks()
+        self.open_stages.remove(stage)
+        stage.stop()
+
+    @contextmanager
+    def stage(self, name, **counts):
+        stage = Stage(name, counts)
+        self._start_stage(stage)
+        try:
+            yield stage
+        finally:
+            self._stop_stage(stage)
+            self.stages.append(stage)
+
+    def summary(self):
+        summary = {'run': self.name, 'stages': [stage.to_dict() for stage in self.stages]}
+        if self.run.wall_s is not None:
+            summary.update({key: value for key, value in self.run.to_dict().items() if key != 'stage'})
+        return summary
+
+    def get_dataframe(self):
+        """ one row per stage, the last row is the whole run """
+        rows = [dict(stage.to_dict(), run=self.name) for stage in self.stages + [self.run]]
+        return pd.DataFrame(rows, columns=list(dict.fromkeys(['run', 'stage'] + [key for row in rows for key in row])))
+
+    def get_header(self):
+        """ compact json summary, small enough for a response header """
+        return json.dumps(self.summary(), separators=(',', ':'), default=str)
+
+    def get_cprofile_stats(self, limit=30):
+        """ functions with the highest cumulative time in the cProfile of the run """
+        if self.cprofile is None:
+            return ""
+        output = io.StringIO()
+        pstats.Stats(self.cprofile, stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    def log_summary(self):
+        logging.info("Profile of {}: {}".format(self.name, self.get_header()))
+        if self.cprofile is not None:
+            logging.info("cProfile of {}:\n{}".format(self.name, self.get_cprofile_stats()))
+
+
+def get_profiler():
+    """ active profiler of the current thread, None if there is none """
+    return getattr(_local, 'profiler', None)
+
+
+@contextmanager
+def profile_stage(name, **counts):
+    """
+    measure the block as a stage of the active profiler (if any) and log its duration,
+    counts can be added to the yielded stage with stage.annotate(nodes=..., edges=...)
+    """
+    profiler = get_profiler()
+    if profiler is not None:
+        with profiler.stage(name, **counts) as stage:
+            yield stage
+    else:
+        stage = Stage(name, counts)
+        stage.start()
+        try:
+            yield stage
+        finally:
+            stage.peak_rss_mb = get_rss_mb()[1]
+            stage.stop()
+    logging.info("{} done in {:.4f} seconds{}".format(
+        name, stage.wall_s, " ({})".format(", ".join("{} {}".format(value, key) for key, value in stage.counts.items())) if stage.counts else ""))
@@ -11,14 +11,32 @@ class Constants:
     DIRECTED = "directed_graph"
     OUTPUT_TYPE = "output_type"
     COMPUTATION_MODE = "computation_mode"
+    ENGINE = "engine"
+    FASTEST_ENGINE = "fastest"
+    NETWORKX_ENGINE = "networkx"
+    WORKERS = "parallel_workers"
+    TIMEOUT = "algorithm_timeout"
+    CLOSENESS_APPROXIMATION = "closeness_approximation"
     GRAPH_OF = "create_graph_of"
     LINKED_BY = "linked_by"
     WEIGHTED = "weighted"
+    HUB_MAX_DEGREE = "hub_max_degree"
+    HUB_MODE = "hub_mode"
+    MIN_WEIGHT = "min_weight"
+    TOP_K = "top_k"
+    PROJECTION_WEIGHTS = "projection_weights"
     WEIGHT = "weight"
     FASTGREEDY = "fastgreedy"
     MULTILEVEL = "multilevel"
     INFOMAP = "infomap"
     WALKTRAP = "walktrap"
+    LEIDEN = "leiden"
+    LEIDEN_CPM = "leiden_cpm"
+    RESOLUTIONS = "resolutions"
+    CPROFILE = "cprofile"
+    GRAPH_CACHE = "graph_cache"
+    GRAPH_CACHE_DIRECTORY = "graph_cache_directory"
+    GRAPH_CACHE_MAX_SIZE = "graph_cache_max_size"
 
 
 EXISTING_COLORS = [
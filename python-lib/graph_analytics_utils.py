@@ -1,6 +1,14 @@
 import dataiku
+from dataiku.core.schema_handling import get_schema_from_df
 from dataiku.customrecipe import get_input_names_for_role, get_output_names_for_role
 from graph_analytics_constants import Constants
+from dku_graph.dataset_reader import CHUNK_SIZE, get_column_types, iter_dataset_chunks, read_edges, cast_to_schema
+from dku_graph.artifact_cache import GraphArtifact, GraphArtifactCache
+from dku_profiling.profiler import profile_stage
+import getpass
+import logging
+import os
+import tempfile
 
 
 class AlgorithmError(Exception):
@@ -18,6 +26,132 @@ def get_output_dataset(role):
     return dataiku.Dataset(names[0]) if len(names) > 0 else None
 
 
+def write_chunks(dataset, chunks, schema=None):
+    """
+    write the schema (by default the one of the first chunk) then all the chunks through a single writer,
+    chunks are cast to the given schema
+    """
+    writer = None
+    if schema is not None:
+        dataset.write_schema(schema)
+        writer = dataset.get_writer()
+    try:
+        for chunk in chunks:
+            if writer is None:
+                dataset.write_schema_from_dataframe(chunk)
+                writer = dataset.get_writer()
+            writer.write_dataframe(cast_to_schema(chunk, schema) if schema is not None else chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_edges_with_features(input_dataset, output_dataset, node_features, node_columns, chunksize=CHUNK_SIZE):
+    """
+    copy the input dataset by chunks into the output dataset, each row annotated with the features of its nodes,
+    the output schema is the input schema followed by the features (a chunk does not tell the type of a column)
+    """
+    tables = node_features.get_edges_tables()
+    schema = input_dataset.read_schema() + get_schema_from_df(node_features.get_edges_features(node_columns, tables))
+
+    with profile_stage("Edges writing") as stage:
+        def annotated_chunks():
+            rows_nb = 0
+            for chunk in iter_dataset_chunks(input_dataset, chunksize=chunksize):
+                rows_nb += len(chunk)
+                yield node_features.annotate_edges(chunk, node_columns, tables)
+            stage.annotate(rows=rows_nb)
+
+        write_chunks(output_dataset, annotated_chunks(), schema)
+
+
+def get_dataset_version(dataset):
+    """ settings version and last build time of the dataset, None if they cannot be read """
+    try:
+        version_tag = dataset.get_config().get('versionTag', {})
+        project = dataiku.api_client().get_project(dataset.project_key)
+        last_build = project.get_dataset(dataset.short_name).get_info().get_raw().get('lastBuild', {})
+        return (version_tag.get('versionNumber'), version_tag.get('lastModifiedOn'), last_build.get('buildEndTime'))
+    except Exception as e:
+        logging.warning("Could not read the version of dataset {}: {}".format(dataset.full_name, e))
+        return None
+
+
+def has_last_build(version):
+    """ whether a version of get_dataset_version identifies the content of the dataset, i.e. it has a last build time """
+    return version is not None and version[2] is not None
+
+
+def get_default_graph_cache_directory():
+    """ directory of the graph artifacts shared by the recipes of a user (see load_edges), it is private to the user """
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError, ImportError):
+        # no login name in the environment and no entry of the uid in the password database (containers for instance)
+        user = os.getuid()
+    return os.path.join(tempfile.gettempdir(), "dku_graph_artifacts_{}".format(user))
+
+
+def get_graph_cache(params):
+    """ GraphArtifactCache of the recipe, None when the graph cache is disabled """
+    if not params[Constants.GRAPH_CACHE]:
+        return None
+    return GraphArtifactCache(params[Constants.GRAPH_CACHE_DIRECTORY] or get_default_graph_cache_directory(), params[Constants.GRAPH_CACHE_MAX_SIZE])
+
+
+def get_read_partitions(dataset):
+    """ sorted partitions of the dataset read by the recipe, [] if it is not partitioned, None if they are not known """
+    try:
+        if not dataset.get_config().get('partitioning', {}).get('dimensions'):
+            return []
+    except Exception as e:
+        logging.warning("Could not read the partitioning of dataset {}: {}".format(dataset.full_name, e))
+        return None
+    read_partitions = getattr(dataset, 'read_partitions', None)
+    return sorted(read_partitions) if read_partitions else None
+
+
+def load_edges(dataset, source, target, weight=None, directed=False, bipartite=False, cache=None):
+    """
+    GraphArtifact of the edges of the dataset (see read_edges), with a GraphArtifactCache the edges are only read once
+    per version of the dataset, read partitions and settings, datasets without a last build time (their content can
+    change without a new version) and partitioned datasets whose read partitions are not known are always read
+    """
+    def compute():
+        return GraphArtifact.from_accumulator(read_edges(dataset, source, target, weight=weight, directed=directed, bipartite=bipartite))
+    if cache is None:
+        return compute()
+    version = get_dataset_version(dataset)
+    if not has_last_build(version):
+        logging.info("Graph cache not used: dataset {} has no last build time".format(dataset.full_name))
+        return compute()
+    partitions = get_read_partitions(dataset)
+    if partitions is None:
+        logging.info("Graph cache not used: the partitions read from dataset {} are not known".format(dataset.full_name))
+        return compute()
+    params = {'dataset': dataset.full_name, 'version': version, 'partitions': partitions, 'source': source, 'target': target,
+              'weight': weight, 'directed': directed, 'bipartite': bipartite}
+    with profile_stage("Graph artifact") as stage:
+        artifact = cache.get_or_compute(params, compute)
+        stage.annotate(rows=artifact.rows_nb, edges=len(artifact.sources))
+    return artifact
+
+
+def write_profile(profiler, dataset):
+    """ log the profile of the recipe and write its stages (one row per stage) into the profile dataset, if any """
+    profiler.log_summary()
+    if dataset is not None:
+        dataset.write_with_schema(profiler.get_dataframe())
+
+
+def get_graph_cache_params(recipe_config):
+    params = {}
+    params[Constants.GRAPH_CACHE] = recipe_config.get('graph_cache', False)
+    params[Constants.GRAPH_CACHE_DIRECTORY] = recipe_config.get('graph_cache_directory', None)
+    params[Constants.GRAPH_CACHE_MAX_SIZE] = int(recipe_config.get('graph_cache_max_size', 2048) or 2048)
+    return params
+
+
 def get_analytics_recipe_params(recipe_config):
     params = {}
     params[Constants.SOURCE] = recipe_config['node_A']
@@ -26,6 +160,19 @@ def get_analytics_recipe_params(recipe_config):
     params[Constants.DIRECTED] = recipe_config.get('directed_graph', False)
     params[Constants.OUTPUT_TYPE] = recipe_config.get('output_type', 'output_nodes')
     params[Constants.COMPUTATION_MODE] = recipe_config.get('computation_mode', 'select_features')
+    params[Constants.ENGINE] = recipe_config.get('engine', Constants.FASTEST_ENGINE)
+    params[Constants.WORKERS] = int(recipe_config.get('parallel_workers', 1) or 1)
+    params[Constants.TIMEOUT] = int(recipe_config.get('algorithm_timeout', 0) or 0)
+    params[Constants.CPROFILE] = recipe_config.get('cprofile', False)
+    params.update(get_graph_cache_params(recipe_config))
+
+    params[Constants.CLOSENESS_APPROXIMATION] = None
+    if recipe_config.get('closeness_mode', 'exact') == 'approximate':
+        params[Constants.CLOSENESS_APPROXIMATION] = {
+            'samples': int(recipe_config.get('closeness_samples', 0) or 0),
+            'error': float(recipe_config.get('closeness_error', 0.1) or 0.1),
+            'seed': int(recipe_config.get('closeness_seed', 1337))
+        }
 
     if params[Constants.COMPUTATION_MODE] != 'compute_all_features':
         params[Constants.EIGEN_CENTRALITY] = recipe_config.get('eigenvector_centrality', False)
@@ -57,23 +204,55 @@ def get_clustering_recipe_params(recipe_config):
     params[Constants.DIRECTED] = recipe_config.get('directed_graph', False)
     params[Constants.OUTPUT_TYPE] = recipe_config.get('output_type', 'output_nodes')
     params[Constants.COMPUTATION_MODE] = recipe_config.get('computation_mode', 'select_features')
+    params[Constants.WORKERS] = int(recipe_config.get('parallel_workers', 1) or 1)
+    params[Constants.TIMEOUT] = int(recipe_config.get('algorithm_timeout', 0) or 0)
+    params[Constants.CPROFILE] = recipe_config.get('cprofile', False)
+    params.update(get_graph_cache_params(recipe_config))
 
     if params[Constants.COMPUTATION_MODE] != 'compute_all_features':
         params[Constants.FASTGREEDY] = recipe_config.get('fastgreedy', False)
         params[Constants.MULTILEVEL] = recipe_config.get('multilevel', False)
         params[Constants.INFOMAP] = recipe_config.get('infomap', False)
         params[Constants.WALKTRAP] = recipe_config.get('walktrap', False)
+        params[Constants.LEIDEN] = recipe_config.get('leiden', False)
+        params[Constants.LEIDEN_CPM] = recipe_config.get('leiden_cpm', False)
     else:
         params[Constants.FASTGREEDY] = True
         params[Constants.MULTILEVEL] = True
         params[Constants.INFOMAP] = True
         params[Constants.WALKTRAP] = True
+        params[Constants.LEIDEN] = True
+        # the resolution of CPM depends on the scale of the weights, it is only computed when selected
+        params[Constants.LEIDEN_CPM] = False
+    params[Constants.RESOLUTIONS] = get_resolutions(recipe_config.get('resolutions', None))
     return params
 
 
+def get_resolutions(resolutions):
+    """ list of the resolutions of a comma-separated string, [1.0] when empty """
+    try:
+        values = [float(value) for value in str(resolutions or '').replace(';', ',').split(',') if value.strip()]
+    except ValueError:
+        raise ValueError("Resolutions must be comma-separated numbers: {}".format(resolutions))
+    if any(value < 0 for value in values):
+        raise ValueError("Resolutions must be positive: {}".format(resolutions))
+    return list(dict.fromkeys(values)) or [1.0]
+
+
 def get_bipartite_recipe_params(recipe_config):
     params = {}
     params[Constants.GRAPH_OF] = recipe_config['create_graph_of']
     params[Constants.LINKED_BY] = recipe_config['linked_by']
     params[Constants.WEIGHTED] = recipe_config['weighted']
+    params[Constants.HUB_MAX_DEGREE] = int(recipe_config.get('hub_max_degree', 0) or 0)
+    params[Constants.HUB_MODE] = recipe_config.get('hub_mode', 'skip')
+    params[Constants.MIN_WEIGHT] = int(recipe_config.get('min_weight', 1) or 1)
+    params[Constants.TOP_K] = int(recipe_config.get('top_k', 0) or 0)
+    params[Constants.CPROFILE] = recipe_config.get('cprofile', False)
+    params.update(get_graph_cache_params(recipe_config))
+    # names of the weight columns of the output, in this order
+    params[Constants.PROJECTION_WEIGHTS] = ['weight'] if params[Constants.WEIGHTED] else []
+    for weight in ['jaccard', 'cosine', 'overlap', 'newman']:
+        if recipe_config.get(weight + '_weight', False):
+            params[Constants.PROJECTION_WEIGHTS].append(weight)
     return params
@@ -0,0 +1,63 @@
+"""
+Speed and accuracy of the approximate closeness centrality compared to the exact computations, on synthetic graphs
+
+    PYTHONPATH=python-lib python tests/python/benchmarks/benchmark_closeness.py --sizes 2000 10000 50000
+"""
+import argparse
+import random
+import time
+import igraph
+import numpy as np
+import networkx as nx
+from scipy.stats import spearmanr
+from dku_graph.compact_graph import CompactGraph
+from dku_graph_analytics import fast_graph_analytics
+
+
+def synthetic_graph(kind, nodes_nb, seed=0):
+    igraph.set_random_number_generator(random.Random(seed))
+    if kind == "erdos_renyi":
+        iGraph = igraph.Graph.Erdos_Renyi(n=nodes_nb, m=3 * nodes_nb)
+    else:
+        iGraph = igraph.Graph.Barabasi(n=nodes_nb, m=3)
+    edges = np.array(iGraph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    return CompactGraph.from_codes(np.arange(nodes_nb), edges[:, 0], edges[:, 1])
+
+
+def timed(method, *args, **kwargs):
+    start = time.time()
+    result = method(*args, **kwargs)
+    return result, time.time() - start
+
+
+def run(sizes, errors, networkx_max_nodes):
+    print("{:<12} {:>8} {:<22} {:>9} {:>8} {:>10} {:>10} {:>9}".format(
+        "graph", "nodes", "method", "seconds", "speedup", "mean_err", "max_err", "spearman"))
+    for kind in ["erdos_renyi", "barabasi"]:
+        for nodes_nb in sizes:
+            compact_graph = synthetic_graph(kind, nodes_nb)
+            exact, exact_time = timed(fast_graph_analytics.closeness_centrality, compact_graph)
+            rows = [("exact igraph", exact, exact_time)]
+            if nodes_nb <= networkx_max_nodes:
+                networkx_graph = compact_graph.to_networkx(weighted=False)
+                networkx_result, networkx_time = timed(nx.closeness_centrality, networkx_graph)
+                rows.append(("exact networkx", np.array([networkx_result[node] for node in range(nodes_nb)]), networkx_time))
+            for error in errors:
+                approximate, approximate_time = timed(fast_graph_analytics.approximate_closeness_centrality, compact_graph, error=error)
+                rows.append(("approximate e={}".format(error), approximate, approximate_time))
+
+            reached = exact > 0
+            for method, values, seconds in rows:
+                relative_error = np.abs(values - exact)[reached] / exact[reached]
+                print("{:<12} {:>8} {:<22} {:>9.3f} {:>8.1f} {:>10.4f} {:>10.4f} {:>9.4f}".format(
+                    kind, nodes_nb, method, seconds, exact_time / seconds, relative_error.mean(), relative_error.max(),
+                    spearmanr(values, exact).correlation))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--errors", type=float, nargs="+", default=[0.1, 0.05])
+    parser.add_argument("--networkx-max-nodes", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.sizes, args.errors, args.networkx_max_nodes)
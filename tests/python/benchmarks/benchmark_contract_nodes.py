@@ -0,0 +1,37 @@
+"""
+Speed of Graph._contract_nodes compared to the previous pandas implementation, on positions of clustered nodes
+
+    PYTHONPATH=python-lib:tests/python/unit python tests/python/benchmarks/benchmark_contract_nodes.py --sizes 1000 10000 100000
+"""
+import argparse
+import time
+import numpy as np
+from dku_graph.graph import Graph
+from test_graph import legacy_contract_nodes, clustered_positions
+
+
+def timed(method, *args, **kwargs):
+    start = time.time()
+    result = method(*args, **kwargs)
+    return result, time.time() - start
+
+
+def run(sizes, clusters_nb):
+    graph = Graph({'max_nodes': 10})
+    print("{:>8} {:>10} {:>12} {:>10} {:>9} {:>12}".format("nodes", "outliers", "legacy_s", "numpy_s", "speedup", "max_diff"))
+    for nodes_nb in sizes:
+        positions = clustered_positions(nodes_nb, clusters_nb=clusters_nb)
+        expected, legacy_time = timed(legacy_contract_nodes, positions.copy())
+        contracted, numpy_time = timed(graph._contract_nodes, positions.copy())
+        differences = np.diff(np.sort(positions, axis=0), axis=0)
+        outliers_nb = int((differences > differences.mean(axis=0) + 3 * differences.std(axis=0, ddof=1)).sum())
+        print("{:>8} {:>10} {:>12.4f} {:>10.4f} {:>9.1f} {:>12.2e}".format(
+            nodes_nb, outliers_nb, legacy_time, numpy_time, legacy_time / numpy_time, np.abs(contracted - expected).max()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--clusters", type=int, default=50)
+    args = parser.parse_args()
+    run(args.sizes, args.clusters)
@@ -0,0 +1,148 @@
+"""
+Wall time, CPU time and peak memory of each stage of the plugin on synthetic edge lists, without DSS:
+reading the edges (with the read_edges of the recipes), graph analytics, graph clustering, bipartite projection,
+creation and layout of the graph chart. Results are saved as JSON and compared to a baseline to flag regressions.
+Timings depend on the machine: the baseline is generated locally, e.g. on the main branch, then compared to a change:
+
+    PYTHONPATH=python-lib:tests/python/benchmarks python tests/python/benchmarks/benchmark_suite.py \\
+        --sizes 1000 10000 --output baseline.json
+    PYTHONPATH=python-lib:tests/python/benchmarks python tests/python/benchmarks/benchmark_suite.py \\
+        --sizes 1000 10000 --output results.json --baseline baseline.json
+
+Peak RSS is reset before each stage on Linux (/proc/self/clear_refs), elsewhere it is the peak of the process.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from graph_analytics_constants import Constants
+from dku_graph.dataset_reader import read_edges
+from dku_graph.graph import Graph
+from dku_profiling.profiler import reset_peak_rss, get_rss_mb
+from dku_graph_analytics.graph_analytics import GRAPH_ALGORITHMS, compute_graph_algorithm_task
+from dku_graph_analytics.graph_clustering import CLUSTERING_ALGORITHMS, compute_clustering_task, get_igraph
+from dku_graph_analytics.bipartite_projection import get_incidence_matrix, BipartiteProjection
+from synthetic_datasets import GENERATORS, SyntheticDataset, edges_dataframe
+
+DEFAULT_ALGORITHMS = [Constants.EIGEN_CENTRALITY, Constants.CLUSTERING, Constants.TRIANGLES, Constants.CLOSENESS, Constants.PAGERANK]
+DEFAULT_CLUSTERING = [Constants.MULTILEVEL, Constants.FASTGREEDY]
+
+
+class StageRecorder:
+    """ run stages and record their wall time, CPU time, peak RSS and RSS delta (MB) """
+
+    def __init__(self):
+        self.results = []
+
+    def run(self, dataset, size, stage, method, *args, **kwargs):
+        reset_peak_rss()
+        rss_before, _ = get_rss_mb()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = method(*args, **kwargs)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        _, peak_rss = get_rss_mb()
+        self.results.append({
+            'dataset': dataset, 'size': size, 'stage': stage, 'wall_s': round(wall, 4), 'cpu_s': round(cpu, 4),
+            'peak_rss_mb': round(peak_rss, 1), 'peak_rss_delta_mb': round(peak_rss - rss_before, 1)
+        })
+        print("{:<16} {:>8} {:<32} {:>9.3f} {:>9.3f} {:>10.1f} {:>10.1f}".format(
+            dataset, size, stage, wall, cpu, peak_rss, peak_rss - rss_before))
+        return result
+
+    def annotate(self, **counts):
+        self.results[-1].update(counts)
+
+
+def project(accumulator):
+    sources, targets, _ = accumulator.get_edges()
+    incidence = get_incidence_matrix(sources, targets, len(accumulator.source_indexer), len(accumulator.target_indexer))
+    return sum(len(block[0]) for block in BipartiteProjection(incidence, weights=['weight', 'jaccard']).iter_edges())
+
+
+def create_chart_graph(df, max_nodes):
+    graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': max_nodes, 'edges_width': 'weight'})
+    graph.create_graph(df)
+    return graph
+
+
+def run_dataset(recorder, kind, size, algorithms, clustering, max_nodes):
+    df = edges_dataframe(kind, size)
+    dataset = SyntheticDataset("{}_{}".format(kind, size), df)
+
+    compact_graph = recorder.run(kind, size, 'read_edges', lambda: read_edges(dataset, 'source', 'target').get_graph())
+    recorder.annotate(nodes=compact_graph.node_count, edges=compact_graph.edge_count, rows=len(df))
+
+    params = {Constants.ENGINE: Constants.FASTEST_ENGINE, Constants.DIRECTED: False,
+              Constants.CLOSENESS_APPROXIMATION: {'samples': 0, 'error': 0.1, 'seed': 1337} if size > 5000 else None}
+    for algo in algorithms:
+        recorder.run(kind, size, 'analytics:' + GRAPH_ALGORITHMS[algo]['label'], compute_graph_algorithm_task, compact_graph, algo, params)
+
+    if clustering:
+        get_igraph.cache_clear()
+        recorder.run(kind, size, 'clustering:igraph', get_igraph, compact_graph)
+        for algo in clustering:
+            recorder.run(kind, size, 'clustering:' + CLUSTERING_ALGORITHMS[algo]['label'], compute_clustering_task, compact_graph, algo)
+
+    if kind == 'bipartite':
+        accumulator = recorder.run(kind, size, 'projection:read_edges', read_edges, dataset, 'source', 'target', bipartite=True)
+        edges_nb = recorder.run(kind, size, 'projection:project', project, accumulator)
+        recorder.annotate(edges=edges_nb)
+
+    graph = recorder.run(kind, size, 'chart:create_graph', create_chart_graph, df, max_nodes)
+    recorder.annotate(nodes=len(graph.nodes), edges=len(graph.edges))
+    recorder.run(kind, size, 'chart:layout', graph.compute_layout, scale=100, scale_ratio=1)
+
+
+def find_regressions(results, baseline, tolerance, min_seconds=0.05, min_mb=20):
+    """ stages slower or using more memory than their baseline by more than tolerance (and min_seconds or min_mb) """
+    baseline_stages = {(stage['dataset'], stage['size'], stage['stage']): stage for stage in baseline}
+    regressions = []
+    for stage in results:
+        reference = baseline_stages.get((stage['dataset'], stage['size'], stage['stage']))
+        if reference is None:
+            continue
+        for key, minimum in [('wall_s', min_seconds), ('peak_rss_delta_mb', min_mb)]:
+            if stage[key] > reference[key] * (1 + tolerance) and stage[key] - reference[key] > minimum:
+                regressions.append("{dataset} {size} {stage}: ".format(**stage) + "{} {} -> {}".format(key, reference[key], stage[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--algorithms", nargs="*", default=DEFAULT_ALGORITHMS, choices=list(GRAPH_ALGORITHMS))
+    parser.add_argument("--clustering", nargs="*", default=DEFAULT_CLUSTERING, choices=list(CLUSTERING_ALGORITHMS))
+    parser.add_argument("--max-nodes", type=int, default=1000, help="max_nodes of the graph chart")
+    parser.add_argument("--output", help="JSON file of the results")
+    parser.add_argument("--baseline", help="JSON file of previous results to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="relative slowdown or memory increase flagged as a regression")
+    args = parser.parse_args()
+
+    if not reset_peak_rss():
+        print("Peak RSS cannot be reset on this platform, peak values are the peak of the process")
+    print("{:<16} {:>8} {:<32} {:>9} {:>9} {:>10} {:>10}".format("dataset", "size", "stage", "wall_s", "cpu_s", "peak_mb", "delta_mb"))
+    recorder = StageRecorder()
+    for kind in args.datasets:
+        for size in args.sizes:
+            run_dataset(recorder, kind, size, args.algorithms, args.clustering, args.max_nodes)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'platform': platform.platform(), 'python': platform.python_version(), 'results': recorder.results}, output, indent=1)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline.get('platform'), baseline.get('python')) != (platform.platform(), platform.python_version()):
+            print("\nThe baseline was generated on {} (Python {}), its timings are not comparable".format(baseline.get('platform'), baseline.get('python')))
+        regressions = find_regressions(recorder.results, baseline['results'], args.tolerance)
+        print("\n{} regression(s) compared to {}".format(len(regressions), args.baseline))
+        for regression in regressions:
+            print("  " + regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
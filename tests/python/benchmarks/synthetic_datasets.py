@@ -0,0 +1,79 @@
+"""
+Synthetic edge lists served by a local stand-in of dataiku.Dataset, to run the benchmarks without DSS
+"""
+import random
+import igraph
+import numpy as np
+import pandas as pd
+
+
+def erdos_renyi(nodes_nb, random_state):
+    sources = random_state.randint(nodes_nb, size=3 * nodes_nb)
+    targets = random_state.randint(nodes_nb, size=3 * nodes_nb)
+    return sources, targets
+
+
+def power_law(nodes_nb, random_state):
+    igraph.set_random_number_generator(random.Random(int(random_state.randint(2**31))))
+    edges = np.array(igraph.Graph.Barabasi(n=nodes_nb, m=3).get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    return edges[:, 0], edges[:, 1]
+
+
+def bipartite(nodes_nb, random_state):
+    """ nodes_nb users linked to nodes_nb / 10 items whose popularity decreases as rank^-0.8, 5 items per user """
+    items_nb = max(nodes_nb // 10, 1)
+    popularity = np.arange(1, items_nb + 1) ** -0.8
+    sources = random_state.randint(nodes_nb, size=5 * nodes_nb)
+    targets = random_state.choice(items_nb, size=5 * nodes_nb, p=popularity / popularity.sum()) + nodes_nb
+    return sources, targets
+
+
+def many_components(nodes_nb, random_state):
+    """ random trees of 2 to 20 nodes """
+    sizes = random_state.randint(2, 21, size=nodes_nb // 2)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), nodes_nb)]
+    firsts = np.repeat(np.cumsum(sizes) - sizes, sizes - 1)
+    offsets = np.concatenate([np.arange(1, size) for size in sizes]) if len(sizes) > 0 else np.zeros(0, dtype=np.int64)
+    parents = (random_state.uniform(size=len(offsets)) * offsets).astype(np.int64)
+    return firsts + parents, firsts + offsets
+
+
+GENERATORS = {
+    'erdos_renyi': erdos_renyi,
+    'power_law': power_law,
+    'bipartite': bipartite,
+    'many_components': many_components
+}
+
+
+def edges_dataframe(kind, nodes_nb, seed=0):
+    """ edge list with string node labels and a weight column, rows are shuffled """
+    random_state = np.random.RandomState(seed)
+    sources, targets = GENERATORS[kind](nodes_nb, random_state)
+    order = random_state.permutation(len(sources))
+    sources, targets = sources[order], targets[order]
+    return pd.DataFrame({
+        'source': pd.Series(sources).map('n{}'.format).values,
+        'target': pd.Series(targets).map('n{}'.format).values,
+        'weight': random_state.randint(1, 10, size=len(sources))
+    })
+
+
+class SyntheticDataset:
+    """ the parts of the dataiku.Dataset API used by dku_graph.dataset_reader to read a dataset, served from a dataframe """
+
+    def __init__(self, name, df):
+        self.name = name
+        self.df = df
+
+    def read_schema(self):
+        types = {'O': 'string', 'i': 'bigint', 'f': 'double', 'M': 'date'}
+        return [{'name': column, 'type': types.get(self.df[column].dtype.kind, 'string')} for column in self.df.columns]
+
+    def iter_dataframes(self, chunksize=10000, columns=None, **kwargs):
+        for start in range(0, len(self.df), chunksize):
+            yield self.df[columns or list(self.df.columns)].iloc[start:start + chunksize].copy()
+
+    def iter_dataframes_forced_types(self, names, dtypes, parse_date_columns, chunksize=10000, **kwargs):
+        for chunk in self.iter_dataframes(chunksize=chunksize, columns=names):
+            yield chunk.astype(dtypes)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+import pytest
+from dku_graph.compact_graph import CompactGraph
+from dku_graph.adjacency import AdjacencyIndex
+
+
+def random_graph(directed=False, nodes_nb=300, edges_nb=450, seed=4):
+    random_state = np.random.RandomState(seed)
+    df = pd.DataFrame({'source': random_state.randint(nodes_nb, size=edges_nb), 'target': random_state.randint(nodes_nb, size=edges_nb)})
+    return CompactGraph.from_dataframe(df, 'source', 'target', directed=directed)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_k_hop_neighborhood(directed):
+    compact_graph = random_graph(directed)
+    index = AdjacencyIndex(compact_graph)
+    nx_graph = nx.Graph(compact_graph.to_networkx())
+
+    for node in [0, 5, 42]:
+        nodes, distances = index.k_hop_neighborhood(node, 3)
+        expected = nx.single_source_shortest_path_length(nx_graph, compact_graph.labels[node], cutoff=3)
+        assert dict(zip(compact_graph.labels[nodes], distances)) == expected
+
+
+def test_shortest_path():
+    compact_graph = random_graph()
+    index = AdjacencyIndex(compact_graph)
+    nx_graph = compact_graph.to_networkx()
+    components = list(nx.connected_components(nx_graph))
+    component = max(components, key=len)
+    labels = sorted(component)
+    source, target = labels[0], labels[-1]
+    source_id, target_id = compact_graph.get_node_ids([source, target])
+
+    path = compact_graph.labels[index.shortest_path(source_id, target_id)]
+    assert path[0] == source and path[-1] == target
+    assert len(path) == nx.shortest_path_length(nx_graph, source, target) + 1
+    assert all(nx_graph.has_edge(first, second) for first, second in zip(path[:-1], path[1:]))
+
+    isolated = next(iter(min(components, key=len)))
+    assert len(index.shortest_path(source_id, compact_graph.get_node_ids([isolated])[0])) == 0
+    assert list(index.shortest_path(source_id, source_id)) == [source_id]
+
+
+def test_directed_shortest_path_follows_edges():
+    compact_graph = CompactGraph.from_dataframe(pd.DataFrame({'source': ['a', 'b'], 'target': ['b', 'c']}), 'source', 'target', directed=True)
+    index = AdjacencyIndex(compact_graph, directed=True)
+
+    assert list(compact_graph.labels[index.shortest_path(0, 2)]) == ['a', 'b', 'c']
+    assert len(index.shortest_path(2, 0)) == 0
+
+
+def test_ego_network():
+    compact_graph = random_graph()
+    index = AdjacencyIndex(compact_graph)
+    nodes, distances, edges = index.ego_network(0, 2)
+
+    ego_graph = nx.ego_graph(compact_graph.to_networkx(), compact_graph.labels[0], radius=2)
+    assert set(compact_graph.labels[nodes]) == set(ego_graph.nodes)
+    assert len(edges) == ego_graph.number_of_edges()
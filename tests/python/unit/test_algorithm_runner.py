@@ -0,0 +1,77 @@
+import os
+import signal
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from functools import partial
+from graph_analytics_constants import Constants
+from dku_graph.compact_graph import CompactGraph
+from dku_graph_analytics.algorithm_runner import run_algorithms
+from dku_graph_analytics.graph_analytics import compute_graph_algorithm_task
+from dku_graph_analytics.graph_clustering import compute_clustering_task
+
+
+def compact_graph():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'source': rng.randint(80, size=300), 'target': rng.randint(80, size=300)})
+    return CompactGraph.from_dataframe(df, 'source', 'target')
+
+
+def sleeping_task(graph, seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def killed_task(graph, seconds):
+    if seconds < 0:
+        os.kill(os.getpid(), signal.SIGKILL)
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.mark.parametrize("engine", [Constants.FASTEST_ENGINE, Constants.NETWORKX_ENGINE])
+def test_parallel_graph_algorithms_same_as_serial(engine):
+    graph = compact_graph()
+    params = {Constants.ENGINE: engine, Constants.DIRECTED: False}
+    algorithms = [Constants.PAGERANK, Constants.TRIANGLES, Constants.CLOSENESS, Constants.SQ_CLUSTERING]
+    task = partial(compute_graph_algorithm_task, params=params)
+
+    serial_results = run_algorithms(graph, task, algorithms, workers=1)
+    parallel_results = run_algorithms(graph, task, algorithms, workers=3)
+
+    assert len(parallel_results) == len(algorithms)
+    for serial_result, parallel_result in zip(serial_results, parallel_results):
+        pd.testing.assert_frame_equal(serial_result, parallel_result)
+
+
+def test_parallel_clustering_algorithms_same_as_serial():
+    graph = compact_graph()
+    algorithms = [Constants.FASTGREEDY, Constants.WALKTRAP]
+    assert run_algorithms(graph, compute_clustering_task, algorithms, workers=2) == \
+        run_algorithms(graph, compute_clustering_task, algorithms, workers=1)
+
+
+def test_results_order_follows_keys():
+    assert run_algorithms(compact_graph(), sleeping_task, [0.3, 0.0, 0.1], workers=3) == [0.3, 0.0, 0.1]
+
+
+def test_timeout():
+    start = time.time()
+    with pytest.raises(TimeoutError):
+        run_algorithms(compact_graph(), sleeping_task, [0.0, 30], workers=2, timeout=1)
+    assert time.time() - start < 10
+
+
+def test_timeout_is_measured_from_the_start_of_each_task():
+    # the last tasks wait for the worker more than timeout seconds, they are not timed out
+    assert run_algorithms(compact_graph(), sleeping_task, [0.6, 0.6, 0.6], workers=1, timeout=1) == [0.6, 0.6, 0.6]
+    with pytest.raises(TimeoutError, match="2"):
+        run_algorithms(compact_graph(), sleeping_task, [0.1, 0.1, 2], workers=1, timeout=1)
+
+
+def test_killed_worker_fails_without_timeout():
+    start = time.time()
+    with pytest.raises(RuntimeError, match="killed"):
+        run_algorithms(compact_graph(), killed_task, [0.1, -1, 0.1], workers=2)
+    assert time.time() - start < 10
@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from dku_graph.compact_graph import EdgeAccumulator
+from dku_graph.artifact_cache import GraphArtifact, GraphArtifactCache
+
+
+def edges_artifact(labels_type=str, bipartite=False, rows_nb=2000, seed=3):
+    random_state = np.random.RandomState(seed)
+    df = pd.DataFrame({'source': random_state.randint(300, size=rows_nb), 'target': random_state.randint(300, size=rows_nb),
+                       'weight': random_state.uniform(size=rows_nb)})
+    df[['source', 'target']] = df[['source', 'target']].astype(labels_type)
+    if labels_type is str:
+        df.loc[::7, 'source'] = 'nœud_' + df.loc[::7, 'source']
+    accumulator = EdgeAccumulator(bipartite=bipartite)
+    accumulator.add_chunk(df, 'source', 'target', 'weight')
+    return GraphArtifact.from_accumulator(accumulator)
+
+
+@pytest.mark.parametrize("labels_type,bipartite", [(str, False), (np.int64, False), (str, True)])
+def test_save_and_load(tmp_path, labels_type, bipartite):
+    artifact = edges_artifact(labels_type, bipartite)
+    cache = GraphArtifactCache(str(tmp_path))
+    key = cache.get_key(dataset='edges', version=(1, 2, 3), bipartite=bipartite)
+    assert cache.load(key) is None
+    assert cache.save(key, artifact)
+
+    loaded = cache.load(key)
+    for expected, values in zip(artifact.get_edges() + (artifact.source_labels, artifact.target_labels),
+                                loaded.get_edges() + (loaded.source_labels, loaded.target_labels)):
+        assert list(values) == list(expected)
+    assert isinstance(loaded.sources.base, np.memmap)
+    assert (loaded.bipartite, loaded.directed, loaded.rows_nb) == (bipartite, bipartite, 2000)
+    assert loaded.get_graph().edge_count == artifact.get_graph().edge_count
+
+
+def test_keys_depend_on_all_params(tmp_path):
+    cache = GraphArtifactCache(str(tmp_path))
+    key = cache.get_key(dataset='edges', version=(1, None, 5), weight=None)
+    assert key == cache.get_key(weight=None, version=(1, None, 5), dataset='edges')
+    assert key != cache.get_key(dataset='edges', version=(1, None, 6), weight=None)
+    assert key != cache.get_key(dataset='edges', version=(1, None, 5), weight='weight')
+
+
+def test_get_or_compute_reads_once(tmp_path):
+    cache = GraphArtifactCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return edges_artifact()
+    params = {'dataset': 'edges', 'version': (1, 2, 3)}
+    first, second = cache.get_or_compute(params, compute), cache.get_or_compute(params, compute)
+    assert len(calls) == 1
+    assert list(second.source_labels) == list(first.source_labels)
+
+
+def test_least_recently_used_artifacts_are_removed(tmp_path):
+    artifact = edges_artifact()
+    cache = GraphArtifactCache(str(tmp_path))
+    cache.save('a', artifact)
+    size_mb = cache.get_artifacts()[0][1] / 1024 / 1024
+    cache.max_size_mb = 2.5 * size_mb
+
+    cache.save('b', artifact)
+    os.utime(os.path.join(str(tmp_path), 'a', 'meta.json'), (0, 0))
+    os.utime(os.path.join(str(tmp_path), 'b', 'meta.json'), (1, 1))
+    cache.load('a')
+    cache.save('c', artifact)
+    assert sorted(key for _, _, key in cache.get_artifacts()) == ['a', 'c']
+
+
+def test_unreadable_and_unsupported_artifacts(tmp_path):
+    cache = GraphArtifactCache(str(tmp_path))
+    cache.save('a', edges_artifact())
+    os.remove(os.path.join(str(tmp_path), 'a', 'weights.npy'))
+    assert cache.load('a') is None
+    assert not os.path.exists(os.path.join(str(tmp_path), 'a'))
+
+    artifact = edges_artifact()
+    artifact.source_labels = np.array(['a', 1] * (len(artifact.source_labels) // 2), dtype=object)
+    assert not cache.save('b', artifact)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_cache_directory_is_private(tmp_path):
+    cache = GraphArtifactCache(os.path.join(str(tmp_path), 'cache'))
+    assert cache.load('a') is None
+    assert cache.save('a', edges_artifact())
+    assert os.stat(cache.directory).st_mode & 0o777 == 0o700
+    assert cache.load('a') is not None
+
+    # artifacts of a directory that other users can access are neither loaded nor saved
+    os.chmod(cache.directory, 0o755)
+    assert cache.load('a') is None
+    assert not cache.save('b', edges_artifact())
+    assert sorted(os.listdir(cache.directory)) == ['a']
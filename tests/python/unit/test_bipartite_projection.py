@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+from networkx.algorithms import bipartite
+from dku_graph.compact_graph import EdgeAccumulator
+from dku_graph_analytics.bipartite_projection import get_incidence_matrix, get_row_blocks, prune_hubs, BipartiteProjection
+
+
+def purchases_df(rows_nb=2000, customers_nb=300, products_nb=80, seed=3):
+    random_state = np.random.RandomState(seed)
+    return pd.DataFrame({
+        'customer': random_state.randint(customers_nb, size=rows_nb).astype(str),
+        'product': random_state.zipf(1.5, size=rows_nb).clip(max=products_nb).astype(str)
+    })
+
+
+def networkx_projection(df, graph_of, linked_by, method=bipartite.weighted_projected_graph, **kwargs):
+    """ projection of the previous recipe implementation """
+    graph = nx.Graph()
+    graph.add_nodes_from(df[graph_of].unique(), bipartite=0)
+    graph.add_nodes_from(('linked', value) for value in df[linked_by].unique())
+    graph.add_edges_from(zip(df[graph_of], (('linked', value) for value in df[linked_by])))
+    projected_graph = method(graph, df[graph_of].unique(), **kwargs)
+    return {frozenset((source, target)): data['weight'] for source, target, data in projected_graph.edges(data=True)}
+
+
+def projection(df, graph_of, linked_by, **kwargs):
+    accumulator = EdgeAccumulator(bipartite=True)
+    accumulator.add_chunk(df, graph_of, linked_by)
+    sources, targets, _ = accumulator.get_edges()
+    labels = accumulator.source_indexer.labels
+    incidence = get_incidence_matrix(sources, targets, len(labels), len(accumulator.target_indexer))
+    return [(labels[sources], labels[targets], weights) for sources, targets, weights in BipartiteProjection(incidence, **kwargs).iter_edges()]
+
+
+def projection_edges(df, graph_of, linked_by, weight='weight', **kwargs):
+    blocks = projection(df, graph_of, linked_by, weights=[weight], **kwargs)
+    return {frozenset((s, t)): w for sources, targets, weights in blocks for s, t, w in zip(sources, targets, weights[weight])}
+
+
+def test_projection_matches_networkx():
+    df = purchases_df()
+    assert projection_edges(df, 'customer', 'product') == networkx_projection(df, 'customer', 'product')
+
+
+def test_projection_by_blocks():
+    df = purchases_df()
+    expected = projection(df, 'product', 'customer')
+    blocks = projection(df, 'product', 'customer', max_block_values=100)
+
+    assert len(blocks) > 1
+    sources, targets, weights = zip(*blocks)
+    assert list(np.concatenate(sources)) == list(expected[0][0])
+    assert list(np.concatenate(targets)) == list(expected[0][1])
+    assert list(np.concatenate([block_weights['weight'] for block_weights in weights])) == list(expected[0][2]['weight'])
+
+
+def test_row_blocks_cover_all_rows():
+    incidence = get_incidence_matrix(np.array([0, 1, 1, 2, 3]), np.array([0, 0, 1, 1, 1]), 5, 2)
+    blocks = get_row_blocks(incidence, 3)
+
+    assert blocks[0][0] == 0 and blocks[-1][1] == 5
+    assert all(end == next_start for (_, end), (next_start, _) in zip(blocks, blocks[1:]))
+
+
+def test_normalized_weights_match_networkx():
+    df = purchases_df(rows_nb=500, customers_nb=100)
+    references = {
+        'jaccard': (bipartite.overlap_weighted_projected_graph, {'jaccard': True}),
+        'overlap': (bipartite.overlap_weighted_projected_graph, {'jaccard': False}),
+        'newman': (bipartite.collaboration_weighted_projected_graph, {})
+    }
+    for weight, (method, kwargs) in references.items():
+        expected = networkx_projection(df, 'customer', 'product', method, **kwargs)
+        edges = projection_edges(df, 'customer', 'product', weight=weight, max_block_values=1000)
+        assert set(edges) == set(expected)
+        assert all(np.isclose(edges[edge], expected[edge]) for edge in edges), weight
+
+
+def test_several_weights_in_one_pass():
+    df = purchases_df()
+    blocks = projection(df, 'customer', 'product', weights=['weight', 'cosine', 'newman'], top_k=5)
+    counts = networkx_projection(df, 'customer', 'product')
+    degrees = df.drop_duplicates().groupby('customer').size()
+
+    for sources, targets, weights in blocks:
+        assert list(weights) == ['weight', 'cosine', 'newman']
+        for source, target, count, cosine in zip(sources, targets, weights['weight'], weights['cosine']):
+            assert count == counts[frozenset((source, target))]
+            assert np.isclose(cosine, count / np.sqrt(degrees[source] * degrees[target]))
+
+
+def test_prune_hubs():
+    incidence = get_incidence_matrix(np.array([0, 1, 2, 3, 0, 1]), np.array([0, 0, 0, 0, 1, 1]), 4, 2)
+
+    skipped, hubs_nb = prune_hubs(incidence, 2, 'skip')
+    assert hubs_nb == 1
+    assert list(np.asarray(skipped.sum(axis=0)).ravel()) == [0, 2]
+
+    sampled, hubs_nb = prune_hubs(incidence, 3, 'sample')
+    assert hubs_nb == 1
+    assert list(np.asarray(sampled.sum(axis=0)).ravel()) == [3, 2]
+    assert (sampled - incidence).max() == 0
+
+
+def test_min_weight_and_hubs():
+    df = purchases_df()
+    all_edges = networkx_projection(df, 'customer', 'product')
+    edges = projection_edges(df, 'customer', 'product', min_weight=3)
+    assert edges == {edge: weight for edge, weight in all_edges.items() if weight >= 3}
+
+    degrees = df.drop_duplicates().groupby('product').size()
+    small_products_df = df[df['product'].isin(degrees[degrees <= 50].index)]
+    expected = networkx_projection(small_products_df, 'customer', 'product')
+    assert projection_edges(df, 'customer', 'product', max_degree=50) == expected
+
+
+def test_top_k():
+    df = purchases_df()
+    all_edges = networkx_projection(df, 'customer', 'product')
+    edges = projection_edges(df, 'customer', 'product', top_k=3, max_block_values=1000)
+
+    neighbors = {}
+    for edge, weight in all_edges.items():
+        for node in edge:
+            neighbors.setdefault(node, []).append(weight)
+    for node, weights in neighbors.items():
+        node_weights = sorted((weight for edge, weight in edges.items() if node in edge), reverse=True)
+        # the k strongest weights of each node are kept, other edges are kept for the top-k of their other node
+        assert node_weights[:3] == sorted(weights, reverse=True)[:3]
+    assert all(all_edges[edge] == weight for edge, weight in edges.items())
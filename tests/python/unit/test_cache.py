@@ -0,0 +1,61 @@
+from dku_graph.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = LRUCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats() == {'size': 2, 'hits': 3, 'misses': 1}
+
+
+def test_ttl_expiration():
+    clock = FakeClock()
+    cache = LRUCache(ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 10
+    assert cache.get('a') == 1
+    clock.now = 11
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_ttl_of_a_value():
+    clock = FakeClock()
+    cache = LRUCache(ttl=10, clock=clock)
+    cache.put('a', 1, ttl=2)
+    cache.get_or_compute('b', lambda: 2, ttl=0)
+    clock.now = 1
+    assert cache.get('a') == 1 and cache.get('b') is None
+    clock.now = 3
+    assert cache.get('a') is None
+
+
+def test_get_or_compute_and_invalidate():
+    cache = LRUCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'value'
+
+    assert cache.get_or_compute(('dataset', 1), compute) == 'value'
+    assert cache.get_or_compute(('dataset', 1), compute) == 'value'
+    assert len(calls) == 1
+
+    cache.put(('other', 1), 'other value')
+    cache.invalidate(lambda key: key[0] == 'dataset')
+    assert cache.get(('dataset', 1)) is None
+    assert cache.get(('other', 1)) == 'other value'
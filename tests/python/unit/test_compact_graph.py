@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+from dku_graph.compact_graph import CompactGraph, EdgeAccumulator, NodeIndexer
+
+
+def edges_df():
+    return pd.DataFrame({
+        'source': ['a', 'b', 'a', 'c', 'd', np.nan, 'e'],
+        'target': ['b', 'a', 'b', 'a', 'd', 'a', np.nan],
+        'weight': [1.0, 2.0, 3.0, np.nan, 5.0, 6.0, 7.0]
+    })
+
+
+def test_from_dataframe_undirected():
+    graph = CompactGraph.from_dataframe(edges_df(), 'source', 'target')
+
+    assert list(graph.labels) == ['a', 'b', 'c', 'd', 'e']
+    assert graph.edge_count == 3
+    edges = {(graph.labels[s], graph.labels[t]): w for s, t, w in zip(graph.sources, graph.targets, graph.weights)}
+    assert edges == {('a', 'b'): 3, ('a', 'c'): 1, ('d', 'd'): 1}
+    assert list(graph.degree()) == [2, 1, 1, 2, 0]
+
+
+def test_from_dataframe_directed_weighted():
+    graph = CompactGraph.from_dataframe(edges_df(), 'source', 'target', weight='weight', directed=True)
+
+    edges = {(graph.labels[s], graph.labels[t]): w for s, t, w in zip(graph.sources, graph.targets, graph.weights)}
+    assert edges == {('a', 'b'): 4.0, ('b', 'a'): 2.0, ('c', 'a'): 0.0, ('d', 'd'): 5.0}
+
+
+def test_csr_arrays():
+    graph = CompactGraph.from_dataframe(edges_df(), 'source', 'target')
+
+    assert list(graph.indptr) == [0, 2, 3, 4, 5, 5]
+    assert list(graph.neighbors(0)) == [1, 2]
+    assert list(graph.neighbors(3)) == [3]
+    assert list(graph.data) == [3, 1, 3, 1, 1]
+
+
+def test_get_node_ids():
+    graph = CompactGraph.from_dataframe(edges_df(), 'source', 'target')
+    assert list(graph.get_node_ids(['c', 'z', 'a'])) == [2, -1, 0]
+
+
+def test_exporters_match_networkx():
+    df = edges_df().dropna()
+    expected = nx.from_pandas_edgelist(df, source='source', target='target', create_using=nx.Graph)
+    graph = CompactGraph.from_dataframe(df, 'source', 'target')
+
+    networkx_graph = graph.to_networkx(weighted=False)
+    assert list(networkx_graph.nodes) == list(expected.nodes)
+    assert set(map(frozenset, networkx_graph.edges)) == set(map(frozenset, expected.edges))
+
+    iGraph = graph.to_igraph()
+    assert iGraph.vs['name'] == list(graph.labels)
+    assert sorted(iGraph.get_edgelist()) == sorted(zip(graph.sources.tolist(), graph.targets.tolist()))
+    assert iGraph.es['weight'] == graph.weights.tolist()
+
+    matrix = graph.to_scipy_sparse(weighted=False)
+    expected_matrix = nx.to_scipy_sparse_array(expected, nodelist=list(graph.labels), weight=None)
+    assert (matrix != expected_matrix).nnz == 0
+
+
+def test_igraph_edges_keep_their_order():
+    df = edges_df().dropna()
+    graph = CompactGraph.from_dataframe(df, 'source', 'target', directed=True)
+    expected = list(zip(graph.sources.tolist(), graph.targets.tolist()))
+
+    assert list(graph.iter_edge_pairs(chunksize=3)) == expected
+    assert graph.to_igraph().get_edgelist() == expected
+
+
+def test_numerical_labels():
+    df = pd.DataFrame({'source': [3, 1, 2], 'target': [1, 2, 3]})
+    graph = CompactGraph.from_dataframe(df, 'source', 'target', directed=True)
+
+    assert list(graph.labels) == [3, 1, 2]
+    assert list(graph.to_networkx().nodes) == [3, 1, 2]
+
+
+def test_edge_accumulator_same_as_from_dataframe():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({'source': rng.randint(50, size=1000).astype(str), 'target': rng.randint(50, size=1000).astype(str),
+                       'weight': rng.rand(1000)})
+    df.loc[rng.rand(1000) < 0.05, 'target'] = np.nan
+    for directed in [False, True]:
+        for weight in [None, 'weight']:
+            expected = CompactGraph.from_dataframe(df, 'source', 'target', weight=weight, directed=directed)
+            accumulator = EdgeAccumulator(directed=directed, buffer_size=100)
+            for start in range(0, len(df), 128):
+                accumulator.add_chunk(df.iloc[start:start + 128], 'source', 'target', weight=weight)
+            graph = accumulator.get_graph()
+
+            assert accumulator.rows_nb == len(df)
+            assert list(graph.labels) == list(expected.labels)
+            np.testing.assert_array_equal(graph.sources, expected.sources)
+            np.testing.assert_array_equal(graph.targets, expected.targets)
+            np.testing.assert_allclose(graph.weights, expected.weights)
+
+
+def test_edge_accumulator_bipartite():
+    accumulator = EdgeAccumulator(bipartite=True)
+    accumulator.add_chunk(pd.DataFrame({'customer': ['1', '2', '1'], 'product': ['1', 'b', '1']}), 'customer', 'product')
+    accumulator.add_chunk(pd.DataFrame({'customer': ['3', np.nan], 'product': ['b', 'c']}), 'customer', 'product')
+    sources, targets, weights = accumulator.get_edges()
+
+    assert list(accumulator.source_indexer.labels) == ['1', '2', '3']
+    assert list(accumulator.target_indexer.labels) == ['1', 'b', 'c']
+    assert list(zip(sources, targets, weights)) == [(0, 0, 2), (1, 1, 1), (2, 1, 1)]
+
+
+def test_node_indexer():
+    indexer = NodeIndexer()
+    assert list(indexer.get_ids(np.array([5, 3, 5]))) == [0, 1, 0]
+    assert list(indexer.get_ids(np.array([3.0, np.nan, 7.0]))) == [1, -1, 2]
+    assert list(indexer.labels) == [5, 3, 7]
@@ -0,0 +1,46 @@
+import pandas as pd
+from dku_graph.dataset_reader import cast_to_schema, iter_dataset_chunks, read_edges
+
+
+class ChunkedDataset:
+    """ dataset read by chunks whose values are parsed from their text, like dataiku.Dataset """
+
+    def __init__(self, df, schema):
+        self.df = df
+        self.schema = schema
+
+    def read_schema(self):
+        return self.schema
+
+    def iter_dataframes_forced_types(self, names, dtypes, parse_date_columns, chunksize=10000):
+        for start in range(0, len(self.df), chunksize):
+            chunk = self.df[names].iloc[start:start + chunksize].astype(str).replace('nan', '')
+            yield chunk.apply(lambda column: column if column.name in dtypes else pd.to_numeric(column))
+
+
+def test_string_columns_are_read_as_strings():
+    df = pd.DataFrame({'source': ['1', '2', 'a', 'b'], 'target': ['2', '3', 'b', '1'], 'weight': [1, 2, 3, 4]})
+    dataset = ChunkedDataset(df, [{'name': 'source', 'type': 'string'}, {'name': 'target', 'type': 'string'},
+                                  {'name': 'weight', 'type': 'bigint'}])
+
+    chunks = list(iter_dataset_chunks(dataset, chunksize=2))
+    assert [list(chunk.columns) for chunk in chunks] == [['source', 'target', 'weight']] * 2
+    assert chunks[0]['source'].tolist() == ['1', '2']
+
+    accumulator = read_edges(dataset, 'source', 'target', weight='weight', chunksize=2)
+    assert sorted(accumulator.source_indexer.labels) == ['1', '2', '3', 'a', 'b']
+    assert accumulator.rows_nb == 4
+
+
+def test_chunks_are_cast_to_the_schema():
+    schema = [{'name': 'id', 'type': 'bigint'}, {'name': 'score', 'type': 'double'}]
+    dataset = ChunkedDataset(pd.DataFrame({'id': [1, 2, None, 4], 'score': [1.5, 2, 3, 4]}), schema)
+
+    chunks = [cast_to_schema(chunk, schema) for chunk in iter_dataset_chunks(dataset, chunksize=2)]
+    assert [str(chunk['id'].dtype) for chunk in chunks] == ['Int64', 'Int64']
+    assert chunks[1]['id'].isna().tolist() == [True, False]
+    assert chunks[1].to_csv(index=False).splitlines() == ['id,score', ',3.0', '4,4.0']
+
+    flags = cast_to_schema(pd.DataFrame({'flag': [True, None, False]}), [{'name': 'flag', 'type': 'boolean'}])
+    assert str(flags['flag'].dtype) == 'boolean'
+    assert flags['flag'].isna().tolist() == [False, True, False]
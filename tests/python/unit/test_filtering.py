@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dku_filtering.filtering import filter_dataframe, read_filtered_dataframe, get_filters_mask
+from dku_graph.graph import Graph
+
+
+class FakeDataset:
+    """ dataset streaming a dataframe by chunks, like dataiku.Dataset.iter_dataframes_forced_types """
+
+    def __init__(self, df, schema=None):
+        self.df = df
+        self.schema = schema or [{'name': column, 'type': SCHEMA_TYPES.get(df[column].dtype.kind, 'string')} for column in df.columns]
+        self.read_rows = 0
+        self.read_columns = None
+
+    def read_schema(self):
+        return self.schema
+
+    def iter_dataframes_forced_types(self, names, dtypes, parse_date_columns, chunksize=10000):
+        self.read_columns = names
+        for start in range(0, len(self.df), chunksize):
+            self.read_rows += len(self.df.iloc[start:start + chunksize])
+            yield self.df.iloc[start:start + chunksize][names].astype(dtypes)
+
+
+SCHEMA_TYPES = {'i': 'bigint', 'f': 'double', 'M': 'date'}
+
+
+def edges_dataframe(rows_nb=5000, seed=2):
+    random_state = np.random.RandomState(seed)
+    return pd.DataFrame({
+        'source': random_state.randint(1000, size=rows_nb),
+        'target': random_state.randint(1000, size=rows_nb),
+        'weight': random_state.uniform(0, 10, size=rows_nb),
+        'category': random_state.choice(['a', 'b', 'c'], size=rows_nb),
+        'unused': random_state.uniform(size=rows_nb)
+    })
+
+
+FILTERS = [
+    {'filterType': 'NUMERICAL_FACET', 'column': 'weight', 'minValue': 2, 'maxValue': None},
+    {'filterType': 'ALPHANUM_FACET', 'column': 'category', 'columnType': 'TEXT', 'excludedValues': {'b': True, 'c': False}}
+]
+
+
+def test_read_only_used_columns_and_filter_all_rows():
+    df = edges_dataframe()
+    dataset = FakeDataset(df)
+    filtered, stats = read_filtered_dataframe(dataset, ['source', 'target'], FILTERS, max_rows=100000, chunksize=700)
+
+    assert dataset.read_columns == ['source', 'target', 'weight', 'category']
+    pd.testing.assert_frame_equal(filtered, filter_dataframe(df, FILTERS)[dataset.read_columns].reset_index(drop=True))
+    assert stats['read_rows'] == len(df)
+    assert stats['filters'][0]['excluded_rows'] == (df['weight'] < 2).sum()
+    assert sum(filter_stats['removed_rows'] for filter_stats in stats['filters']) == len(df) - len(filtered)
+
+
+def test_max_rows_applies_to_filtered_rows():
+    df = edges_dataframe()
+    filtered, _ = read_filtered_dataframe(FakeDataset(df), ['source', 'target'], FILTERS, max_rows=1000, chunksize=700)
+
+    expected = filter_dataframe(df, FILTERS).iloc[:1000]
+    assert len(filtered) == 1000
+    assert (filtered['source'].values == expected['source'].values).all()
+
+
+def test_stop_reading_at_max_nodes():
+    df = edges_dataframe()
+    dataset = FakeDataset(df)
+    config = {'source': 'source', 'target': 'target', 'max_nodes': 200}
+    filtered, stats = read_filtered_dataframe(dataset, ['source', 'target'], FILTERS, max_rows=100000,
+                                              node_columns=['source', 'target'], max_nodes=200, chunksize=100)
+
+    assert dataset.read_rows < len(df)
+    assert stats['read_rows'] == dataset.read_rows
+    # the graph of the rows that were read is the graph of all the filtered rows
+    graph, expected_graph = Graph(config), Graph(config)
+    graph.create_graph(filtered)
+    expected_graph.create_graph(filter_dataframe(df, FILTERS))
+    assert list(graph.nodes) == list(expected_graph.nodes)
+    assert graph.edges == expected_graph.edges
+
+
+def test_string_columns_are_read_as_strings():
+    df = edges_dataframe()
+    schema = [{'name': column, 'type': 'string' if column in ['source', 'category'] else 'double'} for column in df.columns]
+    filtered, _ = read_filtered_dataframe(FakeDataset(df, schema), ['source', 'target'], FILTERS, max_rows=1000, chunksize=700)
+
+    assert filtered['source'].tolist() == filter_dataframe(df, FILTERS)['source'].astype(str).tolist()[:1000]
+    assert filtered['target'].dtype.kind == 'i'
+
+
+def test_empty_reads():
+    with pytest.raises(Exception, match="after filtering"):
+        read_filtered_dataframe(FakeDataset(edges_dataframe()), ['source'], [FILTERS[0], dict(FILTERS[0], minValue=20)], max_rows=10)
+    with pytest.raises(Exception, match="Dataframe is empty"):
+        read_filtered_dataframe(FakeDataset(edges_dataframe().iloc[:0]), ['source'], [], max_rows=10)
+
+
+def dates_dataframe():
+    dates = pd.Series(pd.date_range('2019-12-25', periods=2000, freq='7h'))
+    return pd.DataFrame({'date': dates.where(np.arange(len(dates)) % 50 != 0), 'value': np.arange(len(dates))})
+
+
+def test_date_filters():
+    df = dates_dataframe()
+    dates = df['date']
+    filters = [
+        {'filterType': 'DATE_FACET', 'column': 'date', 'dateFilterType': 'YEAR', 'excludedValues': {'2019': True}},
+        {'filterType': 'DATE_FACET', 'column': 'date', 'dateFilterType': 'WEEK_OF_YEAR', 'excludedValues': {'1': True, '5': False}},
+        {'filterType': 'DATE_FACET', 'column': 'date', 'dateFilterType': 'MONTH_OF_YEAR', 'excludedValues': {'2': True}},
+        {'filterType': 'DATE_FACET', 'column': 'date', 'dateFilterType': 'HOUR_OF_DAY', 'excludedValues': {'7': True}},
+        {'filterType': 'NUMERICAL_FACET', 'column': 'value', 'minValue': None, 'maxValue': 1500}
+    ]
+    mask, stats = get_filters_mask(df, filters)
+
+    week = dates.dt.isocalendar().week
+    # the year and the hour are compared to the string keys of the filters like in the previous versions
+    expected = ~dates.dt.year.isin(['2019']) & (week != 2) & (dates.dt.month != 3) & ~dates.dt.hour.isin(['7']) & (df['value'] <= 1500)
+    assert (mask == expected.values).all()
+    assert stats[0]['excluded_rows'] == dates.dt.year.isin(['2019']).sum()
+    assert [filter_stats['removed_rows'] for filter_stats in stats[2:4]] == [
+        (mask_before & values.isin(excluded)).sum() for mask_before, values, excluded in [
+            (~dates.dt.year.isin(['2019']) & (week != 2), dates.dt.month, [3]),
+            (~dates.dt.year.isin(['2019']) & (week != 2) & (dates.dt.month != 3), dates.dt.hour, ['7'])]]
+
+
+def baseline_special_date_filter(df, filter):
+    """ special date filters of the previous versions for the parts compared without offset """
+    excluded_values = [k for k, v in filter['excludedValues'].items() if v]
+    part = {"YEAR": "year", "DAY_OF_WEEK": "dayofweek", "HOUR_OF_DAY": "hour"}[filter["dateFilterType"]]
+    return ~getattr(df[filter['column']].dt, part).isin(excluded_values)
+
+
+def test_date_filters_without_offset_match_the_previous_versions():
+    df = dates_dataframe()
+    for date_filter_type, excluded_values in [("YEAR", {'2019': True, '2020': False}), ("DAY_OF_WEEK", {'0': True, '3': True}),
+                                              ("HOUR_OF_DAY", {'7': True, '14': False})]:
+        filter = {'filterType': 'DATE_FACET', 'column': 'date', 'dateFilterType': date_filter_type, 'excludedValues': excluded_values}
+        mask, _ = get_filters_mask(df, [filter])
+        assert (mask == baseline_special_date_filter(df, filter).values).all()
+
+
+def test_filter_dataframe_is_a_single_selection():
+    df = edges_dataframe()
+    filtered = filter_dataframe(df, FILTERS)
+    expected = df[(df['weight'] >= 2) & (df['category'] != 'b')]
+
+    pd.testing.assert_frame_equal(filtered, expected)
+    assert filter_dataframe(df, []) is df
@@ -0,0 +1,243 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dku_graph.graph import Graph
+
+
+class IterrowsGraph(Graph):
+    """ reference implementation of Graph.create_graph iterating over the rows of the dataframe """
+
+    def create_graph(self, df):
+        source_nodes, target_nodes = set(), set()
+        nodes_nb = 0
+        self.nodes = {}
+        self.edges = {}
+
+        self._check_data_type(df)
+
+        for idx, row in df.iterrows():
+            if nodes_nb >= self.max_nodes:
+                break
+
+            source = row[self.source_column]
+            target = row[self.target_column]
+
+            nodes_nb += self._process_source(source, row, source_nodes, target_nodes)
+            nodes_nb += self._process_target(target, row, source_nodes, target_nodes)
+
+            self._process_edge(source, target, row)
+
+        for node_id in self.nodes:
+            self._add_node_title(self.nodes[node_id])
+        for edge_id in self.edges:
+            self._add_edge_title(self.edges[edge_id])
+
+        self.groups = {}
+        if self.source_nodes_color or self.target_nodes_color:
+            self.group_values = set()
+            for node_id in self.nodes:
+                self._add_group_value(self.nodes[node_id])
+            self._create_groups()
+
+    def _process_source(self, source, row, source_nodes, target_nodes):
+        if self._null_node(source):
+            return 0
+        if source not in source_nodes and source not in target_nodes:
+            self.nodes[source] = self._create_node(row, self.source_column, self.source_nodes_color, self.source_nodes_size)
+            source_nodes.add(source)
+            return 1
+        elif source not in source_nodes and source in target_nodes:
+            if self.source_nodes_color:
+                self.nodes[source]['group'] = row[self.source_nodes_color]
+            if self.source_nodes_size and not np.isnan(row[self.source_nodes_size]):
+                self.nodes[source]['value'] = row[self.source_nodes_size]
+            source_nodes.add(source)
+        return 0
+
+    def _process_target(self, target, row, source_nodes, target_nodes):
+        if self._null_node(target):
+            return 0
+        if target not in source_nodes and target not in target_nodes:
+            self.nodes[target] = self._create_node(row, self.target_column, self.target_nodes_color, self.target_nodes_size)
+            target_nodes.add(target)
+            return 1
+        elif target in source_nodes and target not in target_nodes:
+            node_params = self.nodes[target]
+            if 'group' not in node_params and self.target_nodes_color:
+                node_params['group'] = row[self.target_nodes_color]
+            if 'value' not in node_params and self.target_nodes_size and not np.isnan(row[self.target_nodes_size]):
+                node_params['value'] = row[self.target_nodes_size]
+            target_nodes.add(target)
+        return 0
+
+    def _process_edge(self, source, target, row):
+        if self._null_node(source) or self._null_node(target):
+            return
+        if not self.directed_edges:
+            try:
+                if target < source:
+                    source, target = target, source
+            except Exception:
+                return
+        if (source, target) not in self.edges:
+            edge = {'from': source, 'to': target}
+            if self.edges_caption:
+                edge['label'] = str(row[self.edges_caption])
+            if self.edges_width:
+                if not np.isnan(row[self.edges_width]):
+                    edge['value'] = row[self.edges_width]
+            else:
+                edge['value'] = 1
+            self.edges[(source, target)] = edge
+        elif not self.edges_width:
+            self.edges[(source, target)]['value'] += 1
+
+    def _create_node(self, row, column, color_column, size_column):
+        node = {'id': row[column], 'label': str(row[column])}
+        if color_column:
+            node['group'] = row[color_column]
+        if size_column and not np.isnan(row[size_column]):
+            node['value'] = row[size_column]
+        return node
+
+    def _null_node(self, node):
+        if isinstance(node, float):
+            return np.isnan(node)
+        return False
+
+
+def legacy_contract_nodes(positions, translation_factor=0.8, std_nb=3):
+    """ reference implementation of Graph._contract_nodes translating the nodes after each outlier gap in turn """
+    columns = ['x', 'y']
+    positions_df = pd.DataFrame(positions, columns=columns)
+    positions_df['id'] = positions_df.index
+
+    for col in columns:
+        positions_df = positions_df.sort_values(by=[col])
+        consecutive_difference_column = '{}_diff'.format(col)
+        positions_df[consecutive_difference_column] = positions_df[col] - positions_df[col].shift(1)
+        positions_df = positions_df.sort_values(by=[consecutive_difference_column], ascending=False).reset_index(drop=True)
+
+        outliers_bound = positions_df[consecutive_difference_column].mean() + std_nb * positions_df[consecutive_difference_column].std()
+
+        i = 0
+        threshold = positions_df.loc[i, col]
+        diff = positions_df.loc[i, consecutive_difference_column]
+        while diff > outliers_bound:
+            mask = (positions_df[col] >= threshold)
+            masked_df = positions_df[mask]
+            positions_df.loc[mask, col] = masked_df[col] - diff * translation_factor
+
+            i += 1
+            threshold = positions_df.loc[i, col]
+            diff = positions_df.loc[i, consecutive_difference_column]
+
+    positions_df = positions_df.sort_values(by=['id'], ascending=True).reset_index(drop=True)
+    return positions_df[columns].values
+
+
+def clustered_positions(nodes_nb, clusters_nb=20, seed=0):
+    """ positions of nodes in distant clusters, separated by empty zones of various sizes """
+    random_state = np.random.RandomState(seed)
+    centers = random_state.uniform(-1000, 1000, size=(clusters_nb, 2))
+    return centers[random_state.randint(clusters_nb, size=nodes_nb)] + random_state.normal(size=(nodes_nb, 2))
+
+
+def random_edges_df(rows_nb=400, nodes_nb=60, seed=0):
+    rng = np.random.RandomState(seed)
+    labels = np.array(["node_{}".format(i) for i in range(nodes_nb)], dtype=object)
+    df = pd.DataFrame({
+        'source': labels[rng.randint(nodes_nb, size=rows_nb)],
+        'target': labels[rng.randint(nodes_nb, size=rows_nb)],
+        'source_color': rng.choice(['a', 'b', 'c'], size=rows_nb),
+        'target_color': rng.choice(['d', 'e'], size=rows_nb),
+        'source_size': rng.rand(rows_nb) * 10,
+        'target_size': rng.rand(rows_nb) * 10,
+        'width': rng.rand(rows_nb),
+        'caption': rng.choice(['x', 'y', 'z'], size=rows_nb)
+    })
+    for column in ['source', 'target']:
+        df.loc[rng.rand(rows_nb) < 0.05, column] = np.nan
+    for column in ['source_size', 'target_size', 'width']:
+        df.loc[rng.rand(rows_nb) < 0.2, column] = np.nan
+    return df
+
+
+def without_nan(items):
+    """ replace nan values (that are never equal) by None to compare nodes and edges properties """
+    return {key: {k: None if isinstance(v, float) and np.isnan(v) else v for k, v in properties.items()}
+            for key, properties in items.items()}
+
+
+def assert_same_graph(graph, expected_graph):
+    assert list(graph.nodes.keys()) == list(expected_graph.nodes.keys())
+    assert list(graph.edges.keys()) == list(expected_graph.edges.keys())
+    assert without_nan(graph.nodes) == without_nan(expected_graph.nodes)
+    assert without_nan(graph.edges) == without_nan(expected_graph.edges)
+    assert {group for group in graph.groups if group == group} == {group for group in expected_graph.groups if group == group}
+
+
+GRAPH_PARAMS = [
+    {},
+    {'directed_edges': False},
+    {'source_nodes_color': 'source_color', 'target_nodes_color': 'target_color'},
+    {'target_nodes_color': 'target_color', 'target_nodes_size': 'target_size'},
+    {'source_nodes_size': 'source_size', 'target_nodes_size': 'target_size', 'directed_edges': False},
+    {'edges_width': 'width', 'edges_caption': 'caption'},
+    {'edges_width': 'width', 'directed_edges': False, 'source_nodes_color': 'source_color'},
+    {'numerical_colors': True, 'source_nodes_color': 'source_size', 'target_nodes_color': 'target_size'},
+]
+
+
+@pytest.mark.parametrize("max_nodes", [1, 10, 35, 1000])
+@pytest.mark.parametrize("extra_params", GRAPH_PARAMS)
+def test_create_graph_parity(max_nodes, extra_params):
+    df = random_edges_df()
+    graph_params = dict({'source': 'source', 'target': 'target', 'max_nodes': max_nodes}, **extra_params)
+
+    graph, expected_graph = Graph(graph_params), IterrowsGraph(graph_params)
+    graph.create_graph(df)
+    expected_graph.create_graph(df)
+
+    assert_same_graph(graph, expected_graph)
+
+
+def test_create_graph_numerical_nodes():
+    df = pd.DataFrame({'source': [1, 2, 3, 3, 2, 5], 'target': [2, 1, 1, 4, 1, 5]})
+    graph_params = {'source': 'source', 'target': 'target', 'max_nodes': 100, 'directed_edges': False}
+
+    graph = Graph(graph_params)
+    graph.create_graph(df)
+
+    assert list(graph.nodes.keys()) == [1, 2, 3, 4, 5]
+    assert graph.edges[(1, 2)]['value'] == 3
+    assert graph.edges[(5, 5)]['value'] == 1
+    assert list(graph.edges.keys()) == [(1, 2), (1, 3), (3, 4), (5, 5)]
+
+
+def test_create_graph_mixed_types_not_comparable():
+    df = pd.DataFrame({'source': ['a', 'b', 1], 'target': ['b', 'a', 'a']})
+    graph_params = {'source': 'source', 'target': 'target', 'max_nodes': 100, 'directed_edges': False}
+
+    graph, expected_graph = Graph(graph_params), IterrowsGraph(graph_params)
+    graph.create_graph(df)
+    expected_graph.create_graph(df)
+
+    assert_same_graph(graph, expected_graph)
+
+
+def test_create_graph_empty_dataframe():
+    df = pd.DataFrame({'source': pd.Series([], dtype=object), 'target': pd.Series([], dtype=object)})
+    graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': 10})
+    graph.create_graph(df)
+    assert graph.nodes == {} and graph.edges == {}
+
+
+@pytest.mark.parametrize("nodes_nb", [2, 3, 50, 600, 3000])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_contract_nodes_parity(nodes_nb, seed):
+    positions = clustered_positions(nodes_nb, seed=seed)
+    graph = Graph({'max_nodes': 10})
+
+    contracted = graph._contract_nodes(positions.copy())
+    np.testing.assert_allclose(contracted, legacy_contract_nodes(positions.copy()), rtol=1e-9, atol=1e-9)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import networkx as nx
+import pytest
+from graph_analytics_constants import Constants
+from dku_graph.compact_graph import CompactGraph
+from dku_graph_analytics.graph_analytics import GRAPH_ALGORITHMS, compute_graph_algorithm
+from dku_graph_analytics import fast_graph_analytics
+from dku_graph_analytics.fast_graph_analytics import connected_components
+
+
+def random_graph(directed, seed=0, nodes_nb=150, edges_nb=400):
+    """ random edges with self-loops, duplicated edges and a few small components """
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({'source': rng.randint(nodes_nb, size=edges_nb), 'target': rng.randint(nodes_nb, size=edges_nb)})
+    df = pd.concat([df, pd.DataFrame({'source': [1000, 1001, 1003], 'target': [1001, 1002, 1003]})], ignore_index=True)
+    df = df.astype(str)
+    return CompactGraph.from_dataframe(df, 'source', 'target', directed=directed)
+
+
+# networkx pagerank stops when the total error is below nodes_nb * 1e-6
+NETWORKX_METHODS = {Constants.PAGERANK: (nx.pagerank, {'tol': 1e-12, 'max_iter': 1000})}
+
+
+def compute(algo, compact_graph, engine):
+    params = {Constants.ENGINE: engine, Constants.DIRECTED: compact_graph.directed}
+    algo_params = dict(GRAPH_ALGORITHMS[algo], method=NETWORKX_METHODS.get(algo, GRAPH_ALGORITHMS[algo]['method']))
+    result = compute_graph_algorithm(algo_params, params, compact_graph, lambda: compact_graph.to_networkx(weighted=False))
+    return result.set_index(Constants.NODE_NAME).iloc[:, 0]
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("algo", [algo for algo, algo_params in GRAPH_ALGORITHMS.items() if "fast_method" in algo_params])
+def test_fast_methods_parity(algo, directed):
+    if directed and GRAPH_ALGORITHMS[algo].get("param_restriction") == "directed_graph":
+        pytest.skip("algorithm only for undirected graphs")
+    compact_graph = random_graph(directed)
+    if algo == Constants.EIGEN_CENTRALITY:  # eigenvector centrality is only well defined on a strongly connected graph
+        compact_graph = random_graph(directed, nodes_nb=50, edges_nb=600)
+        compact_graph = CompactGraph.from_codes(compact_graph.labels[:50], compact_graph.sources[compact_graph.sources < 50],
+                                                compact_graph.targets[compact_graph.sources < 50], directed=directed)
+
+    fast_values = compute(algo, compact_graph, Constants.FASTEST_ENGINE)
+    networkx_values = compute(algo, compact_graph, Constants.NETWORKX_ENGINE)
+
+    assert list(fast_values.index) == list(networkx_values.index)
+    np.testing.assert_allclose(fast_values.values.astype(float), networkx_values.loc[fast_values.index].values.astype(float),
+                               rtol=1e-5, atol=1e-7)
+
+
+def test_directed_clustering_uses_networkx():
+    compact_graph = random_graph(directed=True)
+    fast_values = compute(Constants.CLUSTERING, compact_graph, Constants.FASTEST_ENGINE)
+    networkx_values = compute(Constants.CLUSTERING, compact_graph, Constants.NETWORKX_ENGINE)
+    pd.testing.assert_series_equal(fast_values, networkx_values)
+
+
+def test_connected_components_parity():
+    compact_graph = random_graph(directed=False)
+    expected = {}
+    for component_id, component in enumerate(nx.connected_components(compact_graph.to_networkx(weighted=False))):
+        for element in component:
+            expected[element] = component_id
+    assert dict(zip(compact_graph.labels, connected_components(compact_graph))) == expected
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_approximate_closeness_with_all_pivots_is_exact(directed):
+    compact_graph = random_graph(directed)
+    params = {Constants.ENGINE: Constants.FASTEST_ENGINE, Constants.DIRECTED: directed,
+              Constants.CLOSENESS_APPROXIMATION: {'samples': compact_graph.node_count, 'error': 0.05, 'seed': 0}}
+    result = compute_graph_algorithm(GRAPH_ALGORITHMS[Constants.CLOSENESS], params, compact_graph, None)
+    expected = compute(Constants.CLOSENESS, compact_graph, Constants.NETWORKX_ENGINE)
+    np.testing.assert_allclose(result[GRAPH_ALGORITHMS[Constants.CLOSENESS]['label']].values, expected.values, rtol=1e-9)
+
+
+def test_approximate_closeness_error():
+    compact_graph = random_graph(False, nodes_nb=1000, edges_nb=3000)
+    exact = fast_graph_analytics.closeness_centrality(compact_graph)
+    approximate = fast_graph_analytics.approximate_closeness_centrality(compact_graph, samples=100, seed=0)
+    connected = exact > 0.1
+    assert np.median(np.abs(approximate - exact)[connected] / exact[connected]) < 0.05
+    np.testing.assert_array_equal(approximate, fast_graph_analytics.approximate_closeness_centrality(compact_graph, samples=100, seed=0))
+
+
+@pytest.mark.parametrize("reachable_closeness", [False, True])
+@pytest.mark.parametrize("directed", [False, True])
+def test_closeness_of_disconnected_graph(monkeypatch, directed, reachable_closeness):
+    # igraph < 0.10 counts unreachable nodes at distance n, closeness is then computed from the distances
+    monkeypatch.setattr(fast_graph_analytics, 'IGRAPH_REACHABLE_CLOSENESS', reachable_closeness)
+    compact_graph = random_graph(directed, nodes_nb=300, edges_nb=250)
+    assert len(set(connected_components(compact_graph))) > 10
+    fast_values = compute(Constants.CLOSENESS, compact_graph, Constants.FASTEST_ENGINE)
+    networkx_values = compute(Constants.CLOSENESS, compact_graph, Constants.NETWORKX_ENGINE)
+    np.testing.assert_allclose(fast_values.values, networkx_values.loc[fast_values.index].values, rtol=1e-9)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_approximate_closeness_of_several_components(directed):
+    # two large components and many small ones, small components are rarely sampled by uniform pivots
+    rng = np.random.RandomState(1)
+    sources = [rng.randint(400, size=1500), 400 + rng.randint(200, size=800)]
+    targets = [rng.randint(400, size=1500), 400 + rng.randint(200, size=800)]
+    for start in range(600, 900, 3):
+        sources.append(np.array([start, start + 1, start + 2]))
+        targets.append(np.array([start + 1, start + 2, start]))
+    compact_graph = CompactGraph.from_codes(np.arange(900).astype(str), np.concatenate(sources), np.concatenate(targets), directed=directed)
+    exact = fast_graph_analytics.closeness_centrality(compact_graph)
+    approximate = fast_graph_analytics.approximate_closeness_centrality(compact_graph, samples=50, seed=0)
+
+    np.testing.assert_allclose(approximate[600:], exact[600:], rtol=1e-9)
+    assert (approximate[600:] > 0).all()
+    connected = exact > 0.1
+    assert np.median(np.abs(approximate - exact)[connected] / exact[connected]) < 0.1
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from graph_analytics_constants import Constants
+from dku_graph.compact_graph import CompactGraph
+from dku_graph_analytics.graph_clustering import (compute_clustering_task, compute_modularity, get_clustering_keys,
+                                                  get_clustering_label, get_igraph)
+
+
+def planted_partition_graph(clusters_nb=8, cluster_size=30, seed=5):
+    """ dense clusters linked by a few edges, with a weight column and self-loops """
+    random_state = np.random.RandomState(seed)
+    clusters = np.repeat(np.arange(clusters_nb), cluster_size)
+    sources = random_state.randint(len(clusters), size=3000)
+    targets = np.where(random_state.uniform(size=3000) < 0.9,
+                       clusters[sources] * cluster_size + random_state.randint(cluster_size, size=3000),
+                       random_state.randint(len(clusters), size=3000))
+    df = pd.DataFrame({'source': sources, 'target': targets, 'weight': random_state.uniform(0.5, 2, size=3000)})
+    return CompactGraph.from_dataframe(df, 'source', 'target', 'weight')
+
+
+def test_clustering_keys_and_labels():
+    keys = get_clustering_keys([Constants.MULTILEVEL, Constants.LEIDEN, Constants.LEIDEN_CPM], [0.5, 2])
+    assert keys == [Constants.MULTILEVEL, (Constants.LEIDEN, 0.5), (Constants.LEIDEN, 2), (Constants.LEIDEN_CPM, 0.5), (Constants.LEIDEN_CPM, 2)]
+    assert [get_clustering_label(key) for key in keys] == ['multilevel', 'leiden_0.5', 'leiden_2', 'leiden_cpm_0.5', 'leiden_cpm_2']
+
+
+@pytest.mark.parametrize("key", [Constants.MULTILEVEL, Constants.WALKTRAP, (Constants.LEIDEN, 1.0), (Constants.LEIDEN_CPM, 0.2)])
+def test_modularity_same_as_igraph(key):
+    compact_graph = planted_partition_graph()
+    membership = compute_clustering_task(compact_graph, key)
+    expected = get_igraph(compact_graph).modularity(membership, weights='weight')
+    assert compute_modularity(compact_graph, membership) == pytest.approx(expected)
+
+
+def test_leiden_resolution_sweep():
+    compact_graph = planted_partition_graph()
+    memberships = [compute_clustering_task(compact_graph, (Constants.LEIDEN, resolution)) for resolution in [0.1, 1, 10]]
+    clusters_nb = [len(set(membership)) for membership in memberships]
+
+    assert clusters_nb[0] < clusters_nb[1] < clusters_nb[2]
+    assert clusters_nb[1] == 8
+    assert compute_modularity(compact_graph, memberships[1]) == max(compute_modularity(compact_graph, membership) for membership in memberships)
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from dku_graph.graph import Graph
+from dku_graph.hierarchy import ClusterHierarchy, LevelOfDetailView
+
+
+def clustered_dataframe(clusters_nb=30, cluster_size=20, pairs_nb=100, seed=3):
+    """ dense clusters linked in a chain, and isolated pairs of nodes """
+    random_state = np.random.RandomState(seed)
+    sources, targets = [], []
+    for cluster in range(clusters_nb):
+        nodes = cluster * cluster_size + np.arange(cluster_size)
+        sources.extend(random_state.choice(nodes, 60))
+        targets.extend(random_state.choice(nodes, 60))
+        if cluster > 0:
+            sources.append(nodes[0] - 1)
+            targets.append(nodes[0])
+    first_pair = clusters_nb * cluster_size
+    sources.extend(first_pair + 2 * np.arange(pairs_nb))
+    targets.extend(first_pair + 2 * np.arange(pairs_nb) + 1)
+    df = pd.DataFrame({'source': sources, 'target': targets})
+    return df[df['source'] != df['target']]
+
+
+def build_view(max_nodes):
+    df = clustered_dataframe()
+    graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': 2 * len(df)})
+    graph.create_graph(df)
+    return LevelOfDetailView(graph, ClusterHierarchy(graph.compact_graph, max_nodes))
+
+
+def test_hierarchy_levels():
+    view = build_view(50)
+    hierarchy, nodes_nb = view.hierarchy, len(view.graph.nodes)
+
+    assert len(hierarchy.sizes[0]) == nodes_nb
+    assert len(hierarchy.sizes[hierarchy.overview_level]) <= 50
+    for sizes in hierarchy.sizes:
+        assert sizes.sum() == nodes_nb
+    # levels are nested: nodes of a cluster are in the same cluster at the level above
+    for fine, coarse in zip(hierarchy.levels[:-1], hierarchy.levels[1:]):
+        parents = np.full(fine.max() + 1, -1)
+        parents[fine] = coarse
+        assert (parents[fine] == coarse).all()
+
+
+def test_small_graph_overview_is_the_graph():
+    view = build_view(1000)
+    nodes, edges = view.get_overview(scale=100)
+
+    assert view.hierarchy.overview_level == 0
+    assert len(nodes) == len(view.graph.nodes)
+    assert len(edges) == len(view.graph.edges)
+
+
+def test_overview_and_expand():
+    view = build_view(50)
+    nodes, edges = view.get_overview(scale=100)
+    visible = [node['id'] for node in nodes]
+
+    assert len(nodes) <= 50
+    assert sum(node['value'] for node in nodes if node.get('isCluster')) + sum(1 for node in nodes if not node.get('isCluster')) == len(view.graph.nodes)
+    assert all(np.isfinite(node['x']) and np.isfinite(node['y']) for node in nodes)
+    assert all(edge['from'] in visible and edge['to'] in visible for edge in edges)
+
+    # expand clusters until the nodes of the graph are displayed
+    cluster = max((node for node in nodes if node.get('isCluster')), key=lambda node: node['value'])
+    while cluster is not None:
+        children, child_edges = view.expand(cluster['id'], visible, (cluster['x'], cluster['y']))
+        visible = [node_id for node_id in visible if node_id != cluster['id']] + [child['id'] for child in children]
+        assert len(children) > 1
+        assert sum(child['value'] if child.get('isCluster') else 1 for child in children) == cluster['value']
+        assert all(edge['from'] in visible and edge['to'] in visible for edge in child_edges)
+        cluster = next((child for child in children if child.get('isCluster')), None)
+
+    assert any(child['id'] in view.graph.nodes for child in children)
+
+
+def test_node_labels_like_cluster_ids():
+    df = clustered_dataframe().astype(str)
+    df.loc[:2, 'source'] = ['cluster_a', 'cluster_1_2', 'cluster_1_2']
+    graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': 2 * len(df)})
+    graph.create_graph(df)
+    hierarchy = ClusterHierarchy(graph.compact_graph, 50)
+
+    node_ids = list(graph.compact_graph.labels)
+    for label in ['cluster_a', 'cluster_1_2']:
+        assert hierarchy.get_item(label) == (0, node_ids.index(label))
+    cluster_ids = [hierarchy.get_item_id(item) for item in hierarchy.get_level_items(1)]
+    assert not set(cluster_ids) & set(node_ids)
+    assert [hierarchy.get_item(cluster_id) for cluster_id in cluster_ids] == hierarchy.get_level_items(1)
+    assert hierarchy.get_item(hierarchy.cluster_prefix + "x_1") is None
+
+
+def test_nodes_colored_cluster_are_not_clusters():
+    df = clustered_dataframe()
+    df['color'] = 'cluster'
+    graph = Graph({'source': 'source', 'target': 'target', 'source_nodes_color': 'color', 'max_nodes': 2 * len(df)})
+    graph.create_graph(df)
+    view = LevelOfDetailView(graph, ClusterHierarchy(graph.compact_graph, 50))
+    nodes, _ = view.get_overview(scale=100)
+
+    clusters = [node for node in nodes if node.get('isCluster')]
+    assert clusters and all(node['id'] not in graph.nodes for node in clusters)
+    assert all(not node.get('isCluster') for node in nodes if node['id'] in graph.nodes)
@@ -0,0 +1,123 @@
+import random
+import numpy as np
+import pandas as pd
+import igraph
+import pytest
+from dku_graph.graph import Graph
+from dku_graph.layout import compute_positions, get_layout_strategy, component_layout, pack_boxes, incremental_layout, LAYOUT_STRATEGIES
+
+
+def clustered_igraph(clusters_nb=8, cluster_size=40, seed=5):
+    """ dense clusters linked by a few edges, with an isolated pair of nodes """
+    igraph.set_random_number_generator(random.Random(seed))
+    iGraph = igraph.Graph.Erdos_Renyi(n=cluster_size, p=0.2)
+    for _ in range(clusters_nb - 1):
+        iGraph = iGraph.disjoint_union(igraph.Graph.Erdos_Renyi(n=cluster_size, p=0.2))
+    iGraph.add_edges([(i * cluster_size, (i + 1) * cluster_size) for i in range(clusters_nb - 1)])
+    iGraph.add_vertices(2)
+    iGraph.add_edge(iGraph.vcount() - 2, iGraph.vcount() - 1)
+    return iGraph
+
+
+def test_auto_strategy():
+    assert get_layout_strategy('auto', 50) == 'kamada_kawai'
+    assert get_layout_strategy('auto', 5000) == 'multilevel'
+    assert get_layout_strategy('auto', 200000) == 'grid_fruchterman_reingold'
+    assert get_layout_strategy('drl', 50) == 'drl'
+
+
+@pytest.mark.parametrize("strategy", list(LAYOUT_STRATEGIES))
+def test_layout_strategies(strategy):
+    iGraph = clustered_igraph()
+    positions = compute_positions(iGraph, strategy)
+
+    assert positions.shape == (iGraph.vcount(), 2)
+    assert np.isfinite(positions).all()
+    # linked nodes are closer than random pairs of nodes
+    edges = np.array(iGraph.get_edgelist())
+    edge_lengths = np.linalg.norm(positions[edges[:, 0]] - positions[edges[:, 1]], axis=1)
+    pairs = np.random.RandomState(0).randint(iGraph.vcount(), size=(1000, 2))
+    pair_lengths = np.linalg.norm(positions[pairs[:, 0]] - positions[pairs[:, 1]], axis=1)
+    assert np.median(edge_lengths) < np.median(pair_lengths)
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        compute_positions(clustered_igraph(), 'unknown')
+
+
+def test_graph_compute_layout_with_strategy():
+    df = pd.DataFrame({'source': ['a', 'b', 'c', 'd'], 'target': ['b', 'c', 'a', 'e']})
+    graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': 10, 'layout_strategy': 'multilevel'})
+    graph.create_graph(df)
+    graph.compute_layout(scale=100, scale_ratio=1)
+
+    assert all(np.isfinite(node['x']) and np.isfinite(node['y']) for node in graph.nodes.values())
+
+
+def forest_igraph():
+    """ a clustered component, 50 isolated pairs, 20 triangles, 20 paths of 3 nodes and 10 single nodes """
+    iGraph = clustered_igraph(clusters_nb=3, cluster_size=80)
+    for size, edges, count in [(2, [(0, 1)], 50), (3, [(0, 1), (1, 2), (2, 0)], 20), (3, [(0, 1), (1, 2)], 20), (1, [], 10)]:
+        for _ in range(count):
+            iGraph = iGraph.disjoint_union(igraph.Graph(n=size, edges=edges))
+    return iGraph
+
+
+def boxes_overlap(first, second):
+    return (first[0] < second[2] and second[0] < first[2]) and (first[1] < second[3] and second[1] < first[3])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_component_layout(workers):
+    iGraph = forest_igraph()
+    positions = component_layout(iGraph, workers=workers, parallel_min_size=100)
+
+    assert positions.shape == (iGraph.vcount(), 2)
+    assert np.isfinite(positions).all()
+    components = iGraph.connected_components()
+    boxes = [np.r_[positions[nodes].min(axis=0), positions[nodes].max(axis=0)] for nodes in components]
+    assert not any(boxes_overlap(boxes[i], boxes[j]) for i in range(len(boxes)) for j in range(i + 1, len(boxes)))
+    # all pairs of nodes share the same template
+    pair_lengths = [np.linalg.norm(positions[nodes[0]] - positions[nodes[1]]) for nodes in components if len(nodes) == 2]
+    assert np.allclose(pair_lengths, pair_lengths[0])
+
+
+def test_pack_boxes():
+    sizes = np.random.RandomState(1).uniform(1, 10, size=(200, 2))
+    offsets = pack_boxes(sizes, aspect_ratio=2)
+    boxes = np.c_[offsets, offsets + sizes]
+
+    assert not any(boxes_overlap(boxes[i], boxes[j]) for i in range(len(boxes)) for j in range(i + 1, len(boxes)))
+    width, height = boxes[:, 2].max(), boxes[:, 3].max()
+    assert 1 < width / height < 4
+    assert np.prod(sizes, axis=1).sum() / (width * height) > 0.6
+
+
+def test_incremental_layout_keeps_known_positions():
+    df = pd.DataFrame({'source': np.arange(300) // 3, 'target': (np.arange(300) * 7) % 150})
+    graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': 100})
+    graph.create_graph(df)
+    graph.compute_layout(scale=1000, scale_ratio=1)
+    previous_positions = graph.get_positions()
+
+    larger_graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': 110})
+    larger_graph.create_graph(df)
+    larger_graph.compute_layout(scale=1000, scale_ratio=1, previous_positions=previous_positions)
+    positions = larger_graph.get_positions()
+
+    assert len(positions) > len(previous_positions)
+    known = [node for node in previous_positions if node in positions]
+    before, after = (np.array([positions_dict[node] for node in known]) for positions_dict in (previous_positions, positions))
+    # the picture does not jump: known nodes stay close to their previous positions (scale is 1000)
+    assert np.median(np.linalg.norm(after - before, axis=1)) < 60
+    assert all(np.isfinite(position).all() for position in positions.values())
+
+
+def test_incremental_layout_places_new_nodes_near_neighbors():
+    iGraph = igraph.Graph(n=4, edges=[(0, 1), (1, 2), (2, 3)])
+    seed_positions = np.array([[0, 0], [1, 0], [np.nan, np.nan], [np.nan, np.nan]])
+    positions = incremental_layout(iGraph, seed_positions, fruchterman_iter=1, start_temp=1e-6)
+
+    assert np.isfinite(positions).all()
+    assert np.linalg.norm(positions[2] - positions[1]) < np.linalg.norm(positions[2] - positions[0])
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from graph_analytics_constants import Constants
+from dku_graph.compact_graph import EdgeAccumulator
+from dku_graph_analytics.node_features import NodeFeatures
+
+
+def edges_df():
+    return pd.DataFrame({
+        'source': ['a', 'b', 'a', 'c', 'd', np.nan, 'e'],
+        'target': ['b', 'a', 'b', 'a', 'd', 'a', np.nan],
+        'value': [1, 2, 3, 4, 5, 6, 7]
+    })
+
+
+def build_features(df):
+    accumulator = EdgeAccumulator()
+    accumulator.add_chunk(df, 'source', 'target')
+    graph = accumulator.get_graph()
+    features = NodeFeatures(graph, has_missing_nodes=accumulator.has_missing_nodes)
+    features.add({'degree': graph.degree()})
+    # dataframe in reverse order of nodes, as returned by some networkx algorithms
+    labels = graph.labels[::-1]
+    features.add_dataframe(pd.DataFrame({Constants.NODE_NAME: labels, 'component_id': np.arange(len(labels)),
+                                         'score': np.linspace(0, 1, len(labels))}))
+    return graph, features
+
+
+def merged_reference(df, graph, features, node_columns):
+    """ successive left merges of each group of features, as previously done in the recipes """
+    for group in features.groups:
+        series = pd.concat([pd.DataFrame({Constants.NODE_NAME: graph.labels}), group], axis=1)
+        for node_column in node_columns:
+            df = df.merge(series, left_on=node_column, right_on=Constants.NODE_NAME, how='left',
+                          suffixes=('_source', '_target')).drop([Constants.NODE_NAME], axis=1)
+    return df
+
+
+def test_annotate_edges_matches_merges():
+    df = edges_df()
+    graph, features = build_features(df)
+
+    expected = merged_reference(df, graph, features, ['source', 'target'])
+    annotated = features.annotate_edges(df, ['source', 'target'])
+    pd.testing.assert_frame_equal(annotated, expected)
+
+
+def test_annotate_edges_without_missing_nodes_keeps_dtypes():
+    df = edges_df().dropna().reset_index(drop=True)
+    graph, features = build_features(df)
+
+    annotated = features.annotate_edges(df, ['source', 'target'])
+    pd.testing.assert_frame_equal(annotated, merged_reference(df, graph, features, ['source', 'target']))
+    assert annotated['degree_source'].dtype == np.int64
+
+
+def test_annotate_edges_by_chunks():
+    df = edges_df()
+    graph, features = build_features(df)
+
+    tables = features.get_edges_tables()
+    chunks = [features.annotate_edges(df.iloc[start:start + 3], ['source', 'target'], tables) for start in range(0, len(df), 3)]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), features.annotate_edges(df, ['source', 'target']))
+
+
+def test_nodes_dataframe():
+    df = edges_df()
+    graph, features = build_features(df)
+
+    nodes_df = features.get_nodes_dataframe('source')
+    assert list(nodes_df.columns) == ['source', 'degree', 'component_id', 'score']
+    assert list(nodes_df['source']) == ['a', 'b', 'c', 'd', 'e']
+    assert list(nodes_df['component_id']) == [4, 3, 2, 1, 0]
+
+
+def test_edges_features_dtypes_of_every_chunk():
+    df = edges_df()
+    graph, features = build_features(df)
+
+    edges_features = features.get_edges_features(['source', 'target'])
+    assert len(edges_features) == 0
+    # the first chunk has no missing node: its dtypes alone would not be the ones of the next chunks
+    for chunk in [df.iloc[:4], df.iloc[4:]]:
+        annotated = features.annotate_edges(chunk, ['source', 'target'])
+        pd.testing.assert_series_equal(annotated[edges_features.columns].dtypes, edges_features.dtypes)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dku_graph.graph import Graph
+from dku_graph.payload import get_payload, decode_array, COLUMNAR_FORMAT
+
+
+def build_graph(**params):
+    df = pd.DataFrame({
+        'source': ['a', 'b', 'c', 'a'],
+        'target': ['b', 'c', 'd', 'd'],
+        'color': ['x', 'y', 'x', 'y'],
+        'size': [1.0, np.nan, 3.0, 4.0],
+        'caption': ['ab', 'bc', 'cd', 'ad']
+    })
+    graph = Graph(dict({'source': 'source', 'target': 'target', 'max_nodes': 10, 'pack_components': False}, **params))
+    graph.create_graph(df)
+    graph.compute_layout(scale=100, scale_ratio=1)
+    return graph
+
+
+def test_columnar_payload_matches_json_payload():
+    graph = build_graph(source_nodes_color='color', source_nodes_size='size', edges_caption='caption')
+    json_payload, payload = get_payload(graph), get_payload(graph, COLUMNAR_FORMAT)
+    nodes, edges = payload['nodes'], payload['edges']
+
+    assert nodes['ids'] == [node['id'] for node in json_payload['nodes']]
+    assert np.allclose(decode_array(nodes['x'], '<f4'), [node['x'] for node in json_payload['nodes']], rtol=1e-5)
+    groups = decode_array(nodes['group'], '<i4')
+    assert [nodes['group_values'][group] for group in groups] == [node['group'] for node in json_payload['nodes']]
+    values = decode_array(nodes['value'], '<f8')
+    assert [value for value in values if not np.isnan(value)] == [node['value'] for node in json_payload['nodes'] if 'value' in node]
+
+    ids = np.array(nodes['ids'])
+    assert list(ids[decode_array(edges['from'], '<i4')]) == [edge['from'] for edge in json_payload['edges']]
+    assert list(ids[decode_array(edges['to'], '<i4')]) == [edge['to'] for edge in json_payload['edges']]
+    assert list(decode_array(edges['value'], '<f8')) == [edge['value'] for edge in json_payload['edges']]
+    assert edges['label'] == ['ab', 'bc', 'cd', 'ad']
+
+
+def test_columnar_payload_without_groups_or_labels():
+    payload = get_payload(build_graph(), COLUMNAR_FORMAT)
+
+    assert (decode_array(payload['nodes']['group'], '<i4') == -1).all()
+    assert np.isnan(decode_array(payload['nodes']['value'], '<f8')).all()
+    assert payload['edges']['label'] is None
+
+
+def test_unknown_payload_format():
+    with pytest.raises(ValueError):
+        get_payload(build_graph(), 'xml')
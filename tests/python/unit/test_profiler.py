@@ -0,0 +1,88 @@
+import json
+import pandas as pd
+from dku_profiling import profiler as profiler_module
+from dku_profiling.profiler import RunProfiler, profile_stage, get_profiler
+from dku_graph.graph import Graph
+
+
+class FakeMemory:
+    """ RSS of the process (MB) whose peak is reset like with /proc/self/clear_refs """
+
+    def __init__(self):
+        self.rss, self.peak = 100, 500
+
+    def allocate(self, megabytes):
+        self.rss += megabytes
+        self.peak = max(self.peak, self.rss)
+
+    def reset(self):
+        self.peak = self.rss
+        return True
+
+    def get(self):
+        return self.rss, self.peak
+
+
+def test_stages_of_a_run(monkeypatch):
+    memory = FakeMemory()
+    monkeypatch.setattr(profiler_module, 'get_rss_mb', memory.get)
+    monkeypatch.setattr(profiler_module, 'reset_peak_rss', memory.reset)
+    with RunProfiler("run") as profiler:
+        assert get_profiler() is profiler
+        with profile_stage("outer", rows=10) as outer:
+            memory.allocate(10)
+            with profile_stage("inner"):
+                memory.allocate(64)
+                memory.allocate(-64)
+            outer.annotate(nodes=3)
+    assert get_profiler() is None
+
+    inner, outer = profiler.stages
+    assert (inner.name, outer.name) == ("inner", "outer")
+    assert outer.counts == {'rows': 10, 'nodes': 3}
+    assert outer.wall_s >= inner.wall_s
+    # the peak of a nested stage is also the peak of the stages around it, the peak before the run is ignored
+    assert (inner.peak_rss_delta_mb, outer.peak_rss_delta_mb, profiler.run.peak_rss_delta_mb) == (64, 74, 74)
+
+    summary = json.loads(profiler.get_header())
+    assert summary['run'] == "run" and [stage['stage'] for stage in summary['stages']] == ["inner", "outer"]
+    assert summary['wall_s'] >= outer.wall_s
+
+    df = profiler.get_dataframe()
+    assert list(df['stage']) == ["inner", "outer", "run"]
+    assert list(df.columns[:2]) == ['run', 'stage'] and 'nodes' in df.columns
+
+
+def test_stages_without_peak_reset(monkeypatch):
+    memory = FakeMemory()
+    monkeypatch.setattr(profiler_module, 'get_rss_mb', memory.get)
+    monkeypatch.setattr(profiler_module, 'reset_peak_rss', lambda: 1 / 0)
+    with RunProfiler("chart", reset_peak=False) as profiler:
+        with profile_stage("outer"):
+            memory.allocate(10)
+            with profile_stage("inner"):
+                memory.allocate(64)
+            memory.allocate(-30)
+
+    inner, outer = profiler.stages
+    # the RSS deltas between the starts and stops of the stages, the peak of the process is left as it is
+    assert (inner.peak_rss_delta_mb, outer.peak_rss_delta_mb, profiler.run.peak_rss_delta_mb) == (64, 74, 74)
+    assert memory.peak == 500
+
+
+def test_stages_without_profiler():
+    with profile_stage("alone", rows=2) as stage:
+        pass
+    assert stage.wall_s >= 0 and stage.counts == {'rows': 2}
+
+
+def test_graph_stages_and_cprofile():
+    df = pd.DataFrame({'source': ['a', 'b', 'c'], 'target': ['b', 'c', 'a']})
+    with RunProfiler("chart", cprofile=True) as profiler:
+        graph = Graph({'source': 'source', 'target': 'target', 'max_nodes': 10})
+        graph.create_graph(df)
+        graph.compute_layout(scale=100, scale_ratio=1)
+
+    assert [(stage.name, stage.counts['nodes']) for stage in profiler.stages] == [("Graph object", 3), ("Global layout", 3)]
+    assert profiler.stages[0].counts['edges'] == 3
+    assert "create_graph" in profiler.get_cprofile_stats()
@@ -4,11 +4,16 @@ var filters = {};
 var plugin_config = {};
 
 var network;
-var allNodes;
 var highlightActive = false;
+var highlightedNodes = new Map();  // node id -> opacity of the highlighted nodes
+var selectedNode;
+const DIMMED_OPACITY = 0.3;
+var levelOfDetail = false;
 var nodesDataset;
 var edgesDataset;
 
+const CHART_ID = Math.random().toString(36).slice(2);  // one layout history per opened chart
+
 var globalCallbackNum = 0;
 var waitingTime;
 
@@ -65,12 +70,13 @@ window.addEventListener('message', function(event) {
                 source: webAppConfig['source'],
                 target: webAppConfig['target'],
                 max_nodes: webAppConfig['max_nodes'],
-                directed_edges: webAppConfig['directed_edges']
+                directed_edges: webAppConfig['directed_edges'],
+                pack_components: webAppConfig['pack_components'] === true
             }
             if (webAppConfig['advanced_parameters']) {
                 var advanced_properties = [
                     "source_nodes_color", "source_nodes_size", "target_nodes_color", "target_nodes_size",
-                    "edges_caption", "edges_width", "numerical_colors"
+                    "edges_caption", "edges_width", "numerical_colors", "layout_strategy", "layout_workers", "level_of_detail"
                 ]
                 for (var i = 0; i < advanced_properties.length; i++) {
                     if (webAppConfig[advanced_properties[i]]) {
@@ -109,12 +115,18 @@ window.addEventListener('message', function(event) {
                 return;
             } else {        
                 console.log(`calling backend`);
-                dataiku.webappBackend.post('get_graph_data', {"config": JSON.stringify(plugin_config), "filters": JSON.stringify(filters), "scale_ratio": scale_ratio})
+                dataiku.webappBackend.post('get_graph_data', {"config": JSON.stringify(plugin_config), "filters": JSON.stringify(filters), "scale_ratio": scale_ratio, "format": "columnar", "chart_id": CHART_ID})
                     .then(
                         function(data){
                             console.log(`backend done`);
-                            var nodes = data['nodes']
-                            var edges = data['edges']
+                            var nodes, edges;
+                            if (data['format'] == 'columnar') {
+                                nodes = columnarNodes(data['nodes'])
+                                edges = columnarEdges(data['edges'], nodes)
+                            } else {  // json format: nodes and edges with their html titles
+                                nodes = data['nodes']
+                                edges = data['edges']
+                            }
 
                             nodes.forEach(function (node) {
                                 node.title = htmlTitle(node.title)
@@ -182,11 +194,19 @@ window.addEventListener('message', function(event) {
                             document.getElementById("spinner").style.display = "none";
                             network = draw(nodesDataset, edgesDataset, options);
 
-                            document.getElementById("graph-stats").innerHTML = `${nodesDataset.length} nodes<br>${edgesDataset.length} edges`
+                            document.getElementById("graph-stats").innerHTML = `${nodesDataset.length} nodes<br>${edgesDataset.length} edges` + filtersStatsHtml(data['filters_stats'])
 
-                            allNodes = nodesDataset.get({ returnType: "Object" });
+                            highlightActive = false;
+                            highlightedNodes = new Map();
 
-                            network.on("doubleClick", neighbourhoodHighlight);
+                            levelOfDetail = data['level_of_detail'] === true;
+                            network.on("doubleClick", function (params) {
+                                if (levelOfDetail && params.nodes.length > 0 && nodesDataset.get(params.nodes[0]).isCluster === true) {
+                                    expandCluster(params.nodes[0]);
+                                } else {
+                                    neighbourhoodHighlight(params);
+                                }
+                            });
 
                             network.on("showPopup", function (params) {
                                 styleTooltip();
@@ -203,57 +223,168 @@ window.addEventListener('message', function(event) {
 });
 
 
-function neighbourhoodHighlight(params) {
+function filtersStatsHtml(stats) {
+    // number of rows removed by the filters, the rows removed by each filter are in the tooltip
+    if (!stats || stats['filters'].length == 0) {
+        return "";
+    }
+    var removed = 0;
+    var details = [];
+    stats['filters'].forEach(function (filter) {
+        removed += filter['removed_rows'];
+        details.push(`${filter['column']}: ${filter['removed_rows']} rows removed (${filter['excluded_rows']} excluded)`);
+    });
+    var container = document.createElement("span");
+    container.title = details.join("\n");
+    container.textContent = `${removed} of ${stats['read_rows']} rows filtered out`;
+    return "<br>" + container.outerHTML;
+}
+
+function expandCluster(clusterId) {
+    // replace the cluster by its children, laid out around its position
+    var position = network.getPositions([clusterId])[clusterId];
+    var args = {
+        "config": JSON.stringify(plugin_config), "filters": JSON.stringify(filters), "cluster": clusterId,
+        "visible": nodesDataset.getIds(), "x": position.x, "y": position.y
+    };
+    document.getElementById("spinner").style.display = "block";
+    dataiku.webappBackend.post('expand_cluster', args)
+        .then(
+            function(data) {
+                data['nodes'].forEach(function (node) {
+                    node.title = htmlTitle(node.title)
+                });
+                data['edges'].forEach(function (edge) {
+                    edge.title = htmlTitle(edge.title)
+                });
+                edgesDataset.remove(edgesDataset.getIds({
+                    filter: function (edge) { return edge.from === clusterId || edge.to === clusterId; }
+                }));
+                nodesDataset.remove(clusterId);
+                nodesDataset.add(data['nodes']);
+                edgesDataset.add(data['edges']);
+                document.getElementById("spinner").style.display = "none";
+                document.getElementById("graph-stats").innerHTML = `${nodesDataset.length} nodes<br>${edgesDataset.length} edges`
+            }
+        ).catch(error => {
+            document.getElementById("spinner").style.display = "none";
+            dataiku.webappMessages.displayFatalError(error);
+        });
+}
 
+function decodeArray(encoded, arrayType) {
+    // base64 string of little-endian bytes to a typed array
+    var binary = atob(encoded);
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return new arrayType(bytes.buffer);
+}
+
+function columnarNodes(columns) {
+    // build the nodes objects and their titles from the columns of the columnar payload
+    var x = decodeArray(columns['x'], Float32Array);
+    var y = decodeArray(columns['y'], Float32Array);
+    var groups = decodeArray(columns['group'], Int32Array);
+    var values = decodeArray(columns['value'], Float64Array);
+    var nodes = new Array(columns['count']);
+    for (var i = 0; i < columns['count']; i++) {
+        var id = columns['ids'][i];
+        var node = {id: id, label: String(id), x: x[i], y: y[i]};
+        var title = `id: <b>${id}</b>`;
+        if (groups[i] >= 0) {
+            node.group = columns['group_values'][groups[i]];
+            if (node.group !== 'nogroup') {
+                title += `<br>color: <b>${node.group}</b>`;
+            }
+        }
+        if (!isNaN(values[i])) {
+            node.value = values[i];
+            title += `<br>size: <b>${node.value}</b>`;
+        }
+        node.title = title;
+        nodes[i] = node;
+    }
+    return nodes;
+}
+
+function columnarEdges(columns, nodes) {
+    // build the edges objects and their titles from the columns of the columnar payload, from and to are indices of nodes
+    var from = decodeArray(columns['from'], Int32Array);
+    var to = decodeArray(columns['to'], Int32Array);
+    var values = decodeArray(columns['value'], Float64Array);
+    var edges = new Array(columns['count']);
+    for (var i = 0; i < columns['count']; i++) {
+        var edge = {from: nodes[from[i]].id, to: nodes[to[i]].id};
+        var title = `<b>${edge.from}</b> -> <b>${edge.to}</b>`;
+        if (columns['label']) {
+            edge.label = columns['label'][i];
+            title += `<br>caption: <b>${edge.label}</b>`;
+        }
+        if (!isNaN(values[i])) {
+            edge.value = values[i];
+            title += `<br>width: <b>${edge.value}</b>`;
+        }
+        edge.title = title;
+        edges[i] = edge;
+    }
+    return edges;
+}
+
+
+function neighbourhoodHighlight(params) {
+    // highlight the 2-hop neighborhood of the double clicked node, or with shift the shortest path from the previous one
     console.log("just double clicked on: ", params)
     if (params.nodes.length > 0) {
-      highlightActive = true;
-      var i, j;
-      var selectedNode = params.nodes[0];
-      var degrees = 2;
-  
-      // mark all nodes as hard to read.
-      for (var nodeId in allNodes) {
-        allNodes[nodeId].color = "rgba(200,200,200,0.5)";
-      }
-      var connectedNodes = network.getConnectedNodes(selectedNode);
-      var allConnectedNodes = [];
-  
-      // get the second degree nodes
-      for (i = 1; i < degrees; i++) {
-        for (j = 0; j < connectedNodes.length; j++) {
-          allConnectedNodes = allConnectedNodes.concat(
-            network.getConnectedNodes(connectedNodes[j])
-          );
+        var clickedNode = params.nodes[0];
+        var query = {"query": "neighborhood", "node": clickedNode, "depth": 2};
+        if (highlightActive && params.event.srcEvent.shiftKey && selectedNode !== undefined && selectedNode !== clickedNode) {
+            query = {"query": "shortest_path", "node": selectedNode, "target": clickedNode};
+        } else {
+            selectedNode = clickedNode;
         }
-      }
-  
-      // all second degree nodes get a different color and their label back
-      for (i = 0; i < allConnectedNodes.length; i++) {
-        allNodes[allConnectedNodes[i]].color = "rgba(150,150,150,0.75)";
-      }
-  
-      // all first degree nodes get their own color and their label back
-      for (i = 0; i < connectedNodes.length; i++) {
-        allNodes[connectedNodes[i]].color = undefined;
-      }
-  
-      // the main node gets its own color and its label back.
-      allNodes[selectedNode].color = undefined;
+        queryGraph(query).then(function (data) {
+            var opacities = new Map();
+            data['nodes'].forEach(function (nodeId, i) {
+                // second degree nodes are less visible than the first degree ones
+                opacities.set(nodeId, data['distances'] && data['distances'][i] > 1 ? 0.6 : 1);
+            });
+            applyHighlight(opacities);
+        }).catch(error => {
+            document.getElementById("spinner").style.display = "none";
+            dataiku.webappMessages.displayFatalError(error);
+        });
     } else if (highlightActive === true) {
-      // reset all nodes
-      for (var nodeId in allNodes) {
-        allNodes[nodeId].color = undefined;
-      }
-      highlightActive = false;
+        applyHighlight(null);
     }
-  
-    // transform the object into an array
+}
+
+function queryGraph(query) {
+    var args = Object.assign({"config": JSON.stringify(plugin_config), "filters": JSON.stringify(filters)}, query);
+    return dataiku.webappBackend.post('query_graph', args);
+}
+
+function applyHighlight(opacities) {
+    // other nodes are dimmed by the global nodes option, only the nodes whose opacity changes are updated
+    var highlighted = opacities || new Map();
+    var otherOpacity = opacities ? DIMMED_OPACITY : 1;
     var updateArray = [];
-    for (nodeId in allNodes) {
-      if (allNodes.hasOwnProperty(nodeId)) {
-        updateArray.push(allNodes[nodeId]);
-      }
+    highlightedNodes.forEach(function (opacity, nodeId) {
+        if (!highlighted.has(nodeId)) {
+            updateArray.push({id: nodeId, opacity: otherOpacity});
+        }
+    });
+    highlighted.forEach(function (opacity, nodeId) {
+        if (highlightedNodes.get(nodeId) !== opacity) {
+            updateArray.push({id: nodeId, opacity: opacity});
+        }
+    });
+    if (highlightActive !== (opacities !== null)) {
+        network.setOptions({nodes: {opacity: otherOpacity}});
     }
-    nodesDataset.update(updateArray);
-  }
\ No newline at end of file
+    // nodes that are not displayed (inside a cluster for instance) are not added
+    nodesDataset.update(updateArray.filter(node => nodesDataset.get(node.id) !== null));
+    highlightedNodes = highlighted;
+    highlightActive = opacities !== null;
+}
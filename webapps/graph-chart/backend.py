@@ -1,11 +1,34 @@
 import dataiku
-from flask import request
+from flask import request, make_response
 import simplejson as json
+import gzip
 import traceback
 import logging
 import numpy as np
-from dku_filtering.filtering import filter_dataframe
+from graph_analytics_utils import get_dataset_version, has_last_build
+from dku_filtering.filtering import read_filtered_dataframe
 from dku_graph.graph import Graph
+from dku_graph.cache import LRUCache
+from dku_graph.payload import get_payload, JSON_FORMAT
+from dku_graph.hierarchy import ClusterHierarchy, LevelOfDetailView
+from dku_graph.adjacency import AdjacencyIndex
+from dku_profiling.profiler import RunProfiler, profile_stage
+
+
+MAX_ROWS = 100000
+GZIP_MIN_SIZE = 1024
+# values of datasets without a last build time (or whose version cannot be read) are only cached for a few seconds,
+# their content can change without a new version
+UNVERSIONED_TTL = 30
+# filtered dataframes and json payloads of the chart, keyed on the dataset version so that a rebuild invalidates them
+dataframes_cache = LRUCache(max_size=8, ttl=3600)
+payloads_cache = LRUCache(max_size=32, ttl=3600)
+# last positions of the nodes of each graph (dataset and columns), to refine them when filters or other parameters change
+positions_cache = LRUCache(max_size=32, ttl=3600)
+# level of detail views (whole graph and its cluster hierarchy) whose clusters can be expanded
+views_cache = LRUCache(max_size=4, ttl=3600)
+# adjacency index of the graph of each chart (dataset version, config and filters) to answer neighborhood queries
+adjacency_cache = LRUCache(max_size=8, ttl=3600)
 
 
 def convert_numpy_int64_to_int(o):
@@ -14,34 +37,230 @@ def convert_numpy_int64_to_int(o):
     raise TypeError
 
 
+def get_cache_ttl(version):
+    """ ttl of the cached values of a version of a dataset, None for the default ttl of the cache """
+    return None if has_last_build(version) else UNVERSIONED_TTL
+
+
+def get_dataframe(dataset_name, version, config, filters, cut_at_max_nodes=True):
+    """
+    filtered rows of the columns used by the chart and stats of the filters, the dataset is streamed until the
+    filtered rows contain max_nodes nodes (when cut_at_max_nodes) or MAX_ROWS filtered rows are read
+    """
+    graph = Graph(config)
+    columns = graph.get_columns()
+    max_nodes = graph.max_nodes if cut_at_max_nodes else None
+
+    def load_dataframe():
+        # remove the cached values of the previous versions of the dataset
+        for cache in [dataframes_cache, payloads_cache, views_cache, adjacency_cache]:
+            cache.invalidate(lambda key: key[0] == dataset_name and key[1] != version)
+        with profile_stage("Chart dataframe") as stage:
+            df, filters_stats = read_filtered_dataframe(dataiku.Dataset(dataset_name), columns, filters, MAX_ROWS,
+                                                        node_columns=[graph.source_column, graph.target_column], max_nodes=max_nodes)
+            stage.annotate(read_rows=filters_stats['read_rows'], rows=len(df))
+        return df, filters_stats
+    dataframe_key = (dataset_name, version, tuple(columns), json.dumps(filters, sort_keys=True), max_nodes)
+    return dataframes_cache.get_or_compute(dataframe_key, load_dataframe, get_cache_ttl(version))
+
+
+def get_layout_key(config, chart_id=None):
+    """
+    key of the previous positions refined by the next layout, a change of the layout settings needs a full layout,
+    the id of the chart (one per page) keeps two charts of the same graph from moving each other's nodes
+    """
+    graph_key = (chart_id,) + tuple(config.get(key) for key in ['dataset_name', 'source', 'target', 'directed_edges'])
+    return graph_key + (config.get('layout_strategy') or None, config.get('pack_components', False))
+
+
+def compute_graph_payload(df, config, scale_ratio, previous_positions=None, payload_format=JSON_FORMAT, filters_stats=None):
+    """ return the json payload of the graph (see dku_graph.payload for the formats), the positions of its nodes and its CompactGraph """
+    graph = Graph(config)
+    graph.create_graph(df)
+
+    scale = np.sqrt(len(graph.nodes)) * 100
+    graph.compute_layout(scale=scale, scale_ratio=scale_ratio, previous_positions=previous_positions)
+
+    with profile_stage("Chart payload") as stage:
+        payload = dict(get_payload(graph, payload_format), filters_stats=filters_stats)
+        payload = json.dumps(payload, ignore_nan=True, default=convert_numpy_int64_to_int)
+        stage.annotate(bytes=len(payload))
+    return payload, graph.get_positions(), graph.compact_graph
+
+
+def make_payload_response(payload):
+    """ json response, gzipped when the client accepts it """
+    response = make_response(payload)
+    response.headers['Content-Type'] = 'application/json'
+    if len(payload) >= GZIP_MIN_SIZE and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        with profile_stage("Chart payload compression") as stage:
+            response.set_data(gzip.compress(payload.encode('utf-8'), compresslevel=5))
+            stage.annotate(bytes=response.content_length)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def compute_level_of_detail_view(df, config):
+    """ graph of all the filtered rows (not cut at max_nodes) and its cluster hierarchy, at most max_nodes clusters are displayed at first """
+    graph = Graph(dict(config, max_nodes=max(2 * len(df), 1)))
+    graph.create_graph(df)
+    hierarchy = ClusterHierarchy(graph.compact_graph, int(config.get('max_nodes')))
+    return LevelOfDetailView(graph, hierarchy, graph.layout_strategy)
+
+
+def get_level_of_detail_view(config, filters):
+    """ level of detail view of the chart and the stats of its filters """
+    view_key = get_chart_key(config, filters)
+
+    def compute_view():
+        df, filters_stats = get_dataframe(view_key[0], view_key[1], config, filters, cut_at_max_nodes=False)
+        return compute_level_of_detail_view(df, config), filters_stats
+    return views_cache.get_or_compute(view_key, compute_view, get_cache_ttl(view_key[1]))
+
+
+def compute_overview_payload(view, scale_ratio, filters_stats=None):
+    """ return the json payload of the overview of the graph (no positions are kept to refine the next layout) and its CompactGraph """
+    nodes_nb = len(view.hierarchy.sizes[view.hierarchy.overview_level])
+    nodes, edges = view.get_overview(scale=np.sqrt(nodes_nb) * 100, scale_ratio=scale_ratio)
+    with profile_stage("Chart payload") as stage:
+        payload = json.dumps({'nodes': nodes, 'edges': edges, 'groups': view.get_groups(), 'level_of_detail': True, 'filters_stats': filters_stats},
+                             ignore_nan=True, default=convert_numpy_int64_to_int)
+        stage.annotate(bytes=len(payload))
+    return payload, None, view.graph.compact_graph
+
+
+def get_chart_key(config, filters):
+    dataset_name = config.get('dataset_name')
+    version = get_dataset_version(dataiku.Dataset(dataset_name))
+    return (dataset_name, version, json.dumps(config, sort_keys=True), json.dumps(filters, sort_keys=True))
+
+
+def compute_adjacency_index(config, filters):
+    """ index of the graph of the chart, when it is not cached (the chart was computed by another backend process for instance) """
+    if config.get('level_of_detail'):
+        view, _ = get_level_of_detail_view(config, filters)
+        return AdjacencyIndex(view.graph.compact_graph)
+    dataset_name = config.get('dataset_name')
+    df, _ = get_dataframe(dataset_name, get_dataset_version(dataiku.Dataset(dataset_name)), config, filters)
+    graph = Graph(config)
+    graph.create_graph(df)
+    return AdjacencyIndex(graph.compact_graph)
+
+
 @app.route('/get_graph_data', methods=['POST'])
 def get_graph_data():
+    """ payload of the chart, the stages of its computation are summarized in the X-Graph-Profile header """
     try:
         data = json.loads(request.data)
 
         config = json.loads(data.get('config', None))
         filters = json.loads(data.get('filters', None))
         scale_ratio = float(data.get('scale_ratio', 1))
+        payload_format = data.get('format', JSON_FORMAT)
+
+        with RunProfiler("Graph chart", cprofile=data.get('cprofile', False), reset_peak=False) as profiler:
+            dataset_name = config.get('dataset_name')
+            version = get_dataset_version(dataiku.Dataset(dataset_name))
+
+            # the same chart (config, filters and ratio) on the same version of the dataset is only computed once
+            payload_key = (dataset_name, version, json.dumps(config, sort_keys=True), json.dumps(filters, sort_keys=True), scale_ratio, payload_format)
+            if config.get('level_of_detail'):
+                def compute_payload():
+                    view, filters_stats = get_level_of_detail_view(config, filters)
+                    return compute_overview_payload(view, scale_ratio, filters_stats)
+                payload, _, compact_graph = payloads_cache.get_or_compute(payload_key, compute_payload, get_cache_ttl(version))
+            else:
+                layout_key = get_layout_key(config, data.get('chart_id'))
+
+                def compute_payload():
+                    df, filters_stats = get_dataframe(dataset_name, version, config, filters)
+                    return compute_graph_payload(df, config, scale_ratio, positions_cache.get(layout_key), payload_format, filters_stats)
+                payload, positions, compact_graph = payloads_cache.get_or_compute(payload_key, compute_payload, get_cache_ttl(version))
+                positions_cache.put(layout_key, positions)
+            adjacency_cache.get_or_compute(payload_key[:4], lambda: AdjacencyIndex(compact_graph), get_cache_ttl(version))
+            response = make_payload_response(payload)
+        logging.info("Cache of dataframes: {}, cache of graphs: {}".format(dataframes_cache.stats(), payloads_cache.stats()))
+        profiler.log_summary()
+        response.headers['X-Graph-Profile'] = profiler.get_header()
+        return response
 
-        dataset_name = config.get('dataset_name')
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return str(e), 500
+
+
+@app.route('/expand_cluster', methods=['POST'])
+def expand_cluster():
+    try:
+        data = json.loads(request.data)
+
+        config = json.loads(data.get('config', None))
+        filters = json.loads(data.get('filters', None))
+        center = (float(data.get('x', 0)), float(data.get('y', 0)))
+
+        view, _ = get_level_of_detail_view(config, filters)
+        nodes, edges = view.expand(data.get('cluster'), data.get('visible', []), center)
+        payload = json.dumps({'nodes': nodes, 'edges': edges}, ignore_nan=True, default=convert_numpy_int64_to_int)
+        return make_payload_response(payload)
+
+    except Exception as e:
+        logging.error(traceback.format_exc())
+        return str(e), 500
 
-        df = dataiku.Dataset(dataset_name).get_dataframe(limit=100000)
-        if df.empty:
-            raise Exception("Dataframe is empty")
 
-        if len(filters) > 0:  # apply filters to dataframe
-            df = filter_dataframe(df, filters)
+def query_neighborhood(index, node, data):
+    nodes, distances = index.k_hop_neighborhood(node, int(data.get('depth', 2)))
+    return {'nodes': index.compact_graph.labels[nodes].tolist(), 'distances': distances.tolist()}
 
-        graph = Graph(config)
-        graph.create_graph(df)
 
-        scale = np.sqrt(len(graph.nodes)) * 100
-        graph.compute_layout(scale=scale, scale_ratio=scale_ratio)
+def query_shortest_path(index, node, data):
+    target = get_node_id(index, data.get('target'))
+    return {'nodes': index.compact_graph.labels[index.shortest_path(node, target)].tolist()}
 
-        nodes, edges = list(graph.nodes.values()), list(graph.edges.values())
 
-        return json.dumps({'nodes': nodes, 'edges': edges, 'groups': graph.groups}, ignore_nan=True, default=convert_numpy_int64_to_int)
+def query_ego_network(index, node, data):
+    nodes, distances, edges = index.ego_network(node, int(data.get('depth', 1)))
+    labels = index.compact_graph.labels
+    return {'nodes': labels[nodes].tolist(), 'distances': distances.tolist(), 'edges': labels[edges].tolist()}
+
+
+GRAPH_QUERIES = {
+    'neighborhood': query_neighborhood,
+    'shortest_path': query_shortest_path,
+    'ego_network': query_ego_network
+}
+
+
+def get_node_id(index, node):
+    node_id = index.compact_graph.get_node_ids([node])[0]
+    if node_id < 0:
+        raise ValueError("Unknown node: {}".format(node))
+    return node_id
+
+
+@app.route('/query_graph', methods=['POST'])
+def query_graph():
+    """ answer a neighborhood query ('neighborhood', 'shortest_path' or 'ego_network') on the graph of the chart, only node ids are returned """
+    try:
+        data = json.loads(request.data)
+
+        config = json.loads(data.get('config', None))
+        filters = json.loads(data.get('filters', None))
+        query = data.get('query')
+        if query not in GRAPH_QUERIES:
+            raise ValueError("Unknown query: {}".format(query))
+
+        chart_key = get_chart_key(config, filters)
+        index = adjacency_cache.get_or_compute(chart_key, lambda: compute_adjacency_index(config, filters), get_cache_ttl(chart_key[1]))
+        result = GRAPH_QUERIES[query](index, get_node_id(index, data.get('node')), data)
+        return make_payload_response(json.dumps(result, ignore_nan=True, default=convert_numpy_int64_to_int))
 
     except Exception as e:
         logging.error(traceback.format_exc())
         return str(e), 500
+
+
+@app.route('/get_cache_stats', methods=['GET'])
+def get_cache_stats():
+    return json.dumps({'dataframes': dataframes_cache.stats(), 'graphs': payloads_cache.stats(), 'views': views_cache.stats()})